@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Response
+from fastapi.responses import JSONResponse
+from app.config.embedding_config import is_embedding_ready
+from app.config.openai_llm_config import is_openai_llm_ready
+from app.config.qdrant_config import is_qdrant_ready
+from app.config.startup import get_startup_report
+from app.util.lifecycle import is_draining
+from app.util.metrics import render_metrics
+
+router = APIRouter()
+
+@router.get("/healthz")
+async def healthz():
+    """
+    Liveness probe: the process is up and serving requests.
+    """
+    return {"status": "ok"}
+
+@router.get("/readyz")
+async def readyz():
+    """
+    Readiness probe: the embedding, LLM and Qdrant clients are initialized
+    and the worker is not draining for shutdown.
+    """
+    checks = {
+        "embedding": is_embedding_ready(),
+        "llm": is_openai_llm_ready(),
+        "qdrant": is_qdrant_ready(),
+    }
+    ready = all(checks.values()) and not is_draining()
+    status = "draining" if is_draining() else "ready" if ready else "not_ready"
+    return JSONResponse(
+        {"status": status, "checks": checks, "startup": get_startup_report()},
+        status_code=200 if ready else 503,
+    )
+
+@router.get("/metrics")
+async def metrics():
+    """
+    Prometheus metrics.
+    """
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
@@ -0,0 +1,85 @@
+import os
+import hmac
+from fastapi import APIRouter, HTTPException, Header
+from pydantic import BaseModel, Field
+from app.services.ingest_jobs import submit_ingest_job, get_ingest_job, list_ingest_jobs
+
+class IngestRequest(BaseModel):
+    root_dir: str | None = None
+    incremental: bool = True
+    dry_run: bool = False
+    include: list[str] | None = None
+    exclude: list[str] | None = None
+    max_concurrency: int = Field(default=4, ge=1, le=32)
+
+router = APIRouter()
+
+def _check_token(token: str | None):
+    """
+    Ingestion is an admin operation: it is disabled unless INGEST_API_TOKEN is set.
+    """
+    expected = os.getenv("INGEST_API_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=403, detail="Ingestion API is disabled")
+    if not token or not hmac.compare_digest(token, expected):
+        raise HTTPException(status_code=401, detail="Invalid ingestion token")
+
+def _resolve_root_dir(root_dir: str | None):
+    """
+    Resolve the requested directory, keeping it inside INGEST_ROOT_DIR.
+    """
+    allowed_root = os.getenv("INGEST_ROOT_DIR")
+    if not root_dir:
+        if not allowed_root:
+            raise HTTPException(status_code=400, detail="root_dir is required when INGEST_ROOT_DIR is not set")
+        root_dir = allowed_root
+    resolved = os.path.realpath(root_dir)
+    if allowed_root:
+        base = os.path.realpath(allowed_root)
+        if os.path.commonpath([base, resolved]) != base:
+            raise HTTPException(status_code=400, detail="root_dir must be inside INGEST_ROOT_DIR")
+    if not os.path.isdir(resolved):
+        raise HTTPException(status_code=404, detail=f"Directory not found: {root_dir}")
+    return resolved
+
+@router.post("/ingest", status_code=202)
+async def ingest(req: IngestRequest, x_ingest_token: str | None = Header(default=None)):
+    """
+    Start an ingestion job on the background worker.
+    
+    Args:
+        req: IngestRequest with the directory and pipeline options
+        
+    Returns:
+        The queued job, poll GET /ingest/{job_id} for progress
+    """
+    _check_token(x_ingest_token)
+    root_dir = _resolve_root_dir(req.root_dir)
+    job = submit_ingest_job(
+        root_dir,
+        incremental=req.incremental,
+        dry_run=req.dry_run,
+        include=req.include,
+        exclude=req.exclude,
+        embed_concurrency=req.max_concurrency,
+    )
+    return job.to_dict()
+
+@router.get("/ingest/{job_id}")
+async def ingest_status(job_id: str, x_ingest_token: str | None = Header(default=None)):
+    """
+    Status and live progress counters of an ingestion job.
+    """
+    _check_token(x_ingest_token)
+    job = get_ingest_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/ingest")
+async def ingest_jobs(x_ingest_token: str | None = Header(default=None)):
+    """
+    Recent ingestion jobs, oldest first.
+    """
+    _check_token(x_ingest_token)
+    return list_ingest_jobs()
@@ -1,21 +1,41 @@
 from hmac import new
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Header
 from fastapi.responses import StreamingResponse
-from pydantic import BaseModel  
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field
 from typing import Literal
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
 from app.services.llm import llm_service
 from app.chains.qa_chain import qa_chain
-from app.services.vectorize_documents import embedding_service_file
-import inspect
+from app.services.answer_cache import get_answer_cache
+from app.services.history import get_history_manager
+from app.services.coalesce import get_request_coalescer, is_coalescing_enabled, make_flight_key
+from app.services.sessions import get_session_store
+from app.util.metrics import time_stage, observe_stage, INFLIGHT_STREAMS
+from app.util.lifecycle import is_draining, stream_started, stream_finished
+from app.util.admission import Overloaded, get_limiter, get_admission_stats
+from app.util.resilience import request_deadline, get_guard_stats
+from app.util.sse import sse_answer_stream, parse_event_id
+import os
+import time
+import uuid
 
 class HistoryMessage(BaseModel):
     role: Literal["system", "user", "assistant"]
     content: str
 
+SESSION_ID_PATTERN = r"^[A-Za-z0-9_-]{16,64}$"
+
 class QARequest(BaseModel):
-    history: list[HistoryMessage]
+    # With session_id the server holds the history and the client sends only the new message
+    history: list[HistoryMessage] = []
     message: str
+    conversation_id: str | None = None
+    session_id: str | None = Field(default=None, pattern=SESSION_ID_PATTERN)
+
+class SessionRequest(BaseModel):
+    # Seeds a session, e.g. to carry on a conversation whose session expired
+    history: list[HistoryMessage] = []
 
 class QAResponse(BaseModel):
     answer: str
@@ -23,55 +43,129 @@ class QAResponse(BaseModel):
 router = APIRouter()
 
 @router.post("/qa")
-async def qa(req: QARequest):
+async def qa(req: QARequest, last_event_id: str | None = Header(default=None)):
     """
     Question-answering endpoint that processes user messages and returns streaming responses.
     
     Args:
-        req: QARequest containing conversation history and new message
+        req: QARequest containing the new message and either the conversation history or a session ID
+        last_event_id: ID of the last SSE frame received, sent with the same request to resume an answer
         
     Returns:
-        StreamingResponse with generated answer chunks
+        StreamingResponse of SSE frames: start, token batches, heartbeats, error and done
     """
+    if is_draining():
+        # This worker is shutting down; the client should retry on another one
+        raise HTTPException(status_code=503, detail="Server is restarting", headers={"Retry-After": "1"})
+
+    request_start = time.perf_counter()
+    history = req.history
+    new_message = req.message
+    session = None
+    if req.session_id:
+        session = await get_session_store().get(req.session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Session not found or expired")
+    flight_key = None
+    if is_coalescing_enabled():
+        if session is not None:
+            # Stable across the turn being recorded, so a resumed answer still finds its flight
+            flight_key = make_flight_key(new_message, [("session", session.id)])
+        else:
+            flight_key = make_flight_key(new_message, [(hist.role, hist.content) for hist in history])
+
+    # Requests joining an identical in-flight question add no upstream load and skip the queue;
+    # whether they really joined one is only known once they reach the coalescer
+    admitted = flight_key is None or not get_request_coalescer().is_in_flight(flight_key)
+    if admitted:
+        try:
+            with time_stage("admission"):
+                await get_limiter("qa").acquire()
+        except Overloaded as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": e.retry_after_header()})
+
+    def release_slot():
+        nonlocal admitted
+        if admitted:
+            admitted = False
+            get_limiter("qa").release()
+
     try:
-        # embedding_service_file("/Users/darcy/Desktop/target_cleaned")
-        history = req.history
-        new_message = req.message
-        configed_history = []
-        
         # Convert history to LangChain message format
-        for hist in history:
-            if hist.role == "system":
-                configed_history.append(SystemMessage(content=hist.content))
-            elif hist.role == "user":
-                configed_history.append(HumanMessage(content=hist.content))
-            elif hist.role == "assistant":
-                configed_history.append(AIMessage(content=hist.content))
+        with time_stage("history_conversion"):
+            if session is not None:
+                configed_history = session.window(new_message)
             else:
-                raise HTTPException(status_code=400, detail="Invalid role") 
+                configed_history = []
+                for hist in history:
+                    if hist.role == "system":
+                        configed_history.append(SystemMessage(content=hist.content))
+                    elif hist.role == "user":
+                        configed_history.append(HumanMessage(content=hist.content))
+                    elif hist.role == "assistant":
+                        configed_history.append(AIMessage(content=hist.content))
+                    else:
+                        raise HTTPException(status_code=400, detail="Invalid role") 
 
-        configed_history.append(HumanMessage(content=new_message))
+                configed_history.append(HumanMessage(content=new_message))
         
+        resume_id, resume_from = parse_event_id(last_event_id)
+        conversation_id = session.id if session is not None else req.conversation_id
+
+        async def run_chain():
+            # Retrieval runs asynchronously inside qa_chain; embedding, search and the
+            # first LLM token share one budget counted from when the request arrived
+            budget = float(os.getenv("QA_DEADLINE_SECONDS", "20"))
+            with request_deadline(max(0.001, budget - (time.perf_counter() - request_start)) if budget > 0 else 0):
+                gen = await qa_chain(configed_history, new_message, conversation_id=conversation_id)
+            parts = []
+            async for chunk in gen:
+                parts.append(chunk)
+                yield chunk
+            if session is not None:
+                # Only a completed answer becomes part of the session
+                await get_session_store().append_turn(session.id, new_message, "".join(parts))
+
+        async def run_unadmitted_chain():
+            # The flight this request skipped the queue for finished before it could join:
+            # the new flight queues for a slot of its own and holds it while it runs
+            async with get_limiter("qa").limit():
+                async for chunk in run_chain():
+                    yield chunk
+
         async def generate_response():
             """
-            Generate streaming response from QA chain.
+            Generate the SSE stream for the QA chain answer.
             """
+            INFLIGHT_STREAMS.inc()
+            stream_started()
             try:
-                # Get the generator from qa_chain
-                gen = qa_chain(configed_history, new_message)
-                
-                # Check if it's an async generator or regular generator
-                if inspect.isasyncgen(gen):
-                    # Handle async generator (normal LLM response)
-                    async for chunk in gen:
-                        yield f"{chunk}"
+                if flight_key is not None:
+                    # Identical concurrent questions share one retrieval and generation
+                    start = run_chain if admitted else run_unadmitted_chain
+                    stream_id, chunks, joined = get_request_coalescer().stream(flight_key, start, resume_id)
+                    if joined:
+                        # Admitted before the flight appeared; joining it adds no upstream load
+                        release_slot()
                 else:
-                    # Handle regular generator (content irrelevant response)
-                    for chunk in gen:
-                        yield f"{chunk}"
-                        
-            except Exception as e:
-                yield f"data: error: {str(e)}"
+                    stream_id, chunks = uuid.uuid4().hex[:16], run_chain()
+                frames = sse_answer_stream(
+                    chunks,
+                    stream_id,
+                    # A different stream ID is a new answer, so nothing the client holds can be reused
+                    resume_from=resume_from if stream_id == resume_id else 0,
+                    flush_interval=float(os.getenv("SSE_FLUSH_MS", "30")) / 1000,
+                    flush_bytes=int(os.getenv("SSE_FLUSH_BYTES", "64")),
+                    heartbeat_interval=float(os.getenv("SSE_HEARTBEAT_SECONDS", "15")),
+                    on_first_frame=lambda: observe_stage("first_frame", time.perf_counter() - request_start),
+                )
+                async for frame in frames:
+                    yield frame
+            finally:
+                INFLIGHT_STREAMS.dec()
+                stream_finished()
+                release_slot()
+                observe_stage("stream_total", time.perf_counter() - request_start)
         
         return StreamingResponse(
             generate_response(),
@@ -81,7 +175,69 @@ async def qa(req: QARequest):
                 "Connection": "keep-alive",
                 "Access-Control-Allow-Origin": "*",
                 "Access-Control-Allow-Headers": "*",
-            }
+                # Frames are already batched; stop nginx from buffering them further
+                "X-Accel-Buffering": "no",
+            },
+            # Frees the slot even if the client leaves before the stream starts
+            background=BackgroundTask(release_slot),
         )
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        release_slot()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/sessions", status_code=201)
+async def create_session(req: SessionRequest):
+    """
+    Start a server-side conversation session.
+
+    Args:
+        req: SessionRequest with optional history to seed the session
+
+    Returns:
+        The session ID to send with each /qa request, and its TTL in seconds
+    """
+    store = get_session_store()
+    session = await store.create([(hist.role, hist.content) for hist in req.history])
+    return {"session_id": session.id, "ttl": store.ttl}
+
+@router.get("/qa/sessions/stats")
+async def qa_session_stats():
+    """
+    Counters for server-side conversation sessions.
+    """
+    return get_session_store().get_stats()
+
+@router.get("/qa/cache/stats")
+async def qa_cache_stats():
+    """
+    Hit-rate counters for the answer cache.
+    """
+    return get_answer_cache().get_stats()
+
+@router.get("/qa/history/stats")
+async def qa_history_stats():
+    """
+    Counters for conversation history summarization.
+    """
+    return get_history_manager().get_stats()
+
+@router.get("/qa/coalesce/stats")
+async def qa_coalesce_stats():
+    """
+    Counters for requests that joined an identical in-flight question.
+    """
+    return get_request_coalescer().get_stats()
+
+@router.get("/qa/admission/stats")
+async def qa_admission_stats():
+    """
+    Slots in use, queue depth and shed counts for each concurrency limiter.
+    """
+    return get_admission_stats()
+
+@router.get("/qa/upstream/stats")
+async def qa_upstream_stats():
+    """
+    Calls, hedges, deadline cut-offs, observed p95 and circuit breaker state for each upstream.
+    """
+    return get_guard_stats()
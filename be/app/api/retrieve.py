@@ -0,0 +1,118 @@
+import os
+import hmac
+import time
+from fastapi import APIRouter, HTTPException, Header
+from pydantic import BaseModel, Field
+from app.services.embedding import aembedding_service_text
+from app.services.vectorstore import asearch_vectorstore
+from app.chains.qa_chain import qa_batch
+from app.util.admission import Overloaded
+
+# Bookkeeping keys the services add to chunk metadata; not part of the stored payload
+_INTERNAL_METADATA = ("_id", "_ids", "_score", "_coverage")
+
+class RetrieveRequest(BaseModel):
+    query: str
+    top_k: int = Field(default=5, ge=1, le=100)
+    similarity_threshold: float = 0.3
+    # Metadata filters served by the collection's payload indexes, e.g. {"sub_dir": "COMP1511"}
+    filters: dict[str, str | list[str]] | None = None
+
+class BatchQARequest(BaseModel):
+    questions: list[str] = Field(min_length=1)
+    top_k: int = Field(default=5, ge=1, le=50)
+    generate: bool = False
+    concurrency: int = Field(default=4, ge=1, le=16)
+    filters: dict[str, str | list[str]] | None = None
+
+router = APIRouter()
+
+def _check_token(token: str | None):
+    """
+    Retrieval and batch QA are evaluation tools: disabled unless EVAL_API_TOKEN is set.
+    """
+    expected = os.getenv("EVAL_API_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=403, detail="Evaluation API is disabled")
+    if not token or not hmac.compare_digest(token, expected):
+        raise HTTPException(status_code=401, detail="Invalid evaluation token")
+
+def _to_chunk(doc):
+    metadata = doc.metadata
+    return {
+        "id": metadata.get("_id"),
+        "score": metadata.get("_score"),
+        "page_content": doc.page_content,
+        "metadata": {key: value for key, value in metadata.items() if key not in _INTERNAL_METADATA},
+    }
+
+@router.post("/retrieve")
+async def retrieve(req: RetrieveRequest, x_eval_token: str | None = Header(default=None)):
+    """
+    Vector search only: the scored chunks the QA chain would start from, without generating an answer.
+
+    Args:
+        req: RetrieveRequest with the query, top_k, similarity threshold and optional filters
+        x_eval_token: Must match EVAL_API_TOKEN
+
+    Returns:
+        The query, its scored chunks and the time taken
+    """
+    _check_token(x_eval_token)
+    start = time.perf_counter()
+    try:
+        query_vector = await aembedding_service_text(req.query)
+        if query_vector is None:
+            raise HTTPException(status_code=502, detail="Failed to embed query")
+        docs = await asearch_vectorstore(query_vector, req.top_k, similarity_threshold=req.similarity_threshold,
+                                         filters=req.filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": e.retry_after_header()})
+    return {
+        "query": req.query,
+        "chunks": [_to_chunk(doc) for doc in docs],
+        "took_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+
+@router.post("/qa/batch")
+async def batch_qa(req: BatchQARequest, x_eval_token: str | None = Header(default=None)):
+    """
+    Answer many standalone questions in one request.
+
+    All questions are embedded in one batched call and searched with batched
+    vector queries; answers are generated only if requested, at most
+    `concurrency` at a time.
+
+    Args:
+        req: BatchQARequest with the questions and generation settings
+        x_eval_token: Must match EVAL_API_TOKEN
+
+    Returns:
+        One result per question with its context chunks and, if generated, answer or error
+    """
+    _check_token(x_eval_token)
+    max_questions = int(os.getenv("BATCH_QA_MAX_QUESTIONS", "1000"))
+    if len(req.questions) > max_questions:
+        raise HTTPException(status_code=413, detail=f"At most {max_questions} questions per batch")
+
+    start = time.perf_counter()
+    try:
+        results = await qa_batch(req.questions, top_k=req.top_k, generate=req.generate, concurrency=req.concurrency,
+                                 filters=req.filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": e.retry_after_header()})
+    except RuntimeError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+    items = []
+    for result in results:
+        item = {"question": result["question"], "chunks": [_to_chunk(doc) for doc in result["docs"]]}
+        for key in ("answer", "error"):
+            if key in result:
+                item[key] = result[key]
+        items.append(item)
+    return {"results": items, "took_ms": round((time.perf_counter() - start) * 1000, 1)}
@@ -1,11 +1,76 @@
-from app.services.embedding import embedding_service_text
-from app.services.vectorstore import search_vectorstore
+from app.services.embedding import aembedding_service_text, aembedding_service_texts
+import os
+import time
+import asyncio
+from app.services.hybrid_search import ahybrid_search, ahybrid_search_batch
+from app.services.lexical_index import is_lexical_index_enabled, lexical_search
+from app.services.rerank import rerank_documents, merge_adjacent_chunks, pack_context
 from app.services.llm import get_openai_llm
+from app.services.history import get_history_manager
+from app.services.answer_cache import get_answer_cache, is_answer_cache_enabled, replay_answer
+from app.util.metrics import time_stage, observe_stage, record_fallback, record_upstream_error, record_degraded
+from app.util.admission import Overloaded, get_limiter
+from app.util.resilience import get_guard
+from app.util.tokens import count_tokens
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
-def qa_chain(history, new_message, top_k=5):
+async def _no_content_generator(reason: str = "error"):
+    record_fallback(reason)
+    yield "Content not relevant"
+
+async def _timed_llm_stream(stream):
+    """
+    Pass the LLM stream through, recording time to first token and total stream time.
+    """
+    start = time.perf_counter()
+    first = True
+    try:
+        async for chunk in stream:
+            if first:
+                observe_stage("llm_first_token", time.perf_counter() - start)
+                first = False
+            yield chunk
+    except Exception:
+        record_upstream_error("openai_chat")
+        raise
+    finally:
+        observe_stage("llm_stream", time.perf_counter() - start)
+
+async def _limited_llm_stream(stream, prompt_tokens: int, max_tokens: int):
+    """
+    Hold an "llm" limiter slot for the whole stream. The TPM bucket is charged
+    for prompt + max_tokens up front and refunded what the answer did not use.
+    """
+    limiter = get_limiter("llm")
+    with time_stage("llm_queue"):
+        await limiter.acquire(prompt_tokens + max_tokens)
+    completion_tokens = 0
+    try:
+        async for chunk in stream:
+            completion_tokens += count_tokens(chunk)
+            yield chunk
+    finally:
+        limiter.release(max(0, max_tokens - completion_tokens))
+
+async def _lexical_candidates(query: str, top_k: int):
+    """
+    BM25-only retrieval for when the query could not be embedded in time.
+
+    Returns:
+        List of Documents, empty if the lexical index is disabled or has no match
+    """
+    if not is_lexical_index_enabled():
+        return []
+    try:
+        results = await asyncio.to_thread(lexical_search, query, top_k)
+    except Exception as e:
+        print(f"Error searching lexical index: {e}")
+        return []
+    return [doc for doc, _ in results]
+
+async def qa_chain(history, new_message, top_k=5, conversation_id=None):
     """
     Question-answering chain that retrieves relevant documents and generates responses.
     
@@ -13,91 +78,219 @@ def qa_chain(history, new_message, top_k=5):
         history: List of conversation history messages
         new_message: The new user message to process
         top_k: Number of top documents to retrieve
+        conversation_id: Optional stable conversation ID, keys the cached history summary
         
     Returns:
-        Async generator yielding response chunks
+        Async iterator yielding response chunks
+
+    Raises:
+        Overloaded: If an upstream limiter sheds the request
     """
     try:
-        # Build enhanced query by combining history context with new message
-        enhanced_query = new_message
-        
-        # Add recent history context to the query if available
-        if history and len(history) > 0:
-            # Get the last few messages for context
-            recent_messages = history[-3:]  # Last 3 messages
-            context_parts = []
-            for msg in recent_messages:
-                if hasattr(msg, 'content'):
-                    context_parts.append(msg.content)
+        history_manager = get_history_manager()
+
+        with time_stage("query_enhancement"):
+            # Build enhanced query by combining history context with new message
+            enhanced_query = new_message
             
-            if context_parts:
-                # Combine recent context with new message
-                enhanced_query = f"Context: {' '.join(context_parts)}. Question: {new_message}"
+            # Add recent history context to the query if available, capped in tokens
+            if history and len(history) > 0:
+                query_context = history_manager.query_context(history, max_messages=3)
+                if query_context:
+                    # Combine recent context with new message
+                    enhanced_query = f"Context: {query_context}. Question: {new_message}"
         
-                # Get query vector for similarity search using enhanced query
-        query_vector = embedding_service_text(enhanced_query)
+        # Get query vector for similarity search using enhanced query
+        with time_stage("embedding"):
+            query_vector = await aembedding_service_text(enhanced_query)
+        # Over-fetch candidates with dense + lexical search, lower threshold for better recall
+        overfetch = int(os.getenv("RETRIEVAL_OVERFETCH", "4"))
         if query_vector is None:
-            # If embedding fails, return "content irrelevant"
-            def no_content_generator():
-                yield "Content not relevant"
-            return no_content_generator()
-
-        # Retrieve relevant documents from vector store with lower threshold for better recall
-        docs = search_vectorstore(query_vector, top_k, similarity_threshold=0.3)
+            # Embedding failed, ran out of its deadline or its circuit is open:
+            # lexical results can still answer, and the answer cache still matches on chunk IDs
+            with time_stage("search"):
+                candidates = await _lexical_candidates(enhanced_query, top_k * overfetch)
+            if not candidates:
+                return _no_content_generator("embedding_failed")
+            record_degraded("embedding_unavailable")
+        else:
+            with time_stage("search"):
+                candidates = await ahybrid_search(enhanced_query, query_vector, top_k * overfetch, similarity_threshold=0.3)
         
         # Check if relevant documents were found
-        if not docs or len(docs) == 0:
-            def no_content_generator():
-                yield "Content not relevant"
-            return no_content_generator()
-        
-        # Build context from retrieved documents
-        context = "\n\n".join([doc.page_content for doc in docs])
-        
-        # Convert history to string format for prompt
-        history_text = ""
-        for msg in history:
-            if hasattr(msg, 'content'):
-                history_text += f"{msg.__class__.__name__}: {msg.content}\n"
-        
-        # Use custom prompt template with history
-        prompt_template = PromptTemplate(
-            input_variables=["context", "history", "question"],
-            template="""
-            You are a helpful assistant for question-answering tasks. 
-            Use the following pieces of retrieved context to provide a comprehensive and detailed answer to the question.
-            If you don't know the answer based on the provided context, just say that you don't know.
-            Provide thorough explanations and include relevant details from the context.
-            You can also use the conversation history to provide more contextual answers.
-            
-            History: {history}
-            Question: {question} 
-            Context: {context} 
-            Answer:"""
-        )
-        
-        # Get LLM instance
-        llm = get_openai_llm()
-        
-        # Build chain
-        chain = prompt_template | llm | StrOutputParser()
-        
-        # Return streaming output
-        return chain.astream({
-            "context": context,
-            "history": history_text,
-            "question": new_message
-        })
-        
+        if not candidates or len(candidates) == 0:
+            return _no_content_generator("no_documents")
+
+        with time_stage("rerank"):
+            docs = await select_context(enhanced_query, candidates, top_k)
+
+        return await answer_from_context(history, new_message, docs, query_vector, conversation_id)
+
+    except Overloaded:
+        # Surfaced to the client as a retryable error rather than a fallback answer
+        raise
     except Exception as e:
         print(f"Error in qa_chain: {e}")
         # Return "content irrelevant" on any error
-        def no_content_generator():
-            yield "Content not relevant"
-        return no_content_generator()
+        return _no_content_generator()
+
+async def select_context(query: str, candidates: list, top_k: int):
+    """
+    Re-rank candidates, merge neighbouring chunks and pack the best into the prompt token budget.
+
+    Returns:
+        List of Documents for the prompt, best first
+    """
+    reranked = await rerank_documents(query, candidates, top_n=top_k)
+    return pack_context(merge_adjacent_chunks(reranked), int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500")))
+
+async def answer_from_context(history, new_message, docs, query_vector=None, conversation_id=None):
+    """
+    Generate the answer for already retrieved context, through the answer cache.
+
+    Args:
+        history: List of conversation history messages, ending with the new message
+        new_message: The new user message
+        docs: Context Documents from select_context
+        query_vector: Query embedding, used by the semantic answer cache
+        conversation_id: Optional stable conversation ID, keys the cached history summary
+
+    Returns:
+        Async iterator yielding response chunks
+    """
+    history_manager = get_history_manager()
+    # Answers are only cached for standalone questions, where history cannot change the answer
+    cacheable = is_answer_cache_enabled() and len(history) <= 1
+    chunk_ids = [point_id for doc in docs for point_id in doc.metadata.get("_ids", [doc.metadata.get("_id")])]
+    if cacheable:
+        cached_answer = await get_answer_cache().lookup(new_message, chunk_ids, query_vector)
+        if cached_answer is not None:
+            return replay_answer(cached_answer)
     
+    prompt_start = time.perf_counter()
+
+    # Build context from retrieved documents
+    context = "\n\n".join([doc.page_content for doc in docs])
+    
+    # Convert history to string format for prompt: rolling summary plus recent turns
+    history_text = (await history_manager.compact(history, conversation_id)).to_text()
+    
+    # Use custom prompt template with history
+    prompt_template = PromptTemplate(
+        input_variables=["context", "history", "question"],
+        template="""
+        You are a helpful assistant for question-answering tasks. 
+        Use the following pieces of retrieved context to provide a comprehensive and detailed answer to the question.
+        If you don't know the answer based on the provided context, just say that you don't know.
+        Provide thorough explanations and include relevant details from the context.
+        You can also use the conversation history to provide more contextual answers.
+        
+        History: {history}
+        Question: {question} 
+        Context: {context} 
+        Answer:"""
+    )
+    
+    # Get LLM instance
+    llm = get_openai_llm()
+    
+    # Build chain
+    chain = prompt_template | llm | StrOutputParser()
+    observe_stage("prompt_build", time.perf_counter() - prompt_start)
+    
+    # Return streaming output, admitted through the LLM limiter
+    inputs = {
+        "context": context,
+        "history": history_text,
+        "question": new_message
+    }
+    stream = _limited_llm_stream(
+        # The first token must arrive within the request deadline and LLM_FIRST_TOKEN_TIMEOUT
+        get_guard("llm").guard_stream(_timed_llm_stream(chain.astream(inputs))),
+        count_tokens(prompt_template.format(**inputs)),
+        llm.max_tokens or 1024,
+    )
+    if cacheable:
+        return get_answer_cache().record(stream, new_message, chunk_ids, query_vector)
+    return stream
+
+
+async def aretrieve_batch(questions: list[str], top_k: int = 5, filters: dict | None = None):
+    """
+    Retrieve context for many standalone questions with one batched embeddings
+    call and batched vector searches.
+
+    Args:
+        questions: Questions to retrieve context for
+        top_k: Number of documents kept per question
+        filters: Optional metadata filters applied to every search
+
+    Returns:
+        List of (docs, query_vector) in question order
+
+    Raises:
+        Overloaded: If an upstream limiter sheds the batch
+        RuntimeError: If the questions cannot be embedded
+        ValueError: For a filter on an unindexed field
+    """
+    with time_stage("batch_embedding"):
+        query_vectors = await aembedding_service_texts(questions)
+    if query_vectors is None:
+        raise RuntimeError("Failed to embed questions")
+
+    overfetch = int(os.getenv("RETRIEVAL_OVERFETCH", "4"))
+    with time_stage("batch_search"):
+        candidates = await ahybrid_search_batch(questions, query_vectors, top_k * overfetch, similarity_threshold=0.3,
+                                                filters=filters)
+
+    with time_stage("rerank"):
+        contexts = await asyncio.gather(*[
+            select_context(question, docs, top_k) for question, docs in zip(questions, candidates)
+        ])
+    return list(zip(contexts, query_vectors))
 
+async def qa_batch(questions: list[str], top_k: int = 5, generate: bool = False, concurrency: int = 4,
+                   filters: dict | None = None):
+    """
+    Answer many standalone questions, e.g. for offline evaluation.
+
+    Retrieval is batched for all questions; answers, when requested, are
+    generated by at most `concurrency` LLM streams at a time. A question whose
+    answer fails gets an error instead of failing the batch.
+
+    Args:
+        questions: Questions to answer, each without history
+        top_k: Number of documents retrieved per question
+        generate: Whether to generate answers or only retrieve
+        concurrency: Maximum answers generated at once
+        filters: Optional metadata filters applied to every retrieval
+
+    Returns:
+        List of dicts with question, docs and, if generating, answer or error
+
+    Raises:
+        Overloaded: If an upstream limiter sheds the batch retrieval
+        ValueError: For a filter on an unindexed field
+    """
+    retrieved = await aretrieve_batch(questions, top_k, filters=filters)
+    results = [{"question": question, "docs": docs} for question, (docs, _) in zip(questions, retrieved)]
+    if not generate:
+        return results
 
+    semaphore = asyncio.Semaphore(concurrency)
 
+    async def generate_one(result, query_vector):
+        async with semaphore:
+            try:
+                if not result["docs"]:
+                    stream = _no_content_generator("no_documents")
+                else:
+                    question = result["question"]
+                    stream = await answer_from_context([HumanMessage(content=question)], question, result["docs"], query_vector)
+                result["answer"] = "".join([chunk async for chunk in stream])
+            except Exception as e:
+                print(f"Error answering batch question: {e}")
+                result["error"] = str(e)
 
-    
\ No newline at end of file
+    await asyncio.gather(*[generate_one(result, vector) for result, (_, vector) in zip(results, retrieved)])
+    return results
@@ -0,0 +1,4 @@
+from dotenv import load_dotenv
+
+# Load .env once for every config module
+load_dotenv()
@@ -1,8 +1,4 @@
 import os
-from dotenv import load_dotenv
-from langchain_openai import OpenAIEmbeddings
-
-load_dotenv()
 
 _embedding = None
 
@@ -11,26 +7,42 @@ def set_embedding():
     Initialize OpenAI embeddings with API key from environment variables.
     """
     global _embedding
+    from langchain_openai import OpenAIEmbeddings
+    from app.util.embedding_cache import CachedEmbeddings
+    from app.util.limited_embeddings import LimitedEmbeddings
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise Exception("OPENAI_API_KEY environment variable is not set")
+    model = "text-embedding-3-small"
     _embedding = OpenAIEmbeddings(
-        model="text-embedding-3-small",
-        api_key=api_key
+        model=model,
+        api_key=api_key,
+        # Ingestion's sync calls have no request deadline; this bounds each of them
+        timeout=float(os.getenv("OPENAI_EMBEDDING_TIMEOUT", "30")),
     )
+    # Only calls that reach OpenAI count against the concurrency and rate limits
+    _embedding = LimitedEmbeddings(_embedding)
+    if os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() in ("1", "true", "yes"):
+        # Identical texts are embedded once and then served from memory or disk
+        _embedding = CachedEmbeddings(
+            _embedding,
+            model_name=model,
+            memory_max_entries=int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "10000")),
+            disk_path=os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite") or None,
+        )
 
 def get_embedding():
     """
-    Get the initialized embedding instance.
+    Get the embedding instance, initializing it on first use.
     
     Returns:
-        OpenAIEmbeddings instance
+        OpenAIEmbeddings instance behind LimitedEmbeddings, wrapped in CachedEmbeddings when the cache is enabled
         
     Raises:
-        Exception: If embedding is not ready
+        Exception: If OPENAI_API_KEY is not set
     """
     if not is_embedding_ready():
-        raise Exception("Embedding is not ready")
+        set_embedding()
     return _embedding
 
 def is_embedding_ready():
@@ -41,5 +53,3 @@ def is_embedding_ready():
         bool: True if embedding is ready, False otherwise
     """
     return _embedding is not None
-
-set_embedding()
\ No newline at end of file
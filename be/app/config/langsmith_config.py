@@ -1,10 +1,4 @@
 import os
-from dotenv import load_dotenv
-from langsmith import Client
-from langchain.callbacks import LangChainTracer
-
-# Load environment variables
-load_dotenv()
 
 # Global variables
 _langsmith_client = None
@@ -19,6 +13,10 @@ def setup_langsmith():
     endpoint = os.getenv("LANGCHAIN_ENDPOINT")
     
     if api_key:
+        # Imported here so a process without tracing never loads the LangSmith client
+        from langsmith import Client
+        from langchain.callbacks import LangChainTracer
+
         # Directly use values loaded from .env, no need to reset
         _langsmith_client = Client(api_key=api_key, api_url=endpoint)
         _langsmith_tracer = LangChainTracer(project_name=project_name)
@@ -42,5 +40,3 @@ def get_langsmith_tracer():
 def is_langsmith_enabled():
     """Check if LangSmith is enabled"""
     return _langsmith_enabled
-
-setup_langsmith() 
\ No newline at end of file
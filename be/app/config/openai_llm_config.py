@@ -1,28 +1,28 @@
 import os
-from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-
-load_dotenv()
 
 # Global variables
 _openai_llm = None
 
 def setup_openai_llm():
     global _openai_llm
+    from langchain_openai import ChatOpenAI
     _openai_llm = ChatOpenAI(
         model="gpt-4o-mini",
         temperature=0.0,
         max_tokens=1024,
-        timeout=30,
-        max_retries=2,
+        # Client-side ceiling; requests are normally cut off sooner by the QA deadline
+        timeout=float(os.getenv("OPENAI_CHAT_TIMEOUT", "30")),
+        # Retries multiply load during an upstream 429 storm; admission control paces calls instead
+        max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "1")),
         api_key=os.getenv("OPENAI_API_KEY"),
         streaming=True,
     )
 
 def get_openai_llm():
+    # Normally created by the app lifespan; scripts get it on first use
+    if _openai_llm is None:
+        setup_openai_llm()
     return _openai_llm
 
 def is_openai_llm_ready():
     return _openai_llm is not None
-
-setup_openai_llm()
\ No newline at end of file
@@ -0,0 +1,111 @@
+import os
+import httpx
+
+# Global variables
+_qdrant_client = None
+_async_qdrant_client = None
+
+def _qdrant_client_kwargs():
+    """
+    Build connection arguments for Qdrant Cloud or a local Qdrant instance.
+    
+    Pooling is controlled by QDRANT_POOL_SIZE and QDRANT_KEEPALIVE_EXPIRY, and
+    QDRANT_PREFER_GRPC switches data-plane calls to gRPC.
+    
+    Returns:
+        dict of keyword arguments accepted by QdrantClient and AsyncQdrantClient
+    """
+    qdrant_url = os.getenv("QDRANT_URL")
+    qdrant_api_key = os.getenv("QDRANT_API_KEY")
+    pool_size = int(os.getenv("QDRANT_POOL_SIZE", "20"))
+    keepalive_expiry = float(os.getenv("QDRANT_KEEPALIVE_EXPIRY", "60"))
+    prefer_grpc = os.getenv("QDRANT_PREFER_GRPC", "false").lower() in ("1", "true", "yes")
+
+    if qdrant_url and qdrant_api_key:
+        # Use Qdrant Cloud
+        kwargs = {"url": qdrant_url, "api_key": qdrant_api_key}
+    else:
+        # Use local Qdrant
+        qdrant_host = os.getenv("QDRANT_HOST", "localhost")
+        kwargs = {"host": qdrant_host, "port": 6333, "check_compatibility": False}
+
+    kwargs["timeout"] = int(os.getenv("QDRANT_TIMEOUT", "10"))
+    if prefer_grpc:
+        # pool_size sizes the gRPC channel pool; qdrant-client rejects it together with limits
+        kwargs["prefer_grpc"] = True
+        kwargs["grpc_port"] = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+        kwargs["pool_size"] = pool_size
+    else:
+        kwargs["limits"] = httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=keepalive_expiry,
+        )
+    return kwargs
+
+def setup_qdrant():
+    """
+    Create the process-wide sync and async Qdrant clients.
+    """
+    global _qdrant_client, _async_qdrant_client
+    from qdrant_client import QdrantClient, AsyncQdrantClient
+    if _qdrant_client is None:
+        _qdrant_client = QdrantClient(**_qdrant_client_kwargs())
+    if _async_qdrant_client is None:
+        _async_qdrant_client = AsyncQdrantClient(**_qdrant_client_kwargs())
+
+def create_async_qdrant_client():
+    """
+    Create a separate async client with the shared settings.
+
+    Used by work that runs on its own event loop (e.g. ingestion), since the
+    pooled async client is bound to the serving loop.
+
+    Returns:
+        AsyncQdrantClient instance owned by the caller
+    """
+    from qdrant_client import AsyncQdrantClient
+    return AsyncQdrantClient(**_qdrant_client_kwargs())
+
+def get_qdrant_client():
+    """
+    Get the shared synchronous Qdrant client, creating it on first use.
+    
+    Returns:
+        QdrantClient instance
+    """
+    if _qdrant_client is None:
+        setup_qdrant()
+    return _qdrant_client
+
+def get_async_qdrant_client():
+    """
+    Get the shared async Qdrant client, creating it on first use.
+    
+    Returns:
+        AsyncQdrantClient instance
+    """
+    if _async_qdrant_client is None:
+        setup_qdrant()
+    return _async_qdrant_client
+
+def is_qdrant_ready():
+    return _qdrant_client is not None and _async_qdrant_client is not None
+
+async def close_qdrant():
+    """
+    Close both shared clients and release their pooled connections.
+    """
+    global _qdrant_client, _async_qdrant_client
+    if _qdrant_client is not None:
+        try:
+            _qdrant_client.close()
+        except Exception as e:
+            print(f"Error closing Qdrant client: {e}")
+        _qdrant_client = None
+    if _async_qdrant_client is not None:
+        try:
+            await _async_qdrant_client.close()
+        except Exception as e:
+            print(f"Error closing async Qdrant client: {e}")
+        _async_qdrant_client = None
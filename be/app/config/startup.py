@@ -0,0 +1,91 @@
+import os
+import time
+import asyncio
+
+_startup_report = None
+
+async def _timed(report: dict, name: str, step):
+    """
+    Run one startup step, recording its duration in milliseconds.
+
+    A failing step is reported and skipped; /readyz shows which clients are missing.
+    """
+    start = time.perf_counter()
+    try:
+        result = step()
+        if asyncio.iscoroutine(result):
+            await result
+    except Exception as e:
+        print(f"Startup step {name} failed: {e}")
+        report["errors"][name] = str(e)
+    report["steps_ms"][name] = round((time.perf_counter() - start) * 1000, 1)
+
+async def _warm_qdrant():
+    from app.config.qdrant_config import get_async_qdrant_client
+    # Opens a pooled connection (TLS included) so the first search does not pay for it
+    await get_async_qdrant_client().get_collections()
+
+def _prime_tokenizer():
+    from app.util.tokens import count_tokens
+    count_tokens("warm up")
+
+def _load_lexical_index():
+    from app.services.lexical_index import get_lexical_index, is_lexical_index_enabled
+    if is_lexical_index_enabled():
+        get_lexical_index()
+
+def _load_local_replica():
+    from app.services.local_replica import get_local_replica
+    get_local_replica()
+
+def _load_reranker():
+    from app.services.rerank import get_reranker
+    get_reranker()
+
+async def initialize_app(import_ms: float | None = None):
+    """
+    Create the process-wide clients once and warm them before traffic arrives.
+
+    Called from the FastAPI lifespan, so it runs once per worker process.
+    Client construction runs first; network and disk warm-ups then run
+    concurrently. Set STARTUP_WARMUP=false to skip the warm-ups.
+
+    Args:
+        import_ms: Time spent importing the application module, for the report
+
+    Returns:
+        dict startup report with per-step timings
+    """
+    global _startup_report
+    from app.config.langsmith_config import setup_langsmith
+    from app.config.openai_llm_config import setup_openai_llm
+    from app.config.embedding_config import set_embedding
+    from app.config.qdrant_config import setup_qdrant
+    from app.util.metrics import setup_metrics
+
+    start = time.perf_counter()
+    report = {"pid": os.getpid(), "import_ms": import_ms, "steps_ms": {}, "errors": {}}
+    await _timed(report, "langsmith", setup_langsmith)
+    await _timed(report, "llm", setup_openai_llm)
+    await _timed(report, "embedding", set_embedding)
+    await _timed(report, "qdrant", setup_qdrant)
+    await _timed(report, "metrics", setup_metrics)
+
+    if os.getenv("STARTUP_WARMUP", "true").lower() in ("1", "true", "yes"):
+        await asyncio.gather(
+            _timed(report, "qdrant_warmup", _warm_qdrant),
+            _timed(report, "tokenizer", lambda: asyncio.to_thread(_prime_tokenizer)),
+            _timed(report, "lexical_index", lambda: asyncio.to_thread(_load_lexical_index)),
+            _timed(report, "local_replica", lambda: asyncio.to_thread(_load_local_replica)),
+            _timed(report, "reranker", lambda: asyncio.to_thread(_load_reranker)),
+        )
+
+    report["startup_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    _startup_report = report
+    steps = ", ".join(f"{name} {ms}ms" for name, ms in report["steps_ms"].items())
+    imports = f"imports {import_ms:.1f}ms, " if import_ms is not None else ""
+    print(f"Startup finished in {report['startup_ms']}ms ({imports}{steps})")
+    return report
+
+def get_startup_report():
+    return _startup_report
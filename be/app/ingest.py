@@ -0,0 +1,95 @@
+"""
+Command-line ingestion entry point.
+
+    python -m app.ingest /path/to/corpus [--full] [--dry-run] [--include GLOB] [--exclude GLOB]
+    python -m app.ingest /path/to/corpus --reindex [--keep-old]
+    python -m app.ingest --export-replica
+    python -m app.ingest --setup-collection
+"""
+import argparse
+import json
+import os
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m app.ingest", description="Index a document directory into Qdrant")
+    parser.add_argument("root_dir", nargs="?", default=os.getenv("INGEST_ROOT_DIR"), help="Directory to ingest (default: INGEST_ROOT_DIR)")
+    parser.add_argument("--full", action="store_true", help="Re-embed every chunk instead of skipping unchanged files")
+    parser.add_argument("--dry-run", action="store_true", help="Only report which files would be indexed or removed")
+    parser.add_argument("--include", action="append", metavar="GLOB", help="Only ingest files matching this glob (repeatable)")
+    parser.add_argument("--exclude", action="append", metavar="GLOB", help="Skip files matching this glob (repeatable)")
+    parser.add_argument("--max-concurrency", type=int, default=4, help="Embedding requests in flight")
+    parser.add_argument("--upsert-concurrency", type=int, default=2, help="Parallel Qdrant upserts")
+    parser.add_argument("--read-workers", type=int, default=None, help="Reader processes (0 reads in threads)")
+    parser.add_argument("--manifest", default=None, help="Manifest path (default: INGEST_MANIFEST_PATH)")
+    parser.add_argument("--rebuild-lexical", action="store_true", help="Rebuild the BM25 index from Qdrant and exit")
+    parser.add_argument("--export-replica", action="store_true", help="Export the local search replica from Qdrant and exit")
+    parser.add_argument("--setup-collection", action="store_true",
+                        help="Create the collection and payload indexes, or apply the configured settings to it, and exit")
+    parser.add_argument("--reindex", action="store_true", help="Rebuild into a new collection and swap the alias when done")
+    parser.add_argument("--keep-old", action="store_true", help="With --reindex, keep the previous collection")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.rebuild_lexical:
+        from app.services.lexical_index import rebuild_lexical_index
+
+        print(f"Indexed {rebuild_lexical_index()} chunks into the lexical index")
+        return 0
+    if args.export_replica:
+        import asyncio
+        from app.config.qdrant_config import create_async_qdrant_client
+        from app.services.local_replica import export_local_replica
+
+        async def export():
+            client = create_async_qdrant_client()
+            try:
+                return await export_local_replica(client)
+            finally:
+                await client.close()
+
+        print(f"Exported {asyncio.run(export())} points into the local replica")
+        return 0
+    if args.setup_collection:
+        import asyncio
+        from app.config.qdrant_config import create_async_qdrant_client
+        from app.services.collection import ensure_collection
+        from app.services.vectorstore import COLLECTION_NAME
+
+        async def setup():
+            client = create_async_qdrant_client()
+            try:
+                return await ensure_collection(client, COLLECTION_NAME, update=True, as_alias=True)
+            finally:
+                await client.close()
+
+        print(f"Collection {asyncio.run(setup())} is set up")
+        return 0
+    if not args.root_dir:
+        raise SystemExit("root_dir is required (or set INGEST_ROOT_DIR)")
+    if not os.path.isdir(args.root_dir):
+        raise SystemExit(f"Directory not found: {args.root_dir}")
+
+    options = dict(
+        manifest_path=args.manifest,
+        include=args.include,
+        exclude=args.exclude,
+        dry_run=args.dry_run,
+        embed_concurrency=args.max_concurrency,
+        upsert_concurrency=args.upsert_concurrency,
+        read_workers=args.read_workers,
+    )
+    if args.reindex:
+        import asyncio
+        from app.services.collection import reindex_collection
+
+        stats = asyncio.run(reindex_collection(args.root_dir, keep_old=args.keep_old, **options)).to_dict()
+    else:
+        from app.services.vectorize_documents import embedding_service_file
+
+        stats = embedding_service_file(args.root_dir, incremental=not args.full, **options)
+    print(json.dumps(stats, indent=2))
+    return 0 if stats and stats["errors"] == 0 else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,10 +1,41 @@
+import time
+_import_start = time.perf_counter()
+
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from app.middleware.langsmith_middleware import LangSmithMiddleware
-from app.api import qa
+from app.api import qa, ingest, retrieve, health
+from app.config.qdrant_config import close_qdrant
+from app.config.startup import initialize_app
+from app.services.run_queue import close_run_queue
+from app.services.local_replica import is_local_replica_enabled, run_replica_refresher
+from app.util.lifecycle import install_drain_handler, start_draining, wait_for_streams
 import os
+import asyncio
+
+_import_ms = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create and warm the clients once per worker process, close them on shutdown
+    await initialize_app(import_ms=_import_ms)
+    install_drain_handler()
+    refresher = None
+    refresh_interval = float(os.getenv("LOCAL_REPLICA_REFRESH_SECONDS", "0"))
+    if is_local_replica_enabled() and refresh_interval > 0:
+        refresher = asyncio.create_task(run_replica_refresher(refresh_interval))
+    yield
+    if refresher is not None:
+        refresher.cancel()
+    # The server has already waited for open responses; this covers streams it gave up on
+    start_draining()
+    await wait_for_streams(float(os.getenv("GRACEFUL_TIMEOUT", "60")))
+    await close_qdrant()
+    # Flush queued LangSmith runs off the event loop
+    await asyncio.to_thread(close_run_queue)
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Secure CORS configuration
 allowed_origins = [
@@ -30,4 +61,8 @@ app.add_middleware(
 app.add_middleware(LangSmithMiddleware)
 
 app.include_router(qa.router, prefix="/api/v1")
+app.include_router(ingest.router, prefix="/api/v1")
+app.include_router(retrieve.router, prefix="/api/v1")
+app.include_router(health.router)
 
+_import_ms = (time.perf_counter() - _import_start) * 1000
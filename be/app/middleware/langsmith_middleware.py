@@ -1,53 +1,68 @@
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from app.config.langsmith_config import get_langsmith_client, is_langsmith_enabled, _langsmith_tracer
 import time
-import json
+from app.services.run_queue import get_run_queue
 
-class LangSmithMiddleware(BaseHTTPMiddleware):
+# Request bodies beyond this size are not kept for tracing
+MAX_TRACED_BODY_BYTES = 64 * 1024
+
+class LangSmithMiddleware:
+    """
+    Pure ASGI tracing middleware for the chat API.
+
+    The request body is copied as it streams past rather than buffered up
+    front, the response is observed message by message so the run ends when
+    the last byte of the stream is sent, and the finished record goes onto
+    the bounded RunQueue. Nothing on the request path does network I/O.
+    """
     def __init__(self, app):
-        super().__init__(app)
-    
-    async def dispatch(self, request: Request, call_next):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] != "/api/v1/qa" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        run_queue = get_run_queue()
+        if run_queue is None:
+            await self.app(scope, receive, send)
+            return
+
         start_time = time.time()
-        
-        # Only trace chat API
-        if request.url.path == "/api/v1/qa" and request.method == "POST":
-            if is_langsmith_enabled():
-                try:
-                    body = await request.body()
-                    request_data = json.loads(body)
-                    
-                    client = get_langsmith_client()
-                    if client:
-                        run = client.create_run(
-                            project_name=_langsmith_tracer.project_name,
-                            name="qa_request",
-                            inputs={
-                                "history": request_data.get("history", []),
-                                "new_message": request_data.get("new_message", "")
-                            },
-                            start_time=start_time
-                        )
-                        request.state.langsmith_run_id = run.id
-                        
-                except Exception as e:
-                    print(f"Error logging to LangSmith: {e}")
-        
-        response = await call_next(request)
-        
-        # Update run record
-        if hasattr(request.state, 'langsmith_run_id'):
-            if is_langsmith_enabled():
-                try:
-                    client = get_langsmith_client()
-                    if client:
-                        client.update_run(
-                            run_id=request.state.langsmith_run_id,
-                            end_time=time.time(),
-                            outputs={"duration": time.time() - start_time}
-                        )
-                except Exception as e:
-                    print(f"Error updating LangSmith run: {e}")
-        
-        return response 
\ No newline at end of file
+        body = []
+        body_size = 0
+        state = {"status": None, "first_byte": None, "bytes": 0}
+
+        async def traced_receive():
+            nonlocal body_size
+            message = await receive()
+            if message["type"] == "http.request" and body_size < MAX_TRACED_BODY_BYTES:
+                chunk = message.get("body", b"")
+                body.append(chunk)
+                body_size += len(chunk)
+            return message
+
+        async def traced_send(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                chunk = message.get("body", b"")
+                if chunk and state["first_byte"] is None:
+                    state["first_byte"] = time.time()
+                state["bytes"] += len(chunk)
+            await send(message)
+
+        error = None
+        try:
+            await self.app(scope, traced_receive, traced_send)
+        except BaseException as e:
+            error = repr(e)
+            raise
+        finally:
+            # Runs after the last body message (or a client disconnect), i.e. the true end of the stream
+            run_queue.submit({
+                "body": b"".join(body) if body_size <= MAX_TRACED_BODY_BYTES else b"",
+                "start_time": start_time,
+                "first_byte_time": state["first_byte"],
+                "end_time": time.time(),
+                "status_code": state["status"],
+                "response_bytes": state["bytes"],
+                "error": error,
+            })
@@ -0,0 +1,204 @@
+# answer_cache.py
+import os
+import re
+import json
+import time
+import hashlib
+import asyncio
+import numpy as np
+from app.util.shared_store import create_store
+
+_answer_cache = None
+
+def normalize_question(text: str):
+    """
+    Normalize a question so trivially different phrasings share a cache key.
+
+    Args:
+        text: Raw user question
+
+    Returns:
+        Lowercased question with collapsed whitespace and no trailing punctuation
+    """
+    text = re.sub(r"\s+", " ", text.strip().lower())
+    return text.rstrip("?!. ")
+
+def make_exact_key(question: str, chunk_ids: list):
+    """
+    Build the exact-match key from the normalized question and retrieved chunk IDs.
+    """
+    raw = json.dumps([normalize_question(question), [str(i) for i in chunk_ids]])
+    return "answer:" + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class SemanticIndex:
+    """
+    Bounded in-process index of query vectors pointing at exact cache keys.
+    """
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._keys = []
+        self._vectors = None
+
+    def add(self, vector: list[float], key: str):
+        vec = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        if norm == 0:
+            return
+        vec = (vec / norm)[None, :]
+        if key in self._keys:
+            self.remove(key)
+        self._vectors = vec if self._vectors is None else np.vstack([self._vectors, vec])
+        self._keys.append(key)
+        if len(self._keys) > self.max_entries:
+            # Oldest entries are evicted first
+            self._keys = self._keys[1:]
+            self._vectors = self._vectors[1:]
+
+    def remove(self, key: str):
+        if key not in self._keys:
+            return
+        idx = self._keys.index(key)
+        del self._keys[idx]
+        self._vectors = np.delete(self._vectors, idx, axis=0) if self._keys else None
+
+    def nearest(self, vector: list[float], max_distance: float):
+        """
+        Find the cached key whose vector is closest to the query.
+
+        Returns:
+            Matching key, or None if nothing is within max_distance cosine distance
+        """
+        if self._vectors is None:
+            return None
+        vec = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        if norm == 0:
+            return None
+        scores = self._vectors @ (vec / norm)
+        idx = int(np.argmax(scores))
+        if 1.0 - float(scores[idx]) <= max_distance:
+            return self._keys[idx]
+        return None
+
+class AnswerCache:
+    """
+    Two-level answer cache: exact question + chunk IDs, then optional semantic match.
+    """
+    def __init__(self, backend, ttl: float = 86400, semantic_distance: float = 0.0, semantic_max_entries: int = 1000):
+        self.backend = backend
+        self.ttl = ttl
+        self.semantic_distance = semantic_distance
+        self.semantic_index = SemanticIndex(semantic_max_entries)
+        self.stats = {"lookups": 0, "exact_hits": 0, "semantic_hits": 0, "misses": 0, "stores": 0, "errors": 0}
+
+    async def lookup(self, question: str, chunk_ids: list, query_vector: list[float] | None = None):
+        """
+        Look up a cached answer.
+
+        Args:
+            question: The user question
+            chunk_ids: IDs of the retrieved chunks, in rank order
+            query_vector: Query embedding used for the semantic level
+
+        Returns:
+            Cached answer text, or None on a miss
+        """
+        self.stats["lookups"] += 1
+        try:
+            entry = await self.backend.get(make_exact_key(question, chunk_ids))
+            if entry is not None:
+                self.stats["exact_hits"] += 1
+                return entry["answer"]
+
+            if self.semantic_distance > 0 and query_vector is not None:
+                key = self.semantic_index.nearest(query_vector, self.semantic_distance)
+                if key is not None:
+                    entry = await self.backend.get(key)
+                    if entry is not None:
+                        self.stats["semantic_hits"] += 1
+                        return entry["answer"]
+                    # Expired or evicted from the backend
+                    self.semantic_index.remove(key)
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"Error reading answer cache: {e}")
+        self.stats["misses"] += 1
+        return None
+
+    async def store(self, question: str, chunk_ids: list, answer: str, query_vector: list[float] | None = None):
+        """
+        Store a fully generated answer under both lookup levels.
+        """
+        key = make_exact_key(question, chunk_ids)
+        try:
+            await self.backend.set(key, {"answer": answer, "created_at": time.time()}, self.ttl)
+            if self.semantic_distance > 0 and query_vector is not None:
+                self.semantic_index.add(query_vector, key)
+            self.stats["stores"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"Error writing answer cache: {e}")
+
+    async def record(self, stream, question: str, chunk_ids: list, query_vector: list[float] | None = None):
+        """
+        Pass an answer stream through unchanged and cache it once it completes.
+
+        Streams that are cancelled or fail part-way are not cached.
+        """
+        parts = []
+        async for chunk in stream:
+            parts.append(chunk)
+            yield chunk
+        answer = "".join(parts)
+        if answer:
+            await self.store(question, chunk_ids, answer, query_vector)
+
+    def get_stats(self):
+        """
+        Hit-rate counters for the cache.
+
+        Returns:
+            dict of counters plus the overall hit rate
+        """
+        hits = self.stats["exact_hits"] + self.stats["semantic_hits"]
+        lookups = self.stats["lookups"]
+        return {**self.stats, "hit_rate": round(hits / lookups, 4) if lookups else 0.0}
+
+async def replay_answer(answer: str):
+    """
+    Replay a cached answer as a stream of word-sized chunks, like the LLM stream.
+    """
+    for piece in re.findall(r"\S+\s*|\s+", answer):
+        yield piece
+        await asyncio.sleep(0)
+
+def set_answer_cache(backend=None):
+    """
+    Initialize the answer cache from environment variables.
+
+    Args:
+        backend: Optional backend instance to plug in instead of the configured one
+    """
+    global _answer_cache
+    max_entries = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+    if backend is None:
+        # Falls back to the shared store settings, so one Redis serves every worker
+        backend = create_store(
+            os.getenv("ANSWER_CACHE_BACKEND"),
+            os.getenv("ANSWER_CACHE_REDIS_URL"),
+            max_entries=max_entries,
+        )
+    _answer_cache = AnswerCache(
+        backend,
+        ttl=float(os.getenv("ANSWER_CACHE_TTL", "86400")),
+        semantic_distance=float(os.getenv("ANSWER_CACHE_SEMANTIC_DISTANCE", "0")),
+        semantic_max_entries=max_entries,
+    )
+
+def is_answer_cache_enabled():
+    return os.getenv("ANSWER_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+def get_answer_cache():
+    if _answer_cache is None:
+        set_answer_cache()
+    return _answer_cache
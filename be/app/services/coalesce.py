@@ -0,0 +1,181 @@
+# coalesce.py
+import os
+import json
+import time
+import uuid
+import asyncio
+import hashlib
+from collections import OrderedDict
+from app.services.answer_cache import normalize_question
+
+_coalescer = None
+
+def make_flight_key(question: str, history: list):
+    """
+    Key shared by requests that would produce the same answer.
+
+    Args:
+        question: The new user message
+        history: Earlier (role, content) pairs of the conversation
+
+    Returns:
+        Hex digest of the normalized question and the exact history
+    """
+    raw = json.dumps([normalize_question(question), [[role, content] for role, content in history]])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class _Flight:
+    """
+    One running answer stream and the chunks it has produced so far.
+    """
+    def __init__(self):
+        self.id = uuid.uuid4().hex[:16]
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self.task = None
+        self._changed = asyncio.Event()
+
+    def publish(self, chunk: str):
+        self.chunks.append(chunk)
+        self.notify()
+
+    def notify(self):
+        # Wake everyone waiting on the current event, later waiters get a fresh one
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+class RequestCoalescer:
+    """
+    Single-flight deduplication of identical concurrent questions.
+
+    The first request for a key starts the answer pipeline in a background
+    task; requests with the same key arriving while it runs subscribe to it
+    instead of starting their own. Every subscriber first gets the chunks
+    already emitted, then the rest as they arrive.
+
+    Flights also make streams resumable: a flight keeps running for
+    resume_window seconds after its last subscriber disconnects, and a
+    finished flight is kept that long for a client reconnecting with its
+    ID, so the reconnect replays the same answer instead of a new one.
+
+    Flights are per process; each worker coalesces its own requests.
+
+    Args:
+        resume_window: Seconds an abandoned or finished flight stays available to resume
+        max_finished: Finished flights kept for resumption
+    """
+    def __init__(self, resume_window: float = 15.0, max_finished: int = 256):
+        self.resume_window = resume_window
+        self.max_finished = max_finished
+        self._flights = {}
+        self._finished = OrderedDict()
+        self.stats = {"flights": 0, "coalesced": 0, "resumed": 0, "cancelled": 0}
+
+    def stream(self, key: str, start, resume_id: str | None = None):
+        """
+        Stream the answer for key, joining a running flight when there is one.
+
+        Args:
+            key: Flight key from make_flight_key
+            start: Callable returning the answer stream, called only by the first requester
+            resume_id: Flight ID a reconnecting client last streamed from
+
+        Returns:
+            (flight ID, async iterator of answer chunks, whether an existing flight was joined);
+            a different ID than resume_id means a new answer
+        """
+        flight = self._flights.get(key)
+        if flight is None and resume_id:
+            flight = self._get_finished(key, resume_id)
+            if flight is not None:
+                self.stats["resumed"] += 1
+        joined = flight is not None
+        if flight is None:
+            flight = _Flight()
+            self._flights[key] = flight
+            flight.task = asyncio.create_task(self._run(key, flight, start))
+            self.stats["flights"] += 1
+        elif flight.id != resume_id:
+            self.stats["coalesced"] += 1
+        # Counted now rather than on first iteration, so a slow first reader cannot let the flight be cancelled
+        flight.subscribers += 1
+        return flight.id, self._subscribe(flight), joined
+
+    def is_in_flight(self, key: str):
+        return key in self._flights
+
+    def _get_finished(self, key: str, flight_id: str):
+        entry = self._finished.get(key)
+        if entry is None:
+            return None
+        expires_at, flight = entry
+        if expires_at < time.monotonic():
+            del self._finished[key]
+            return None
+        return flight if flight.id == flight_id else None
+
+    def _keep_finished(self, key: str, flight: _Flight):
+        if self.resume_window <= 0 or flight.error is not None:
+            return
+        self._finished[key] = (time.monotonic() + self.resume_window, flight)
+        self._finished.move_to_end(key)
+        while len(self._finished) > self.max_finished:
+            self._finished.popitem(last=False)
+
+    def _cancel_if_abandoned(self, flight: _Flight):
+        if flight.subscribers == 0 and not flight.done:
+            self.stats["cancelled"] += 1
+            flight.task.cancel()
+
+    async def _run(self, key: str, flight: _Flight, start):
+        try:
+            stream = start()
+            async for chunk in stream:
+                flight.publish(chunk)
+        except asyncio.CancelledError:
+            flight.error = asyncio.CancelledError()
+            raise
+        except Exception as e:
+            flight.error = e
+        finally:
+            flight.done = True
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            self._keep_finished(key, flight)
+            flight.notify()
+
+    async def _subscribe(self, flight: _Flight):
+        sent = 0
+        try:
+            while True:
+                changed = flight._changed
+                while sent < len(flight.chunks):
+                    yield flight.chunks[sent]
+                    sent += 1
+                if flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                if changed is not flight._changed:
+                    # New chunks arrived while the last one was being sent
+                    continue
+                await changed.wait()
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                # Give a dropped client the resume window to reconnect before cancelling
+                asyncio.get_running_loop().call_later(self.resume_window, self._cancel_if_abandoned, flight)
+
+    def get_stats(self):
+        return {**self.stats, "in_flight": len(self._flights)}
+
+def is_coalescing_enabled():
+    return os.getenv("QA_COALESCE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+def get_request_coalescer():
+    global _coalescer
+    if _coalescer is None:
+        _coalescer = RequestCoalescer(resume_window=float(os.getenv("QA_RESUME_WINDOW", "15")))
+    return _coalescer
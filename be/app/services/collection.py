@@ -0,0 +1,234 @@
+# collection.py
+import os
+import time
+import asyncio
+import tempfile
+
+# Keyword indexes backing search filters; filter keys are these fields without the "metadata." prefix
+PAYLOAD_INDEXES = ("metadata.sub_dir", "metadata.rel_filepath", "metadata.file")
+FILTER_FIELDS = tuple(field.split(".", 1)[1] for field in PAYLOAD_INDEXES)
+
+def _env_flag(name: str, default: str):
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+def collection_settings():
+    """
+    Collection configuration from environment settings.
+
+    Returns:
+        dict of keyword arguments for create_collection, without the collection name
+    """
+    from qdrant_client import models
+    quantization = None
+    if os.getenv("QDRANT_QUANTIZATION", "scalar").lower() == "scalar":
+        # int8 codes stay in RAM for the search itself; originals on disk are read only for rescoring
+        quantization = models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+            type=models.ScalarType.INT8,
+            quantile=float(os.getenv("QDRANT_QUANTIZATION_QUANTILE", "0.99")),
+            always_ram=True,
+        ))
+    return {
+        "vectors_config": models.VectorParams(
+            size=int(os.getenv("EMBEDDING_DIM", "1536")),
+            distance=models.Distance.COSINE,
+            on_disk=_env_flag("QDRANT_VECTORS_ON_DISK", "true"),
+        ),
+        "hnsw_config": models.HnswConfigDiff(
+            m=int(os.getenv("QDRANT_HNSW_M", "16")),
+            ef_construct=int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "100")),
+        ),
+        "quantization_config": quantization,
+        "on_disk_payload": _env_flag("QDRANT_PAYLOAD_ON_DISK", "true"),
+    }
+
+async def resolve_collection(client, name: str):
+    """
+    Find the physical collection behind a name.
+
+    Returns:
+        (collection name, whether name is an alias), or (None, False) if neither exists
+    """
+    aliases = await client.get_aliases()
+    for alias in aliases.aliases:
+        if alias.alias_name == name:
+            return alias.collection_name, True
+    if await client.collection_exists(name):
+        return name, False
+    return None, False
+
+def versioned_name(alias: str):
+    return f"{alias}-{time.strftime('%Y%m%d%H%M%S')}"
+
+async def ensure_collection(client, name: str, update: bool = False, as_alias: bool = False):
+    """
+    Create the collection if it does not exist and make sure its payload indexes do.
+
+    Safe to call on every ingestion run: an existing collection (or the
+    collection an alias points to) is left as it is, apart from missing
+    payload indexes. With update, its HNSW, quantization and on-disk
+    settings are also brought in line with the environment; Qdrant then
+    rebuilds the affected structures in the background.
+
+    Args:
+        client: AsyncQdrantClient
+        name: Collection or alias name
+        update: Apply the configured settings to an existing collection
+        as_alias: Create a missing collection under a versioned name with name as its alias,
+            so it can later be reindexed without downtime
+
+    Returns:
+        Name of the physical collection
+    """
+    from qdrant_client import models
+    settings = collection_settings()
+    collection, _ = await resolve_collection(client, name)
+    if collection is None:
+        collection = versioned_name(name) if as_alias else name
+        await client.create_collection(collection, **settings)
+        if as_alias:
+            await swap_alias(client, name, collection)
+        print(f"Created collection {collection}" + (f" as {name}" if as_alias else ""))
+    elif update:
+        await client.update_collection(
+            collection,
+            vectors_config={"": models.VectorParamsDiff(on_disk=settings["vectors_config"].on_disk)},
+            hnsw_config=settings["hnsw_config"],
+            quantization_config=settings["quantization_config"] or models.Disabled.DISABLED,
+        )
+        print(f"Updated collection {collection} settings")
+
+    info = await client.get_collection(collection)
+    existing = set((info.payload_schema or {}).keys())
+    for field in PAYLOAD_INDEXES:
+        if field not in existing:
+            await client.create_payload_index(collection, field_name=field,
+                                              field_schema=models.PayloadSchemaType.KEYWORD, wait=True)
+            print(f"Created payload index {field} on {collection}")
+    return collection
+
+def build_filter(filters: dict | None):
+    """
+    Turn {"sub_dir": "COMP1511", "file": ["a.md", "b.md"]} into a Qdrant filter.
+
+    A list matches any of its values; several keys must all match.
+
+    Raises:
+        ValueError: For a key without a payload index, which Qdrant would answer with a full scan
+
+    Returns:
+        models.Filter, or None for no filters
+    """
+    if not filters:
+        return None
+    from qdrant_client import models
+    conditions = []
+    for key, value in filters.items():
+        if key not in FILTER_FIELDS:
+            raise ValueError(f"Unsupported filter {key!r}, expected one of {', '.join(FILTER_FIELDS)}")
+        match = models.MatchAny(any=list(value)) if isinstance(value, (list, tuple)) else models.MatchValue(value=value)
+        conditions.append(models.FieldCondition(key=f"metadata.{key}", match=match))
+    return models.Filter(must=conditions)
+
+def matches_filters(metadata: dict, filters: dict | None):
+    """
+    Apply the same filters to a chunk's metadata, for results not served by Qdrant.
+    """
+    for key, value in (filters or {}).items():
+        allowed = value if isinstance(value, (list, tuple)) else (value,)
+        if metadata.get(key) not in allowed:
+            return False
+    return True
+
+async def swap_alias(client, alias: str, collection: str):
+    """
+    Point alias at collection in one atomic operation.
+
+    A collection still using the alias's name (one created before
+    ingestion started creating aliased collections) is deleted first, so
+    that first migration leaves a short window in which searches find
+    nothing; every later swap is atomic.
+
+    Returns:
+        The collection the alias pointed to before, or None
+    """
+    from qdrant_client import models
+    previous, is_alias = await resolve_collection(client, alias)
+    operations = []
+    if previous is not None and is_alias:
+        operations.append(models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=alias)))
+    elif previous is not None:
+        print(f"Replacing collection {alias} with an alias; searches fail until the alias exists")
+        await client.delete_collection(alias)
+        previous = None
+    operations.append(models.CreateAliasOperation(
+        create_alias=models.CreateAlias(collection_name=collection, alias_name=alias)
+    ))
+    await client.update_collection_aliases(change_aliases_operations=operations)
+    return previous
+
+async def reindex_collection(root_dir: str, keep_old: bool = False, client=None, **options):
+    """
+    Rebuild the collection from root_dir without taking search offline.
+
+    Everything is ingested into a new collection while the alias keeps
+    serving the current one; only a complete run is switched in, by
+    swapping the alias. The lexical index and the local replica are then
+    rebuilt from the new collection, and the old one is deleted unless
+    keep_old is set. The new collection holds root_dir only, whatever
+    other directories were ingested into the old one.
+
+    Args:
+        root_dir: Directory to ingest
+        keep_old: Keep the previous collection, e.g. to swap back
+        client: AsyncQdrantClient, owned by the caller; a new one is created otherwise
+        **options: IngestPipeline settings
+
+    Returns:
+        IngestStats of the ingestion into the new collection
+    """
+    from app.config.qdrant_config import create_async_qdrant_client
+    from app.services.ingest_pipeline import run_ingestion
+    from app.services.lexical_index import is_lexical_index_enabled, rebuild_lexical_index
+    from app.services.local_replica import export_local_replica, is_local_replica_enabled
+    from app.services.vectorstore import COLLECTION_NAME
+    from app.util.ingest_manifest import DEFAULT_MANIFEST_PATH, load_manifest, save_manifest
+
+    manifest_path = options.pop("manifest_path", None) or os.getenv("INGEST_MANIFEST_PATH", DEFAULT_MANIFEST_PATH)
+    options.pop("incremental", None)
+    if options.get("dry_run"):
+        # Every file would be indexed again; report that without creating anything
+        with tempfile.TemporaryDirectory() as scratch:
+            return await run_ingestion(root_dir, incremental=False, manifest_path=os.path.join(scratch, "manifest.json"),
+                                       **options)
+
+    owns_client = client is None
+    client = client or create_async_qdrant_client()
+    new_collection = versioned_name(COLLECTION_NAME)
+    try:
+        await ensure_collection(client, new_collection)
+        # The new collection starts empty, so its files are tracked in a manifest of their own
+        with tempfile.TemporaryDirectory() as scratch:
+            staging_manifest = os.path.join(scratch, "manifest.json")
+            stats = await run_ingestion(root_dir, incremental=False, manifest_path=staging_manifest, client=client,
+                                        collection_name=new_collection, **options)
+            if stats.errors:
+                print(f"Reindex had {stats.errors} errors; {COLLECTION_NAME} still serves the previous collection")
+                await client.delete_collection(new_collection)
+                return stats
+            previous = await swap_alias(client, COLLECTION_NAME, new_collection)
+            print(f"Alias {COLLECTION_NAME} now points to {new_collection}")
+
+            # The collection now holds root_dir only, so other roots' entries no longer apply
+            save_manifest(load_manifest(staging_manifest), manifest_path)
+
+        if is_lexical_index_enabled():
+            await asyncio.to_thread(rebuild_lexical_index)
+        if is_local_replica_enabled():
+            await export_local_replica(client)
+        if previous is not None and not keep_old:
+            await client.delete_collection(previous)
+            print(f"Deleted previous collection {previous}")
+        return stats
+    finally:
+        if owns_client:
+            await client.close()
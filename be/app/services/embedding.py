@@ -1,4 +1,7 @@
 from app.config.embedding_config import get_embedding, is_embedding_ready
+from app.util.metrics import record_upstream_error
+from app.util.admission import Overloaded
+from app.util.resilience import CircuitOpen
 import os
 
 def embedding_service_text(text: str):
@@ -18,6 +21,54 @@ def embedding_service_text(text: str):
         print(f"Error embedding text: {e}")
         return None
 
+async def aembedding_service_text(text: str):
+    """
+    Generate embedding vector for a given text without blocking the event loop.
+    
+    Args:
+        text: The text to embed
+        
+    Returns:
+        List of floats representing the embedding vector, or None if error, including
+        a spent deadline or an open circuit breaker
 
+    Raises:
+        Overloaded: If the embeddings limiter sheds the call
+    """
+    try:
+        vector = await get_embedding().aembed_query(text)
+        return vector
+    except Overloaded:
+        # Shedding is reported to the client, not treated as an embedding failure
+        raise
+    except CircuitOpen:
+        # The breaker has already counted the failures that opened it
+        return None
+    except Exception as e:
+        print(f"Error embedding text: {e}")
+        record_upstream_error("openai_embeddings")
+        return None
 
+async def aembedding_service_texts(texts: list[str]):
+    """
+    Generate embedding vectors for many texts in batched calls.
+    
+    Args:
+        texts: The texts to embed
+        
+    Returns:
+        List of embedding vectors in input order, or None if error
 
+    Raises:
+        Overloaded: If the embeddings limiter sheds the call
+    """
+    try:
+        return await get_embedding().aembed_documents(texts)
+    except Overloaded:
+        raise
+    except CircuitOpen:
+        return None
+    except Exception as e:
+        print(f"Error embedding texts: {e}")
+        record_upstream_error("openai_embeddings")
+        return None
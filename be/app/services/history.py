@@ -0,0 +1,313 @@
+# history.py
+import os
+import asyncio
+import hashlib
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from app.util.admission import Overloaded, get_limiter
+from app.util.resilience import CircuitOpen, get_guard
+from app.util.tokens import count_tokens, truncate_tokens
+from app.util.shared_store import create_store
+
+_history_manager = None
+
+# Messages that key the summary of a conversation sent without an ID: the first two exchanges
+ANON_KEY_MESSAGES = 4
+
+SUMMARY_PROMPT = """Update the running summary of a conversation between a student and a course assistant.
+Keep facts, names, course codes and open questions; drop pleasantries. Answer with the summary only.
+
+Current summary:
+{summary}
+
+New messages:
+{messages}
+
+Updated summary:"""
+
+def _role(msg):
+    if isinstance(msg, HumanMessage):
+        return "User"
+    if isinstance(msg, AIMessage):
+        return "Assistant"
+    if isinstance(msg, SystemMessage):
+        return "System"
+    return msg.__class__.__name__
+
+def _fingerprint(messages):
+    digest = hashlib.sha256()
+    for msg in messages:
+        digest.update(_role(msg).encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(str(msg.content).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+class CompactedHistory:
+    """
+    Bounded view of a conversation: a rolling summary of older turns plus
+    the most recent messages verbatim.
+    """
+    def __init__(self, summary: str, recent: list, tokens: int):
+        self.summary = summary
+        self.recent = recent
+        self.tokens = tokens
+
+    def to_text(self):
+        lines = []
+        if self.summary:
+            lines.append(f"Summary of earlier conversation: {self.summary}")
+        for msg in self.recent:
+            lines.append(f"{msg.__class__.__name__}: {msg.content}")
+        return "\n".join(lines) + ("\n" if lines else "")
+
+class ConversationWindow(list):
+    """
+    The retained tail of a server-side conversation session.
+
+    Holds the messages from index `offset` of the conversation on, with the
+    token count of each message's prompt line precomputed, so compacting
+    it neither re-counts nor re-hashes the whole conversation every turn.
+    Messages before `offset` are already folded into the rolling summary.
+    """
+    def __init__(self, messages: list, offset: int = 0, token_counts: list[int] | None = None):
+        super().__init__(messages)
+        self.offset = offset
+        self.token_counts = token_counts
+
+class _SummaryState:
+    def __init__(self, count: int, fingerprint: str, summary: str):
+        self.count = count
+        self.fingerprint = fingerprint
+        self.summary = summary
+
+    def to_dict(self):
+        return {"count": self.count, "fingerprint": self.fingerprint, "summary": self.summary}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(data["count"], data["fingerprint"], data["summary"])
+
+class HistoryManager:
+    """
+    Token-aware conversation history compaction.
+
+    The last keep_turns turns are kept verbatim; older messages are folded
+    into a rolling summary that is cached per conversation and extended
+    incrementally in the background, so a new message never waits on the
+    summarizer. Both the prompt history and the retrieval query are hard
+    capped in tokens. Summaries live in a key/value store, so with a shared
+    store every worker sees the same summary.
+
+    Args:
+        keep_turns: Number of recent user/assistant turns kept verbatim
+        max_history_tokens: Hard cap on the history placed in the prompt
+        max_query_tokens: Hard cap on the history context added to the retrieval query
+        max_summary_tokens: Hard cap on the rolling summary
+        cache_size: Number of conversation summaries kept by the default in-memory store
+        cache_ttl: Seconds an unused summary is kept
+        summarize: Optional async callable(summary, messages) -> str, defaults to the chat LLM
+        store: Optional key/value store for summaries, defaults to an in-memory store
+    """
+    def __init__(self, keep_turns: int = 3, max_history_tokens: int = 1000, max_query_tokens: int = 200,
+                 max_summary_tokens: int = 300, cache_size: int = 1000, cache_ttl: float = 3600.0, summarize=None,
+                 store=None):
+        self.keep_turns = keep_turns
+        self.max_history_tokens = max_history_tokens
+        self.max_query_tokens = max_query_tokens
+        self.max_summary_tokens = max_summary_tokens
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._summarize = summarize or self._llm_summarize
+        self.store = store if store is not None else create_store("memory", max_entries=cache_size)
+        self._pending = {}
+        self.stats = {"summaries": 0, "summary_errors": 0, "summaries_shed": 0, "cache_hits": 0}
+
+    async def _llm_summarize(self, summary: str, messages: list):
+        from app.services.llm import get_openai_llm
+        text = "\n".join(f"{_role(msg)}: {msg.content}" for msg in messages)
+        prompt = SUMMARY_PROMPT.format(summary=summary or "(none)", messages=text)
+        llm = get_openai_llm()
+        max_tokens = llm.max_tokens or 1024
+
+        async def attempt():
+            # Same limiter as answers: charged prompt + max_tokens, refunded what the summary did not use
+            limiter = get_limiter("llm")
+            await limiter.acquire(count_tokens(prompt) + max_tokens)
+            completion_tokens = 0
+            try:
+                response = await llm.ainvoke([HumanMessage(content=prompt)])
+                completion_tokens = count_tokens(str(response.content))
+                return response
+            finally:
+                limiter.release(max(0, max_tokens - completion_tokens))
+
+        # Background work: never duplicated, and the first-token timeout does not apply to a whole reply
+        response = await get_guard("llm").call(attempt, hedge=False, stage_timeout=0)
+        return str(response.content).strip()
+
+    def _split_point(self, history: list):
+        """
+        Index of the first message kept verbatim: the start of the keep_turns-th
+        most recent user turn.
+        """
+        turns = 0
+        for i in range(len(history) - 1, -1, -1):
+            if isinstance(history[i], HumanMessage):
+                turns += 1
+                if turns == self.keep_turns:
+                    return i
+        return 0
+
+    def _cache_key(self, history: list, conversation_id: str | None):
+        if conversation_id:
+            return f"summary:id:{conversation_id}"
+        # Without an ID the opening exchanges identify the conversation. A lone opener like "hi"
+        # is shared by many conversations, and the answer cache can replay the same reply to it
+        if len(history) < ANON_KEY_MESSAGES:
+            return None
+        return f"summary:anon:{_fingerprint(history[:ANON_KEY_MESSAGES])}"
+
+    async def _get_state(self, key: str):
+        try:
+            data = await self.store.get(key)
+        except Exception as e:
+            print(f"Error reading history summary: {e}")
+            return None
+        return _SummaryState.from_dict(data) if data else None
+
+    async def _put_state(self, key: str, state: _SummaryState):
+        await self.store.set(key, state.to_dict(), self.cache_ttl)
+
+    async def _extend_summary(self, key: str, history: list, base: _SummaryState | None, split: int, offset: int = 0):
+        start = max(0, base.count - offset) if base else 0
+        summary = base.summary if base else ""
+        try:
+            summary = await self._summarize(summary, history[start:split])
+            summary = truncate_tokens(summary, self.max_summary_tokens)
+            # A session window no longer holds the start of the conversation to fingerprint
+            fingerprint = _fingerprint(history[:split]) if offset == 0 else ""
+            await self._put_state(key, _SummaryState(offset + split, fingerprint, summary))
+            self.stats["summaries"] += 1
+        except (Overloaded, CircuitOpen):
+            # The LLM is saturated or down: skip this update, a later turn schedules it again
+            self.stats["summaries_shed"] += 1
+        except Exception as e:
+            self.stats["summary_errors"] += 1
+            print(f"Error summarizing conversation history: {e}")
+        finally:
+            self._pending.pop(key, None)
+
+    def _schedule_summary(self, key: str, history: list, base: _SummaryState | None, split: int, offset: int = 0):
+        if key in self._pending:
+            return self._pending[key]
+        task = asyncio.create_task(self._extend_summary(key, list(history), base, split, offset))
+        self._pending[key] = task
+        return task
+
+    async def compact(self, history: list, conversation_id: str | None = None):
+        """
+        Build the bounded prompt history for a conversation.
+
+        Uses whatever summary is already cached. If older messages have
+        scrolled out of the verbatim window since, a summary update is
+        started in the background and those messages stay verbatim (within
+        the token cap) until it lands.
+
+        Args:
+            history: Full conversation as LangChain messages, or a session's ConversationWindow
+            conversation_id: Stable ID of the conversation, if the client sent one
+
+        Returns:
+            CompactedHistory
+        """
+        # Session windows are server-owned, so their summary needs no fingerprint check
+        offset = getattr(history, "offset", 0)
+        token_counts = getattr(history, "token_counts", None)
+        split = self._split_point(history)
+        key = self._cache_key(history, conversation_id)
+        state = await self._get_state(key) if key else None
+        if state is not None and offset == 0 and (state.count > len(history) or state.fingerprint != _fingerprint(history[:state.count])):
+            # History was edited or the ID reused for another conversation
+            state = None
+        if state is not None:
+            self.stats["cache_hits"] += 1
+
+        summarized = min(len(history), max(0, state.count - offset)) if state else 0
+        if key and split > summarized:
+            self._schedule_summary(key, history, state, split, offset)
+
+        summary = state.summary if state else ""
+        budget = self.max_history_tokens - count_tokens(summary)
+        recent = []
+        used = 0
+        # Newest first so the hard cap drops the oldest verbatim messages
+        for i in range(len(history) - 1, summarized - 1, -1):
+            msg = history[i]
+            if token_counts is not None:
+                tokens = token_counts[i]
+            else:
+                tokens = count_tokens(f"{msg.__class__.__name__}: {msg.content}") + 1
+            if used + tokens > budget:
+                if not recent:
+                    content = truncate_tokens(str(msg.content), max(budget - 8, 0))
+                    recent.append(msg.__class__(content=content))
+                    used = budget
+                break
+            recent.append(msg)
+            used += tokens
+        recent.reverse()
+        return CompactedHistory(summary, recent, used + count_tokens(summary))
+
+    def query_context(self, history: list, max_messages: int = 3):
+        """
+        History context for the retrieval query: the last few messages, newest
+        kept first, capped at max_query_tokens.
+        """
+        parts = []
+        used = 0
+        for msg in reversed(history[-max_messages:]):
+            if not hasattr(msg, "content"):
+                continue
+            remaining = self.max_query_tokens - used
+            if remaining <= 0:
+                break
+            content = str(msg.content)
+            tokens = count_tokens(content)
+            if tokens > remaining:
+                content = truncate_tokens(content, remaining)
+                tokens = remaining
+            parts.append(content)
+            used += tokens
+        parts.reverse()
+        return " ".join(parts)
+
+    async def wait_pending(self):
+        """
+        Wait for in-flight summary updates (used by benchmarks and shutdown).
+        """
+        if self._pending:
+            await asyncio.gather(*list(self._pending.values()), return_exceptions=True)
+
+    def get_stats(self):
+        return {**self.stats, "pending": len(self._pending)}
+
+def set_history_manager(summarize=None):
+    """
+    Initialize the history manager from environment settings.
+    """
+    global _history_manager
+    _history_manager = HistoryManager(
+        keep_turns=int(os.getenv("HISTORY_KEEP_TURNS", "3")),
+        max_history_tokens=int(os.getenv("HISTORY_MAX_TOKENS", "1000")),
+        max_query_tokens=int(os.getenv("HISTORY_QUERY_MAX_TOKENS", "200")),
+        max_summary_tokens=int(os.getenv("HISTORY_SUMMARY_MAX_TOKENS", "300")),
+        cache_size=int(os.getenv("HISTORY_SUMMARY_CACHE_SIZE", "1000")),
+        cache_ttl=float(os.getenv("HISTORY_SUMMARY_TTL", "3600")),
+        summarize=summarize,
+        store=create_store(prefix="acs-chat:history:", max_entries=int(os.getenv("HISTORY_SUMMARY_CACHE_SIZE", "1000"))),
+    )
+
+def get_history_manager():
+    if _history_manager is None:
+        set_history_manager()
+    return _history_manager
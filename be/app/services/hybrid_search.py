@@ -0,0 +1,137 @@
+# hybrid_search.py
+import os
+import asyncio
+from app.services.vectorstore import asearch_vectorstore, asearch_vectorstore_batch
+from app.services.lexical_index import is_lexical_index_enabled, lexical_search
+from app.services.collection import build_filter, matches_filters
+from app.util.admission import Overloaded
+
+RRF_K = 60
+
+def reciprocal_rank_fusion(result_lists: list[list], top_k: int, k: int = RRF_K):
+    """
+    Fuse ranked Document lists with reciprocal rank fusion.
+
+    Args:
+        result_lists: Ranked lists of Documents carrying metadata["_id"]
+        top_k: Number of fused results to return
+        k: RRF damping constant
+
+    Returns:
+        List of Documents, best first
+    """
+    scores = {}
+    docs = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results):
+            key = doc.metadata.get("_id", doc.page_content)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+            docs.setdefault(key, doc)
+    ranked = sorted(scores, key=scores.get, reverse=True)[:top_k]
+    return [docs[key] for key in ranked]
+
+def _filtered_lexical_search(query_text: str, top_k: int, filters: dict | None):
+    if not filters:
+        return lexical_search(query_text, top_k)
+    # The BM25 index has no payload indexes: over-fetch, then drop chunks outside the filter
+    results = lexical_search(query_text, top_k * int(os.getenv("LEXICAL_FILTER_OVERFETCH", "4")))
+    return [(doc, score) for doc, score in results if matches_filters(doc.metadata, filters)][:top_k]
+
+async def ahybrid_search(query_text: str, query_vector: list[float], top_k: int, similarity_threshold: float = 0.3,
+                         filters: dict | None = None):
+    """
+    Dense and BM25 search run in parallel, fused with reciprocal rank fusion.
+
+    Falls back to dense-only search when the lexical index is disabled or empty.
+
+    Args:
+        query_text: Query used for the lexical search
+        query_vector: Query embedding used for the dense search
+        top_k: Number of results to return
+        similarity_threshold: Minimum cosine similarity for dense results
+        filters: Optional metadata filters, e.g. {"sub_dir": "COMP1511"}
+
+    Returns:
+        List of Document objects
+
+    Raises:
+        ValueError: For a filter on an unindexed field
+    """
+    # Reject unindexed filter keys before either search starts
+    build_filter(filters)
+    if not is_lexical_index_enabled():
+        return await asearch_vectorstore(query_vector, top_k, similarity_threshold=similarity_threshold, filters=filters)
+
+    # Each retriever fetches at least the pool the caller asked for
+    candidates = max(top_k, int(os.getenv("HYBRID_CANDIDATES", str(top_k * 2))))
+    dense, lexical = await asyncio.gather(
+        asearch_vectorstore(query_vector, candidates, similarity_threshold=similarity_threshold, filters=filters),
+        asyncio.to_thread(_filtered_lexical_search, query_text, candidates, filters),
+        return_exceptions=True,
+    )
+    return _fuse(dense, lexical, top_k)
+
+def _fuse(dense, lexical, top_k: int):
+    """
+    Fuse one query's dense and lexical results, either of which may be an exception.
+
+    When dense search ran but found nothing above its similarity threshold,
+    lexical results alone only answer the query if they cover at least
+    LEXICAL_ONLY_MIN_COVERAGE of it: a chunk sharing one word with an
+    off-topic question is not enough.
+    """
+    if isinstance(lexical, Exception):
+        print(f"Error searching lexical index: {lexical}")
+        lexical = []
+    if isinstance(dense, Overloaded) and not lexical:
+        raise dense
+    if isinstance(dense, Exception):
+        # Includes a shed dense search: lexical results alone still answer the question
+        print(f"Error searching vectorstore: {dense}")
+        dense = []
+    elif not dense:
+        min_coverage = float(os.getenv("LEXICAL_ONLY_MIN_COVERAGE", "0.5"))
+        lexical = [(doc, score) for doc, score in lexical if doc.metadata.get("_coverage", 0.0) >= min_coverage]
+    if not lexical:
+        return dense[:top_k]
+    return reciprocal_rank_fusion([dense, [doc for doc, _ in lexical]], top_k)
+
+async def ahybrid_search_batch(query_texts: list[str], query_vectors: list[list[float]], top_k: int,
+                               similarity_threshold: float = 0.3, filters: dict | None = None):
+    """
+    Hybrid search for many queries: one batched dense search plus the lexical
+    searches on a worker thread, fused per query.
+
+    Returns:
+        One list of Documents per query
+
+    Raises:
+        ValueError: For a filter on an unindexed field
+    """
+    build_filter(filters)
+    if not is_lexical_index_enabled():
+        return await asearch_vectorstore_batch(query_vectors, top_k, similarity_threshold=similarity_threshold,
+                                               filters=filters)
+
+    # Each retriever fetches at least the pool the caller asked for
+    candidates = max(top_k, int(os.getenv("HYBRID_CANDIDATES", str(top_k * 2))))
+
+    def lexical_batch():
+        results = []
+        for text in query_texts:
+            try:
+                results.append(_filtered_lexical_search(text, candidates, filters))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    dense, lexical = await asyncio.gather(
+        asearch_vectorstore_batch(query_vectors, candidates, similarity_threshold=similarity_threshold, filters=filters),
+        asyncio.to_thread(lexical_batch),
+        return_exceptions=True,
+    )
+    if isinstance(dense, Exception):
+        dense = [dense] * len(query_texts)
+    if isinstance(lexical, Exception):
+        lexical = [lexical] * len(query_texts)
+    return [_fuse(d, l, top_k) for d, l in zip(dense, lexical)]
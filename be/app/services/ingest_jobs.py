@@ -0,0 +1,198 @@
+# ingest_jobs.py
+import os
+import re
+import json
+import time
+import uuid
+import queue
+import asyncio
+import threading
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+MAX_JOB_HISTORY = 50
+DEFAULT_JOBS_DIR = ".cache/ingest_jobs"
+
+_jobs = OrderedDict()
+_jobs_lock = threading.Lock()
+_job_queue = queue.Queue()
+_worker = None
+
+class IngestJob:
+    """
+    One ingestion run requested through the API.
+    """
+    def __init__(self, root_dir: str, options: dict):
+        self.id = uuid.uuid4().hex
+        self.root_dir = root_dir
+        self.options = options
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.stats = None
+        self.error = None
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "root_dir": self.root_dir,
+            "options": self.options,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": self.stats.to_dict() if self.stats is not None else None,
+            "error": self.error,
+        }
+
+def _jobs_dir():
+    return os.getenv("INGEST_JOBS_DIR", DEFAULT_JOBS_DIR)
+
+def _save_job(job: IngestJob):
+    """
+    Write the job's status to the jobs directory so every worker process can report it.
+    """
+    try:
+        directory = _jobs_dir()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{job.id}.json")
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(job.to_dict(), f)
+        os.replace(f"{path}.tmp", path)
+    except Exception as e:
+        print(f"Error saving ingestion job {job.id}: {e}")
+
+def _load_saved_jobs():
+    directory = _jobs_dir()
+    jobs = []
+    if not os.path.isdir(directory):
+        return jobs
+    for name in os.listdir(directory):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                jobs.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    jobs.sort(key=lambda job: job.get("created_at") or 0)
+    # Keep the directory bounded like the in-memory history
+    for stale in jobs[:-MAX_JOB_HISTORY]:
+        if stale.get("status") not in ("queued", "running"):
+            try:
+                os.remove(os.path.join(directory, f"{stale['job_id']}.json"))
+            except OSError:
+                pass
+    return jobs[-MAX_JOB_HISTORY:]
+
+class _IngestLock:
+    """
+    Cross-process lock so only one worker ingests at a time.
+    """
+    def __enter__(self):
+        self._file = None
+        if fcntl is not None:
+            os.makedirs(_jobs_dir(), exist_ok=True)
+            self._file = open(os.path.join(_jobs_dir(), "ingest.lock"), "w")
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+
+def _run_job(job: IngestJob):
+    # Imported here so the chat path never loads the ingestion stack
+    from app.services.ingest_pipeline import IngestPipeline
+
+    with _IngestLock():
+        job.status = "running"
+        job.started_at = time.time()
+        _save_job(job)
+        try:
+            pipeline = IngestPipeline(job.root_dir, on_progress=lambda stats: _save_job(job), **job.options)
+            job.stats = pipeline.stats
+            # A private event loop on this thread keeps ingestion off the request loop
+            asyncio.run(pipeline.run())
+            job.status = "succeeded" if pipeline.stats.errors == 0 else "completed_with_errors"
+        except Exception as e:
+            print(f"Error in ingestion job {job.id}: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            _save_job(job)
+
+def _worker_loop():
+    while True:
+        job = _job_queue.get()
+        try:
+            _run_job(job)
+        finally:
+            _job_queue.task_done()
+
+def _ensure_worker():
+    global _worker
+    if _worker is None or not _worker.is_alive():
+        _worker = threading.Thread(target=_worker_loop, name="ingest-worker", daemon=True)
+        _worker.start()
+
+def submit_ingest_job(root_dir: str, **options):
+    """
+    Queue an ingestion run on the background worker. Jobs run one at a time.
+
+    Args:
+        root_dir: Directory to ingest
+        **options: IngestPipeline settings
+
+    Returns:
+        The queued IngestJob
+    """
+    job = IngestJob(root_dir, options)
+    with _jobs_lock:
+        _jobs[job.id] = job
+        while len(_jobs) > MAX_JOB_HISTORY:
+            oldest_id, oldest = next(iter(_jobs.items()))
+            if oldest.status in ("queued", "running"):
+                break
+            del _jobs[oldest_id]
+    _save_job(job)
+    _ensure_worker()
+    _job_queue.put(job)
+    return job
+
+def get_ingest_job(job_id: str):
+    """
+    Status of a job, whichever worker process runs it.
+
+    Returns:
+        Job status dict, or None if unknown
+    """
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+    if job is not None:
+        return job.to_dict()
+    if not re.fullmatch(r"[0-9a-f]{32}", job_id):
+        return None
+    try:
+        with open(os.path.join(_jobs_dir(), f"{job_id}.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def list_ingest_jobs():
+    """
+    Recent jobs from all worker processes, oldest first, as status dicts.
+    """
+    jobs = {job["job_id"]: job for job in _load_saved_jobs()}
+    with _jobs_lock:
+        # This worker's own jobs carry fresher progress than their saved copies
+        for job in _jobs.values():
+            jobs[job.id] = job.to_dict()
+    return sorted(jobs.values(), key=lambda job: job.get("created_at") or 0)[-MAX_JOB_HISTORY:]
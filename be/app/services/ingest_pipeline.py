@@ -0,0 +1,538 @@
+# ingest_pipeline.py
+import os
+import time
+import random
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import openai
+from qdrant_client.models import PointStruct, PointIdsList
+from app.config.embedding_config import get_embedding
+from app.config.qdrant_config import create_async_qdrant_client
+from app.services.vectorstore import COLLECTION_NAME
+from app.services.collection import ensure_collection
+from app.services.lexical_index import get_lexical_index, is_lexical_index_enabled, save_lexical_index
+from app.services.local_replica import export_local_replica, is_local_replica_enabled
+from app.util.file_loaders import detect_loader
+from app.util.get_file_chunks import iter_chunk_batches, read_and_split_file
+from app.util.ingest_manifest import (
+    DEFAULT_MANIFEST_PATH,
+    hash_file,
+    iter_source_files,
+    load_manifest,
+    make_point_id,
+    save_manifest,
+)
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+async def _iter_async(items):
+    for item in items:
+        yield item
+
+class IngestStats:
+    """
+    Live counters for an ingestion run, safe to read while the run is in progress.
+    """
+    def __init__(self):
+        self.started_at = time.time()
+        self.finished_at = None
+        self.files_total = 0
+        self.files_done = 0
+        self.files_added = 0
+        self.files_updated = 0
+        self.files_unchanged = 0
+        self.files_removed = 0
+        self.files_failed = 0
+        self.files_skipped = 0
+        self.chunks_queued = 0
+        self.chunks_embedded = 0
+        self.chunks_upserted = 0
+        self.chunks_deleted = 0
+        self.embed_batches = 0
+        self.embed_retries = 0
+        self.upsert_batches = 0
+        self.errors = 0
+        self.dry_run = False
+        self.planned_files = []
+        self.planned_removals = []
+        self.skipped_files = {}
+
+    @property
+    def elapsed(self):
+        return (self.finished_at or time.time()) - self.started_at
+
+    @property
+    def chunks_per_sec(self):
+        return self.chunks_upserted / self.elapsed if self.elapsed > 0 else 0.0
+
+    def to_dict(self):
+        data = {key: value for key, value in vars(self).items()}
+        data["elapsed"] = round(self.elapsed, 3)
+        data["chunks_per_sec"] = round(self.chunks_per_sec, 2)
+        return data
+
+    def summary(self):
+        return (f"files {self.files_done}/{self.files_total} "
+                f"(+{self.files_added} ~{self.files_updated} ={self.files_unchanged} -{self.files_removed}, "
+                f"{self.files_skipped} skipped), "
+                f"chunks embedded {self.chunks_embedded}, upserted {self.chunks_upserted}, "
+                f"{self.chunks_per_sec:.1f} chunks/s, errors {self.errors}")
+
+class _ChunkRow:
+    __slots__ = ("point_id", "text", "metadata", "tokens", "rel_filepath")
+
+    def __init__(self, point_id, text, metadata, tokens, rel_filepath):
+        self.point_id = point_id
+        self.text = text
+        self.metadata = metadata
+        self.tokens = tokens
+        self.rel_filepath = rel_filepath
+
+def _is_retryable(error: Exception):
+    if isinstance(error, (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    return getattr(error, "status_code", None) in RETRYABLE_STATUS_CODES
+
+def _retry_after(error: Exception):
+    """
+    Seconds to wait according to the upstream Retry-After header, if any.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+class IngestPipeline:
+    """
+    Staged ingestion: read/split on a process pool -> token-budgeted embedding
+    batches -> concurrent embedding calls -> batched parallel Qdrant upserts.
+
+    Stages are connected by bounded queues, so a slow stage applies
+    back-pressure upstream and memory stays bounded on large corpora.
+    Files of stream_threshold bytes or more are split incrementally on a
+    thread, so one huge file does not have to fit in memory either.
+    """
+    def __init__(
+        self,
+        root_dir: str,
+        incremental: bool = True,
+        manifest_path: str | None = None,
+        include: list[str] | None = None,
+        exclude: list[str] | None = None,
+        dry_run: bool = False,
+        read_workers: int | None = None,
+        embed_concurrency: int = 4,
+        upsert_concurrency: int = 2,
+        batch_tokens: int = 50000,
+        batch_max_chunks: int = 512,
+        upsert_batch_size: int = 256,
+        queue_size: int = 2048,
+        stream_threshold: int = 8 << 20,
+        max_retries: int = 6,
+        progress_interval: float = 5.0,
+        on_progress=None,
+        client=None,
+        embedding=None,
+        collection_name: str | None = None,
+    ):
+        self.root_dir = root_dir
+        self.incremental = incremental
+        self.manifest_path = manifest_path or os.getenv("INGEST_MANIFEST_PATH", DEFAULT_MANIFEST_PATH)
+        self.include = include
+        self.exclude = exclude
+        self.dry_run = dry_run
+        self.read_workers = (os.cpu_count() or 1) if read_workers is None else read_workers
+        self.embed_concurrency = max(1, embed_concurrency)
+        self.upsert_concurrency = max(1, upsert_concurrency)
+        self.batch_tokens = batch_tokens
+        self.batch_max_chunks = batch_max_chunks
+        self.upsert_batch_size = upsert_batch_size
+        self.queue_size = queue_size
+        self.stream_threshold = stream_threshold
+        self.max_retries = max_retries
+        self.progress_interval = progress_interval
+        self.on_progress = on_progress
+        # Injected clients are owned by the caller and left open
+        self._owns_client = client is None
+        self._client = client
+        self._embedding = embedding
+        # Any other collection is a reindex target that is not serving yet
+        self.collection_name = collection_name or COLLECTION_NAME
+        self._serving = self.collection_name == COLLECTION_NAME
+        self.stats = IngestStats()
+        self._rate_limited_until = 0.0
+
+    async def run(self):
+        """
+        Run the pipeline to completion.
+
+        Returns:
+            IngestStats for the run
+        """
+        manifest = load_manifest(self.manifest_path)
+        root_key = os.path.abspath(self.root_dir)
+        self._known_files = manifest["roots"].setdefault(root_key, {"files": {}})["files"]
+        self._pending = {}
+
+        if self.dry_run:
+            # Report what would change without reading, embedding or writing anything
+            files, removed = await asyncio.to_thread(self._plan)
+            self.stats.dry_run = True
+            self.stats.files_total = len(files) + self.stats.files_unchanged + self.stats.files_skipped
+            self.stats.planned_files = [item[2] for item in files]
+            self.stats.planned_removals = removed
+            self.stats.finished_at = time.time()
+            print(f"Dry run: {len(files)} files to index, {len(removed)} to remove, {self.stats.files_unchanged} unchanged, "
+                  f"{self.stats.files_skipped} skipped")
+            return self.stats
+
+        if self._embedding is None:
+            self._embedding = get_embedding()
+        if self._client is None:
+            self._client = create_async_qdrant_client()
+        # The BM25 index is kept in step with Qdrant from the same chunks; a reindex rebuilds it after the swap
+        self._lexical = get_lexical_index(reload_interval=0) if is_lexical_index_enabled() and self._serving else None
+        self._lexical_dirty = False
+
+        executor = None
+        if self.read_workers > 0:
+            executor = ProcessPoolExecutor(self.read_workers, mp_context=multiprocessing.get_context("spawn"))
+        progress = asyncio.create_task(self._report_progress())
+        try:
+            await ensure_collection(self._client, self.collection_name, as_alias=self._serving)
+            files, removed = await asyncio.to_thread(self._plan)
+            self.stats.files_total = len(files) + self.stats.files_unchanged + self.stats.files_skipped
+            await self._purge_removed(removed)
+
+            self._file_queue = asyncio.Queue()
+            for item in files:
+                self._file_queue.put_nowait(item)
+            self._chunk_queue = asyncio.Queue(maxsize=self.queue_size)
+            self._batch_queue = asyncio.Queue(maxsize=self.embed_concurrency * 2)
+            self._point_queue = asyncio.Queue(maxsize=self.upsert_concurrency * 2)
+
+            await asyncio.gather(
+                self._run_readers(executor),
+                self._batcher(),
+                self._run_embedders(),
+                *[self._upserter() for _ in range(self.upsert_concurrency)],
+            )
+            if is_local_replica_enabled() and self._serving and (self.stats.chunks_upserted or removed):
+                # Serving workers map the new snapshot on their next reload check
+                try:
+                    await export_local_replica(self._client)
+                except Exception as e:
+                    print(f"Error exporting local replica: {e}")
+        finally:
+            progress.cancel()
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+            if self._owns_client:
+                await self._client.close()
+            if self._lexical is not None and self._lexical_dirty:
+                save_lexical_index(self._lexical)
+            self.stats.finished_at = time.time()
+            # Only files whose chunks all landed in Qdrant were recorded, so a partial run resumes cleanly
+            save_manifest(manifest, self.manifest_path)
+        print(f"Ingestion finished: {self.stats.summary()}")
+        return self.stats
+
+    def _plan(self):
+        """
+        Walk the corpus and decide which files need reading.
+
+        Returns:
+            (files to process, relative paths of files whose points should be purged)
+        """
+        files = []
+        seen = set()
+        skipped_known = []
+        for file_path, file_name in iter_source_files(self.root_dir, self.include, self.exclude):
+            rel_filepath = os.path.relpath(file_path, self.root_dir)
+            seen.add(rel_filepath)
+            stat = os.stat(file_path)
+            previous = self._known_files.get(rel_filepath)
+            if self.incremental and previous and previous["mtime"] == stat.st_mtime and previous["size"] == stat.st_size:
+                self.stats.files_unchanged += 1
+                self.stats.files_done += 1
+                continue
+            try:
+                loader, reason = detect_loader(file_path)
+            except OSError as e:
+                loader, reason = None, str(e)
+            if loader is None:
+                # Binary and unsupported files are dropped before any embedding spend
+                self.stats.files_skipped += 1
+                self.stats.files_done += 1
+                self.stats.skipped_files[rel_filepath] = reason
+                if previous:
+                    skipped_known.append(rel_filepath)
+                continue
+            files.append((file_path, file_name, rel_filepath, stat, previous))
+        # Files filtered out by include/exclude but still on disk are left alone
+        removed = [
+            path for path in self._known_files
+            if path not in seen and not os.path.exists(os.path.join(self.root_dir, path))
+        ]
+        # A file that was indexed before but is now skipped loses its old chunks
+        return files, removed + skipped_known
+
+    async def _purge_removed(self, removed: list[str]):
+        for rel_filepath in removed:
+            try:
+                point_ids = self._known_files[rel_filepath]["point_ids"]
+                await self._delete_points(point_ids)
+                del self._known_files[rel_filepath]
+                self.stats.files_removed += 1
+            except Exception as e:
+                self.stats.errors += 1
+                print(f"Error removing points for {rel_filepath}: {e}")
+
+    async def _delete_points(self, point_ids: list[str]):
+        if point_ids:
+            await self._client.delete(self.collection_name, points_selector=PointIdsList(points=point_ids), wait=True)
+            self.stats.chunks_deleted += len(point_ids)
+            if self._lexical is not None:
+                self._lexical.remove(point_ids)
+                self._lexical_dirty = True
+
+    async def _run_readers(self, executor):
+        try:
+            workers = max(1, self.read_workers) * 2
+            await asyncio.gather(*[self._reader(executor) for _ in range(workers)])
+        finally:
+            await self._chunk_queue.put(None)
+
+    async def _reader(self, executor):
+        loop = asyncio.get_running_loop()
+        while not self._file_queue.empty():
+            file_path, file_name, rel_filepath, stat, previous = self._file_queue.get_nowait()
+            try:
+                known_hash = previous["sha256"] if self.incremental and previous else None
+                if stat.st_size >= self.stream_threshold:
+                    # Large files are split incrementally on a thread instead of returning one huge list
+                    file_hash = await asyncio.to_thread(hash_file, file_path)
+                    chunks = None if file_hash == known_hash else self._stream_chunks(file_path)
+                else:
+                    if executor is not None:
+                        file_hash, chunk_texts, token_counts = await loop.run_in_executor(
+                            executor, read_and_split_file, file_path, known_hash
+                        )
+                    else:
+                        file_hash, chunk_texts, token_counts = await asyncio.to_thread(read_and_split_file, file_path, known_hash)
+                    chunks = None if chunk_texts is None else _iter_async(zip(chunk_texts, token_counts))
+
+                if chunks is None:
+                    # Touched but not modified
+                    previous.update(mtime=stat.st_mtime, size=stat.st_size)
+                    self.stats.files_unchanged += 1
+                    self.stats.files_done += 1
+                    continue
+            except Exception as e:
+                self.stats.errors += 1
+                self.stats.files_failed += 1
+                self.stats.files_done += 1
+                print(f"Error processing file {file_path}: {e}")
+                continue
+
+            kind = "files_updated" if previous else "files_added"
+            pending = {"remaining": 0, "entry": None, "kind": kind, "failed": False, "reading": True}
+            self._pending[rel_filepath] = pending
+            try:
+                sub_dir = os.path.dirname(rel_filepath)
+                previous_ids = set(previous["point_ids"]) if previous else set()
+                point_ids = []
+                async for text, tokens in chunks:
+                    idx = len(point_ids)
+                    point_id = make_point_id(rel_filepath, idx, text)
+                    point_ids.append(point_id)
+                    if self.incremental and point_id in previous_ids:
+                        continue
+                    metadata = {
+                        "root_dir": self.root_dir,
+                        "sub_dir": sub_dir,
+                        "file": file_name,
+                        "filepath": file_path,
+                        "rel_filepath": rel_filepath,
+                        "chunk_id": idx,
+                    }
+                    pending["remaining"] += 1
+                    # Blocks when downstream stages fall behind
+                    await self._chunk_queue.put(_ChunkRow(point_id, text, metadata, tokens, rel_filepath))
+                    self.stats.chunks_queued += 1
+                await self._delete_points(list(previous_ids - set(point_ids)))
+                pending["entry"] = {"mtime": stat.st_mtime, "size": stat.st_size, "sha256": file_hash, "point_ids": point_ids}
+            except Exception as e:
+                self.stats.errors += 1
+                pending["failed"] = True
+                print(f"Error processing file {file_path}: {e}")
+            pending["reading"] = False
+            self._finish_file(rel_filepath)
+
+    async def _stream_chunks(self, file_path: str):
+        batches = iter_chunk_batches(file_path)
+        try:
+            while (batch := await asyncio.to_thread(next, batches, None)) is not None:
+                for item in batch:
+                    yield item
+        finally:
+            batches.close()
+
+    async def _batcher(self):
+        batch, tokens = [], 0
+        try:
+            while True:
+                try:
+                    row = await asyncio.wait_for(self._chunk_queue.get(), timeout=0.5)
+                except asyncio.TimeoutError:
+                    # Readers are slow; don't leave embedders idle with a partial batch
+                    if batch:
+                        await self._batch_queue.put(batch)
+                        batch, tokens = [], 0
+                    continue
+                if row is None:
+                    break
+                if batch and (tokens + row.tokens > self.batch_tokens or len(batch) >= self.batch_max_chunks):
+                    await self._batch_queue.put(batch)
+                    batch, tokens = [], 0
+                batch.append(row)
+                tokens += row.tokens
+            if batch:
+                await self._batch_queue.put(batch)
+        finally:
+            for _ in range(self.embed_concurrency):
+                await self._batch_queue.put(None)
+
+    async def _run_embedders(self):
+        try:
+            await asyncio.gather(*[self._embedder() for _ in range(self.embed_concurrency)])
+        finally:
+            for _ in range(self.upsert_concurrency):
+                await self._point_queue.put(None)
+
+    async def _embedder(self):
+        while (batch := await self._batch_queue.get()) is not None:
+            try:
+                vectors = await self._embed_with_backoff([row.text for row in batch])
+                self.stats.embed_batches += 1
+                self.stats.chunks_embedded += len(batch)
+                points = [
+                    PointStruct(id=row.point_id, vector=vector, payload={"page_content": row.text, "metadata": row.metadata})
+                    for row, vector in zip(batch, vectors)
+                ]
+                await self._point_queue.put((batch, points))
+            except Exception as e:
+                self.stats.errors += 1
+                print(f"Error embedding batch of {len(batch)} chunks: {e}")
+                self._fail_rows(batch)
+
+    async def _embed_with_backoff(self, texts: list[str]):
+        delay = 1.0
+        for attempt in range(self.max_retries + 1):
+            wait = self._rate_limited_until - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                # The sync client is thread-safe and not tied to an event loop, so the
+                # pipeline can run on any loop (CLI, background job thread)
+                return await asyncio.to_thread(self._embedding.embed_documents, texts)
+            except Exception as e:
+                if attempt == self.max_retries or not _is_retryable(e):
+                    raise
+                self.stats.embed_retries += 1
+                backoff = _retry_after(e) or delay * (1 + random.random())
+                if getattr(e, "status_code", None) == 429:
+                    # Pause every embedder, not just this one
+                    self._rate_limited_until = max(self._rate_limited_until, time.monotonic() + backoff)
+                await asyncio.sleep(backoff)
+                delay = min(delay * 2, 60.0)
+
+    async def _upserter(self):
+        rows, points = [], []
+        done = False
+        while not done:
+            try:
+                item = await asyncio.wait_for(self._point_queue.get(), timeout=0.5)
+            except asyncio.TimeoutError:
+                item = False
+            if item is None:
+                done = True
+            elif item:
+                rows.extend(item[0])
+                points.extend(item[1])
+                if len(points) < self.upsert_batch_size:
+                    continue
+            if not points:
+                continue
+            try:
+                await self._client.upsert(self.collection_name, points=points, wait=True)
+                self.stats.upsert_batches += 1
+                self.stats.chunks_upserted += len(points)
+                if self._lexical is not None:
+                    for row in rows:
+                        self._lexical.add(row.point_id, row.text, row.metadata)
+                    self._lexical_dirty = True
+                for row in rows:
+                    self._row_done(row)
+            except Exception as e:
+                self.stats.errors += 1
+                print(f"Error upserting {len(points)} points: {e}")
+                self._fail_rows(rows)
+            rows, points = [], []
+
+    def _row_done(self, row):
+        pending = self._pending.get(row.rel_filepath)
+        if pending is None:
+            return
+        pending["remaining"] -= 1
+        self._finish_file(row.rel_filepath)
+
+    def _finish_file(self, rel_filepath: str):
+        """
+        Record a file once it has been read to the end and all its queued chunks are settled.
+        """
+        pending = self._pending[rel_filepath]
+        if pending["reading"] or pending["remaining"] > 0:
+            return
+        del self._pending[rel_filepath]
+        if pending["failed"]:
+            self.stats.files_failed += 1
+            self.stats.files_done += 1
+        else:
+            self._complete_file(rel_filepath, pending["entry"], pending["kind"])
+
+    def _fail_rows(self, rows):
+        for row in rows:
+            pending = self._pending.get(row.rel_filepath)
+            if pending is not None:
+                pending["failed"] = True
+            self._row_done(row)
+
+    def _complete_file(self, rel_filepath: str, entry: dict, kind: str):
+        self._known_files[rel_filepath] = entry
+        setattr(self.stats, kind, getattr(self.stats, kind) + 1)
+        self.stats.files_done += 1
+
+    async def _report_progress(self):
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            if self.on_progress is not None:
+                self.on_progress(self.stats)
+            else:
+                print(f"Ingestion progress: {self.stats.summary()}")
+
+async def run_ingestion(root_dir: str, **options):
+    """
+    Run the ingestion pipeline on root_dir.
+
+    Args:
+        root_dir: Directory to ingest
+        **options: IngestPipeline settings (concurrency, batch sizes, on_progress, ...)
+
+    Returns:
+        IngestStats for the run
+    """
+    return await IngestPipeline(root_dir, **options).run()
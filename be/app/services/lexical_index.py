@@ -0,0 +1,327 @@
+# lexical_index.py
+import os
+import re
+import json
+import math
+import time
+import threading
+from array import array
+import numpy as np
+from langchain_core.documents import Document
+
+DEFAULT_INDEX_PATH = ".cache/lexical_index"
+
+_lexical_index = None
+_lexical_index_lock = threading.Lock()
+
+# Course codes (comp6441), unit numbers (3.2.1), plain words and acronyms
+TOKEN_PATTERN = re.compile(r"[a-z]+\d+[a-z]*|\d+(?:\.\d+)*|[a-z]+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from", "how", "i",
+    "in", "is", "it", "me", "my", "of", "on", "or", "that", "the", "this", "to", "was", "what",
+    "when", "where", "which", "who", "why", "will", "with", "you", "your",
+}
+
+def tokenize(text: str):
+    """
+    Split text into lexical terms.
+
+    Course codes are kept whole and also indexed by their number, so
+    "COMP6441" and "COMP 6441" both match.
+    """
+    terms = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        terms.append(token)
+        match = re.fullmatch(r"([a-z]+)(\d+)[a-z]*", token)
+        if match:
+            terms.append(match.group(2))
+    return terms
+
+class LexicalIndex:
+    """
+    Compact, incrementally updatable BM25 inverted index over ingested chunks.
+
+    Postings are stored per term as parallel array('I') doc numbers and
+    array('H') term frequencies. Deletes are tombstoned and compacted away
+    once they make up a quarter of the index.
+    """
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._postings = {}
+        self._doc_lengths = array("I")
+        self._point_ids = []
+        self._payloads = []
+        self._doc_numbers = {}
+        self._deleted = set()
+        self._total_length = 0
+        self.loaded_mtime = None
+        self.checked_at = 0.0
+
+    def __len__(self):
+        return len(self._doc_numbers)
+
+    def add(self, point_id, text: str, metadata: dict | None = None):
+        """
+        Index a chunk, replacing any previous version with the same point ID.
+        """
+        terms = tokenize(text)
+        counts = {}
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+        with self._lock:
+            self.remove([point_id])
+            doc = len(self._point_ids)
+            self._point_ids.append(point_id)
+            self._payloads.append({"page_content": text, "metadata": metadata or {}})
+            self._doc_lengths.append(len(terms))
+            self._doc_numbers[point_id] = doc
+            self._total_length += len(terms)
+            for term, tf in counts.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = (array("I"), array("H"))
+                postings[0].append(doc)
+                postings[1].append(min(tf, 65535))
+
+    def remove(self, point_ids):
+        with self._lock:
+            for point_id in point_ids:
+                doc = self._doc_numbers.pop(point_id, None)
+                if doc is None:
+                    continue
+                self._deleted.add(doc)
+                self._total_length -= self._doc_lengths[doc]
+                self._payloads[doc] = None
+            if self._deleted and len(self._deleted) * 4 > len(self._point_ids):
+                self._compact()
+
+    def _compact(self):
+        """
+        Drop tombstoned documents and renumber the survivors.
+        """
+        remap = np.full(len(self._point_ids), -1, dtype=np.int64)
+        live = [doc for doc in range(len(self._point_ids)) if doc not in self._deleted]
+        remap[live] = np.arange(len(live))
+        postings = {}
+        for term, (docs, tfs) in self._postings.items():
+            doc_arr = np.frombuffer(docs, dtype=np.uint32) if len(docs) else np.empty(0, dtype=np.uint32)
+            new_docs = remap[doc_arr]
+            keep = new_docs >= 0
+            if keep.any():
+                tf_arr = np.frombuffer(tfs, dtype=np.uint16)
+                postings[term] = (array("I", new_docs[keep].astype(np.uint32).tobytes()),
+                                  array("H", tf_arr[keep].tobytes()))
+        self._postings = postings
+        self._doc_lengths = array("I", (self._doc_lengths[doc] for doc in live))
+        self._point_ids = [self._point_ids[doc] for doc in live]
+        self._payloads = [self._payloads[doc] for doc in live]
+        self._doc_numbers = {point_id: doc for doc, point_id in enumerate(self._point_ids)}
+        self._deleted = set()
+
+    def search(self, query: str, top_k: int = 10):
+        """
+        BM25 search.
+
+        Args:
+            query: Query text
+            top_k: Number of results
+
+        Returns:
+            List of (point_id, score, payload) tuples, best first
+        """
+        return [(point_id, score, payload) for point_id, score, _, payload in self.match(query, top_k)]
+
+    def match(self, query: str, top_k: int = 10, min_coverage: float = 0.0):
+        """
+        BM25 search that also reports how much of the query each result covers.
+
+        Coverage is the IDF-weighted share of the query's terms found in the
+        document; terms the index has never seen weigh more than the rarest
+        term. Unlike the raw BM25 score it is comparable across queries, so
+        it can tell a real match from one that shares a single common word.
+
+        Args:
+            query: Query text
+            top_k: Number of results
+            min_coverage: Drop results covering less of the query than this (0.0 to 1.0)
+
+        Returns:
+            List of (point_id, score, coverage, payload) tuples, best first
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            live_docs = len(self._doc_numbers)
+            if not terms or live_docs == 0:
+                return []
+            lengths = np.frombuffer(self._doc_lengths, dtype=np.uint32).astype(np.float32)
+            avg_length = max(self._total_length / live_docs, 1.0)
+            scores = np.zeros(len(self._point_ids), dtype=np.float32)
+            matched = np.zeros(len(self._point_ids), dtype=np.float32)
+            total_idf = 0.0
+            for term in terms:
+                postings = self._postings.get(term)
+                df = len(postings[0]) if postings is not None else 0
+                idf = math.log(1 + (live_docs - df + 0.5) / (df + 0.5))
+                total_idf += idf
+                if postings is None:
+                    continue
+                docs = np.frombuffer(postings[0], dtype=np.uint32)
+                tfs = np.frombuffer(postings[1], dtype=np.uint16).astype(np.float32)
+                norm = self.k1 * (1 - self.b + self.b * lengths[docs] / avg_length)
+                # A document appears at most once per term, so plain fancy-index addition is safe
+                scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+                matched[docs] += idf
+            if self._deleted:
+                scores[list(self._deleted)] = 0.0
+            coverage = matched / total_idf
+            candidates = np.flatnonzero((scores > 0) & (coverage >= min_coverage))
+            if len(candidates) > top_k:
+                candidates = candidates[np.argpartition(-scores[candidates], top_k)[:top_k]]
+            ranked = candidates[np.argsort(-scores[candidates])]
+            return [(self._point_ids[doc], float(scores[doc]), float(coverage[doc]), self._payloads[doc]) for doc in ranked]
+
+    def save(self, path: str):
+        """
+        Persist the index as a NumPy archive (postings in CSR form) plus a JSON doc table.
+        """
+        with self._lock:
+            if self._deleted:
+                self._compact()
+            terms = sorted(self._postings)
+            offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+            for i, term in enumerate(terms):
+                offsets[i + 1] = offsets[i] + len(self._postings[term][0])
+            docs = np.empty(int(offsets[-1]), dtype=np.uint32)
+            tfs = np.empty(int(offsets[-1]), dtype=np.uint16)
+            for i, term in enumerate(terms):
+                docs[offsets[i]:offsets[i + 1]] = np.frombuffer(self._postings[term][0], dtype=np.uint32)
+                tfs[offsets[i]:offsets[i + 1]] = np.frombuffer(self._postings[term][1], dtype=np.uint16)
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            np.savez_compressed(
+                f"{path}.tmp.npz",
+                offsets=offsets,
+                docs=docs,
+                tfs=tfs,
+                doc_lengths=np.frombuffer(self._doc_lengths, dtype=np.uint32),
+            )
+            with open(f"{path}.tmp.json", "w", encoding="utf-8") as f:
+                json.dump({"terms": terms, "point_ids": self._point_ids, "payloads": self._payloads}, f)
+            os.replace(f"{path}.tmp.npz", f"{path}.npz")
+            os.replace(f"{path}.tmp.json", f"{path}.json")
+
+    @classmethod
+    def load(cls, path: str):
+        index = cls()
+        arrays = np.load(f"{path}.npz", allow_pickle=False)
+        with open(f"{path}.json", "r", encoding="utf-8") as f:
+            table = json.load(f)
+        offsets, docs, tfs = arrays["offsets"], arrays["docs"], arrays["tfs"]
+        for i, term in enumerate(table["terms"]):
+            start, end = offsets[i], offsets[i + 1]
+            index._postings[term] = (array("I", docs[start:end].tobytes()), array("H", tfs[start:end].tobytes()))
+        index._doc_lengths = array("I", arrays["doc_lengths"].astype(np.uint32).tobytes())
+        index._point_ids = table["point_ids"]
+        index._payloads = table["payloads"]
+        index._doc_numbers = {point_id: doc for doc, point_id in enumerate(index._point_ids)}
+        index._total_length = int(arrays["doc_lengths"].sum())
+        return index
+
+def get_lexical_index_path():
+    return os.getenv("LEXICAL_INDEX_PATH", DEFAULT_INDEX_PATH)
+
+def is_lexical_index_enabled():
+    return os.getenv("LEXICAL_INDEX_ENABLED", "true").lower() in ("1", "true", "yes")
+
+def get_lexical_min_coverage():
+    return float(os.getenv("LEXICAL_MIN_COVERAGE", "0.2"))
+
+def get_lexical_index(reload_interval: float = 30.0):
+    """
+    Get the process-wide lexical index, loading it from disk on first use.
+
+    The on-disk copy is re-read when ingestion in another process rewrites it,
+    checked at most every reload_interval seconds.
+
+    Returns:
+        LexicalIndex instance (empty if nothing has been indexed yet)
+    """
+    global _lexical_index
+    path = get_lexical_index_path()
+    with _lexical_index_lock:
+        now = time.monotonic()
+        if _lexical_index is not None and now - _lexical_index.checked_at < reload_interval:
+            return _lexical_index
+        try:
+            mtime = os.path.getmtime(f"{path}.json")
+        except OSError:
+            mtime = None
+        if _lexical_index is None or (mtime is not None and mtime != _lexical_index.loaded_mtime):
+            index = LexicalIndex()
+            if mtime is not None:
+                try:
+                    index = LexicalIndex.load(path)
+                except Exception as e:
+                    print(f"Error loading lexical index from {path}: {e}")
+            index.loaded_mtime = mtime
+            _lexical_index = index
+        _lexical_index.checked_at = now
+        return _lexical_index
+
+def save_lexical_index(index: LexicalIndex):
+    path = get_lexical_index_path()
+    index.save(path)
+    index.loaded_mtime = os.path.getmtime(f"{path}.json")
+
+def lexical_search(query: str, top_k: int):
+    """
+    Search the lexical index and return LangChain Documents.
+
+    Results covering less than LEXICAL_MIN_COVERAGE of the query are dropped;
+    each Document's metadata["_coverage"] holds its share (see LexicalIndex.match).
+
+    Args:
+        query: Query text
+        top_k: Number of results
+
+    Returns:
+        List of (Document, score) tuples, best first
+    """
+    results = []
+    for point_id, score, coverage, payload in get_lexical_index().match(query, top_k, get_lexical_min_coverage()):
+        metadata = dict(payload.get("metadata") or {})
+        metadata["_id"] = point_id
+        metadata["_coverage"] = coverage
+        results.append((Document(page_content=payload.get("page_content", ""), metadata=metadata), score))
+    return results
+
+def rebuild_lexical_index(batch_size: int = 1000):
+    """
+    Rebuild the lexical index from every chunk currently stored in Qdrant.
+
+    Used to bootstrap hybrid search for a collection ingested before the
+    lexical index existed.
+
+    Returns:
+        Number of chunks indexed
+    """
+    from app.config.qdrant_config import get_qdrant_client
+    from app.services.vectorstore import COLLECTION_NAME
+
+    client = get_qdrant_client()
+    index = LexicalIndex()
+    offset = None
+    while True:
+        points, offset = client.scroll(COLLECTION_NAME, limit=batch_size, offset=offset, with_payload=True, with_vectors=False)
+        for point in points:
+            payload = point.payload or {}
+            index.add(str(point.id), payload.get("page_content", ""), payload.get("metadata") or {})
+        if offset is None:
+            break
+    save_lexical_index(index)
+    return len(index)
@@ -0,0 +1,288 @@
+# local_replica.py
+import os
+import json
+import time
+import fcntl
+import shutil
+import asyncio
+import threading
+import numpy as np
+from langchain_core.documents import Document
+
+DEFAULT_REPLICA_PATH = ".cache/local_replica"
+
+# Rows dequantized at a time during the coarse scan, bounding the float32 scratch memory
+BLOCK_ROWS = 4096
+
+_local_replica = None
+_local_replica_lock = threading.Lock()
+
+class LocalReplica:
+    """
+    Read-only, memory-mapped snapshot of the Qdrant collection.
+
+    Vectors are kept twice on disk: a quantized coarse matrix (int8 with a
+    per-row scale, or float16) that every search scans, and the exact
+    float32 vectors that only the shortlist is rescored against, so just
+    those rows are paged in. Payloads live in a side table of JSON blobs
+    addressed by offset and are decoded only for returned hits.
+
+    Vectors are L2-normalized on export, so scores are cosine similarities
+    as in the Qdrant collection.
+    """
+    def __init__(self, directory: str):
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.directory = directory
+        self.count = meta["count"]
+        self.dim = meta["dim"]
+        self.dtype = meta["dtype"]
+        self.exported_at = meta["exported_at"]
+        self.point_ids = meta["point_ids"]
+        shape = (self.count, self.dim)
+        if self.count:
+            self.codes = np.memmap(os.path.join(directory, "codes.bin"), dtype=np.int8 if self.dtype == "int8" else np.float16, mode="r", shape=shape)
+            self.scales = np.fromfile(os.path.join(directory, "scales.bin"), dtype=np.float32)
+            self.vectors = np.memmap(os.path.join(directory, "vectors.bin"), dtype=np.float32, mode="r", shape=shape)
+            self.offsets = np.fromfile(os.path.join(directory, "offsets.bin"), dtype=np.int64)
+            self.payloads = np.memmap(os.path.join(directory, "payloads.bin"), dtype=np.uint8, mode="r")
+
+    def __len__(self):
+        return self.count
+
+    def payload(self, row: int):
+        return json.loads(self.payloads[self.offsets[row]:self.offsets[row + 1]].tobytes())
+
+    def search(self, query_vectors, top_k: int, score_threshold: float = 0.0, rescore_multiplier: int = 4):
+        """
+        Batched top-k search: a quantized scan for a shortlist of
+        top_k * rescore_multiplier rows, then exact float32 rescoring.
+
+        Args:
+            query_vectors: Query vectors, shape (queries, dim)
+            top_k: Results per query
+            score_threshold: Minimum exact cosine similarity
+            rescore_multiplier: Shortlist size as a multiple of top_k
+
+        Returns:
+            One list of (row, score) per query, best first
+        """
+        queries = np.asarray(query_vectors, dtype=np.float32).reshape(-1, self.dim)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms > 0, norms, 1.0)
+        if not self.count:
+            return [[] for _ in range(len(queries))]
+
+        coarse = np.empty((len(queries), self.count), dtype=np.float32)
+        for start in range(0, self.count, BLOCK_ROWS):
+            end = min(start + BLOCK_ROWS, self.count)
+            block = self.codes[start:end].astype(np.float32)
+            coarse[:, start:end] = (queries @ block.T) * self.scales[start:end]
+
+        shortlist_size = min(self.count, max(top_k, top_k * rescore_multiplier))
+        if shortlist_size < self.count:
+            shortlists = np.argpartition(-coarse, shortlist_size - 1, axis=1)[:, :shortlist_size]
+        else:
+            shortlists = np.broadcast_to(np.arange(self.count), coarse.shape)
+
+        results = []
+        for query, shortlist in zip(queries, shortlists):
+            # Ascending row order reads the memory-mapped vectors sequentially
+            rows = np.sort(shortlist)
+            exact = self.vectors[rows] @ query
+            order = np.argsort(-exact, kind="stable")[:top_k]
+            results.append([(int(rows[i]), float(exact[i])) for i in order if exact[i] >= score_threshold])
+        return results
+
+    def to_documents(self, hits):
+        """
+        Convert (row, score) hits to Documents shaped like vectorstore._to_documents output.
+        """
+        docs = []
+        for row, score in hits:
+            payload = self.payload(row)
+            metadata = dict(payload.get("metadata") or {})
+            metadata["_id"] = self.point_ids[row]
+            metadata["_score"] = score
+            docs.append(Document(page_content=payload.get("page_content", ""), metadata=metadata))
+        return docs
+
+def _quantize(vectors, dtype: str):
+    """
+    Returns:
+        (codes, per-row scales) such that codes * scale approximates the vectors
+    """
+    if dtype == "float16":
+        return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+def get_local_replica_path():
+    return os.getenv("LOCAL_REPLICA_PATH", DEFAULT_REPLICA_PATH)
+
+def is_local_replica_enabled():
+    return os.getenv("LOCAL_REPLICA_ENABLED", "false").lower() in ("1", "true", "yes")
+
+def _current_version(path: str):
+    try:
+        with open(os.path.join(path, "CURRENT"), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+async def export_local_replica(client, path: str | None = None, dtype: str | None = None, batch_size: int = 1000,
+                               blocking: bool = True):
+    """
+    Export the collection into a new replica snapshot and make it current.
+
+    Points are streamed from Qdrant straight into the snapshot files, so
+    memory stays bounded by one scroll batch. Snapshots are written to a
+    new versioned directory and switched in by atomically replacing the
+    CURRENT pointer; readers that still map an older version keep working.
+
+    Args:
+        client: AsyncQdrantClient to scroll the collection from
+        path: Replica directory, defaults to LOCAL_REPLICA_PATH
+        dtype: "int8" or "float16" for the coarse matrix, defaults to LOCAL_REPLICA_DTYPE
+        batch_size: Points per scroll request
+        blocking: Wait for another exporter to finish instead of skipping
+
+    Returns:
+        Number of points exported, or None if skipped because another export was running
+    """
+    from app.services.vectorstore import COLLECTION_NAME
+
+    path = path or get_local_replica_path()
+    dtype = dtype or os.getenv("LOCAL_REPLICA_DTYPE", "int8")
+    os.makedirs(path, exist_ok=True)
+    lock = open(os.path.join(path, ".lock"), "w")
+    try:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            return None
+
+        version = f"v{time.time_ns()}"
+        directory = os.path.join(path, version)
+        os.makedirs(directory)
+        point_ids = []
+        dim = None
+        offset = 0
+        files = {name: open(os.path.join(directory, f"{name}.bin"), "wb")
+                 for name in ("codes", "scales", "vectors", "offsets", "payloads")}
+        try:
+            files["offsets"].write(np.zeros(1, dtype=np.int64).tobytes())
+            next_page = None
+            while True:
+                points, next_page = await client.scroll(COLLECTION_NAME, limit=batch_size, offset=next_page,
+                                                        with_payload=True, with_vectors=True)
+                if points:
+                    vectors = np.asarray([point.vector for point in points], dtype=np.float32)
+                    dim = vectors.shape[1]
+                    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+                    vectors /= np.where(norms > 0, norms, 1.0)
+                    codes, scales = _quantize(vectors, dtype)
+                    files["codes"].write(codes.tobytes())
+                    files["scales"].write(scales.tobytes())
+                    files["vectors"].write(vectors.tobytes())
+                    ends = []
+                    for point in points:
+                        blob = json.dumps(point.payload or {}, ensure_ascii=False).encode("utf-8")
+                        files["payloads"].write(blob)
+                        offset += len(blob)
+                        ends.append(offset)
+                        point_ids.append(point.id)
+                    files["offsets"].write(np.asarray(ends, dtype=np.int64).tobytes())
+                if next_page is None:
+                    break
+        finally:
+            for f in files.values():
+                f.close()
+
+        meta = {"count": len(point_ids), "dim": dim or 0, "dtype": dtype, "exported_at": time.time(), "point_ids": point_ids}
+        with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        with open(os.path.join(path, "CURRENT.tmp"), "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(os.path.join(path, "CURRENT.tmp"), os.path.join(path, "CURRENT"))
+        for name in os.listdir(path):
+            if name.startswith("v") and name != version:
+                shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+        return len(point_ids)
+    finally:
+        lock.close()
+
+def get_local_replica(reload_interval: float = 30.0):
+    """
+    Get the process-wide replica, mapping the current snapshot on first use.
+
+    A newer snapshot written by ingestion or another worker's refresh is
+    picked up within reload_interval seconds.
+
+    Returns:
+        LocalReplica, or None if the replica is disabled or no snapshot exists
+    """
+    global _local_replica
+    if not is_local_replica_enabled():
+        return None
+    path = get_local_replica_path()
+    with _local_replica_lock:
+        now = time.monotonic()
+        if _local_replica is not None and now - _local_replica.checked_at < reload_interval:
+            return _local_replica
+        version = _current_version(path)
+        if version is None:
+            _local_replica = None
+            return None
+        if _local_replica is None or _local_replica.version != version:
+            try:
+                replica = LocalReplica(os.path.join(path, version))
+                replica.version = version
+                _local_replica = replica
+            except Exception as e:
+                print(f"Error loading local replica from {path}: {e}")
+                if _local_replica is None:
+                    return None
+        _local_replica.checked_at = now
+        return _local_replica
+
+def local_search(query_vectors: list[list[float]], top_k: int, similarity_threshold: float = 0.3):
+    """
+    Search the local replica.
+
+    Returns:
+        One list of Documents per query vector, or None when the replica
+        cannot answer (disabled, not exported yet, or a different vector size)
+        and Qdrant should be queried instead
+    """
+    replica = get_local_replica()
+    if replica is None or not len(replica) or len(query_vectors[0]) != replica.dim:
+        return None
+    hits = replica.search(query_vectors, top_k, score_threshold=similarity_threshold,
+                          rescore_multiplier=int(os.getenv("LOCAL_REPLICA_RESCORE_MULTIPLIER", "4")))
+    return [replica.to_documents(query_hits) for query_hits in hits]
+
+async def run_replica_refresher(interval: float):
+    """
+    Re-export the replica from Qdrant whenever the current snapshot is older
+    than interval seconds. Only one worker exports at a time; the others
+    skip the round and reload the new snapshot.
+    """
+    from app.config.qdrant_config import get_async_qdrant_client
+
+    path = get_local_replica_path()
+    while True:
+        try:
+            meta_path = os.path.join(path, _current_version(path) or "-", "meta.json")
+            age = time.time() - os.path.getmtime(meta_path) if os.path.exists(meta_path) else None
+            if age is None or age >= interval:
+                count = await export_local_replica(get_async_qdrant_client(), path, blocking=False)
+                if count is not None:
+                    print(f"Local replica refreshed: {count} points")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error refreshing local replica: {e}")
+        await asyncio.sleep(min(interval, 60.0))
@@ -0,0 +1,224 @@
+# rerank.py
+import os
+import math
+import asyncio
+import numpy as np
+from langchain_core.documents import Document
+from app.services.lexical_index import tokenize
+from app.util.tokens import count_tokens, truncate_tokens
+
+_reranker = None
+
+# Weight of the reranker score against the retrieval rank prior
+RERANK_WEIGHT = 0.7
+
+class LexicalReranker:
+    """
+    Cheap CPU reranker: BM25 of the query against the candidate set itself.
+    """
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+    def score(self, query: str, texts: list[str]):
+        terms = set(tokenize(query))
+        if not terms or not texts:
+            return np.zeros(len(texts), dtype=np.float32)
+        doc_terms = [tokenize(text) for text in texts]
+        lengths = np.array([len(terms_) for terms_ in doc_terms], dtype=np.float32)
+        avg_length = max(float(lengths.mean()), 1.0)
+        scores = np.zeros(len(texts), dtype=np.float32)
+        for term in terms:
+            tfs = np.array([terms_.count(term) for terms_ in doc_terms], dtype=np.float32)
+            df = int((tfs > 0).sum())
+            if df == 0:
+                continue
+            idf = math.log(1 + (len(texts) - df + 0.5) / (df + 0.5))
+            scores += idf * tfs * (self.k1 + 1) / (tfs + self.k1 * (1 - self.b + self.b * lengths / avg_length))
+        return scores
+
+class CrossEncoderReranker:
+    """
+    Small cross-encoder scored on CPU in batches. Requires sentence-transformers.
+    """
+    def __init__(self, model_name: str, batch_size: int = 32):
+        try:
+            from sentence_transformers import CrossEncoder
+        except ImportError:
+            raise Exception("sentence-transformers is required for RERANKER_MODEL")
+        self.batch_size = batch_size
+        self.model = CrossEncoder(model_name, device="cpu")
+
+    def score(self, query: str, texts: list[str]):
+        if not texts:
+            return np.zeros(0, dtype=np.float32)
+        return np.asarray(self.model.predict([(query, text) for text in texts], batch_size=self.batch_size), dtype=np.float32)
+
+def set_reranker():
+    """
+    Initialize the reranker: a cross-encoder if RERANKER_MODEL is set, otherwise lexical.
+    """
+    global _reranker
+    model_name = os.getenv("RERANKER_MODEL")
+    if model_name:
+        try:
+            _reranker = CrossEncoderReranker(model_name, batch_size=int(os.getenv("RERANKER_BATCH_SIZE", "32")))
+            return
+        except Exception as e:
+            print(f"Error loading reranker {model_name}, using lexical reranker: {e}")
+    _reranker = LexicalReranker()
+
+def get_reranker():
+    if _reranker is None:
+        set_reranker()
+    return _reranker
+
+def _normalize(scores):
+    if len(scores) == 0:
+        return scores
+    low, high = float(scores.min()), float(scores.max())
+    if high - low < 1e-9:
+        return np.zeros_like(scores)
+    return (scores - low) / (high - low)
+
+async def rerank_documents(query: str, docs: list[Document], top_n: int):
+    """
+    Re-rank retrieved candidates and keep the best top_n.
+
+    The reranker score is blended with the retrieval rank so the reranker
+    refines, rather than discards, what retrieval already knew.
+
+    Args:
+        query: Query the candidates were retrieved for
+        docs: Candidates in retrieval order
+        top_n: Number of documents to keep
+
+    Returns:
+        List of Documents, best first, with metadata["rerank_score"]
+    """
+    if not docs:
+        return []
+    reranker = get_reranker()
+    texts = [doc.page_content for doc in docs]
+    if isinstance(reranker, CrossEncoderReranker):
+        # Model inference is CPU bound; keep it off the event loop
+        scores = await asyncio.to_thread(reranker.score, query, texts)
+    else:
+        scores = reranker.score(query, texts)
+    prior = 1.0 - np.arange(len(docs), dtype=np.float32) / len(docs)
+    combined = RERANK_WEIGHT * _normalize(scores) + (1 - RERANK_WEIGHT) * prior
+    order = np.argsort(-combined, kind="stable")[:top_n]
+    ranked = []
+    for idx in order:
+        doc = docs[int(idx)]
+        ranked.append(Document(page_content=doc.page_content, metadata={**doc.metadata, "rerank_score": float(combined[idx])}))
+    return ranked
+
+def _strip_overlap(previous: str, following: str, min_overlap: int = 20, max_overlap: int = 300):
+    """
+    Remove the prefix of `following` that repeats the end of `previous`.
+
+    Only an overlap of at least min_overlap characters that starts and ends
+    on word boundaries counts, so a short accidental match keeps its text.
+
+    Returns:
+        The rest of `following`, or None if there is no overlap
+    """
+    limit = min(len(previous), len(following), max_overlap)
+    for size in range(limit, min_overlap - 1, -1):
+        if not previous.endswith(following[:size]):
+            continue
+        starts_on_word = size == len(previous) or not previous[-size - 1].isalnum() or not following[0].isalnum()
+        ends_on_word = size == len(following) or not following[size].isalnum() or not following[size - 1].isalnum()
+        if starts_on_word and ends_on_word:
+            return following[size:]
+    return None
+
+def merge_adjacent_chunks(docs: list[Document]):
+    """
+    Merge chunks from the same file that are adjacent or overlap.
+
+    Chunks are split with a 100 character overlap, so neighbours repeat
+    text; merged chunks drop the repeated part. The merged document takes
+    the position of its best-ranked member and lists all point IDs in
+    metadata["_ids"].
+
+    Args:
+        docs: Documents, best first
+
+    Returns:
+        List of merged Documents, best first
+    """
+    groups = {}
+    order = []
+    for rank, doc in enumerate(docs):
+        key = doc.metadata.get("rel_filepath")
+        chunk_id = doc.metadata.get("chunk_id")
+        if key is None or not isinstance(chunk_id, int):
+            key = ("__single__", rank)
+        if key not in groups:
+            groups[key] = []
+            order.append(key)
+        groups[key].append((rank, doc))
+
+    merged = []
+    for key in order:
+        members = groups[key]
+        if isinstance(key, tuple):
+            rank, doc = members[0]
+            merged.append((rank, Document(page_content=doc.page_content, metadata={**doc.metadata, "_ids": [doc.metadata.get("_id")]})))
+            continue
+        members.sort(key=lambda item: item[1].metadata["chunk_id"])
+        run = [members[0]]
+        for item in members[1:]:
+            if item[1].metadata["chunk_id"] - run[-1][1].metadata["chunk_id"] <= 1:
+                run.append(item)
+            else:
+                merged.append(_merge_run(run))
+                run = [item]
+        merged.append(_merge_run(run))
+    merged.sort(key=lambda item: item[0])
+    return [doc for _, doc in merged]
+
+def _merge_run(run):
+    best_rank = min(rank for rank, _ in run)
+    text = run[0][1].page_content
+    for _, doc in run[1:]:
+        if doc.page_content == text:
+            continue
+        rest = _strip_overlap(text, doc.page_content)
+        # Without a shared overlap the chunks are separate passages
+        text += rest if rest is not None else "\n" + doc.page_content
+    metadata = {**run[0][1].metadata, "_ids": [doc.metadata.get("_id") for _, doc in run]}
+    if len(run) > 1:
+        metadata["chunk_ids"] = [doc.metadata["chunk_id"] for _, doc in run]
+    return best_rank, Document(page_content=text, metadata=metadata)
+
+def pack_context(docs: list[Document], token_budget: int, model: str = "gpt-4o-mini"):
+    """
+    Greedily pack documents, best first, into a token budget.
+
+    Documents that do not fit are skipped so a smaller one further down can
+    still use the remaining space; exact duplicates are dropped.
+
+    Returns:
+        List of Documents that fit the budget
+    """
+    packed = []
+    seen = set()
+    used = 0
+    for doc in docs:
+        text = doc.page_content.strip()
+        if not text or text in seen:
+            continue
+        tokens = count_tokens(text, model)
+        if used + tokens > token_budget:
+            continue
+        seen.add(text)
+        packed.append(doc)
+        used += tokens
+    if not packed and docs:
+        # Never return an empty context just because the best document is large
+        best = docs[0]
+        packed.append(Document(page_content=truncate_tokens(best.page_content, token_budget, model), metadata=best.metadata))
+    return packed
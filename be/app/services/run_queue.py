@@ -0,0 +1,163 @@
+# run_queue.py
+import os
+import json
+import uuid
+import queue
+import threading
+from datetime import datetime, timezone
+from app.config.langsmith_config import get_langsmith_client, get_langsmith_tracer, is_langsmith_enabled
+
+_run_queue = None
+_run_queue_lock = threading.Lock()
+
+class RunQueue:
+    """
+    Bounded in-memory queue of finished request records, flushed in batches
+    by a background thread.
+
+    submit() never blocks: when the queue is full the record is dropped and
+    counted. The sender is called from the flusher thread only, so slow or
+    failing uploads never touch the event loop.
+
+    Args:
+        sender: Callable receiving a list of queued records
+        max_size: Queue capacity
+        batch_size: Maximum records per upload
+        flush_interval: Seconds to wait for a batch to fill before sending it anyway
+    """
+    def __init__(self, sender, max_size: int = 1000, batch_size: int = 100, flush_interval: float = 2.0):
+        self.sender = sender
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_size)
+        self._stopped = threading.Event()
+        self.stats = {"submitted": 0, "dropped": 0, "sent": 0, "batches": 0, "failed": 0}
+        self._thread = threading.Thread(target=self._loop, name="langsmith-flusher", daemon=True)
+        self._thread.start()
+
+    def submit(self, run: dict):
+        try:
+            self._queue.put_nowait(run)
+            self.stats["submitted"] += 1
+            return True
+        except queue.Full:
+            self.stats["dropped"] += 1
+            return False
+
+    def _next_batch(self):
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=self.flush_interval))
+        except queue.Empty:
+            return batch
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _send(self, batch: list):
+        try:
+            self.sender(batch)
+            self.stats["sent"] += len(batch)
+            self.stats["batches"] += 1
+        except Exception as e:
+            self.stats["failed"] += len(batch)
+            print(f"Error sending {len(batch)} runs to LangSmith: {e}")
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            batch = self._next_batch()
+            if batch:
+                self._send(batch)
+
+    def close(self, timeout: float = 5.0):
+        """
+        Stop the flusher and send whatever is still queued.
+        """
+        self._stopped.set()
+        self._thread.join(timeout)
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) >= self.batch_size:
+                self._send(batch)
+                batch = []
+        if batch:
+            self._send(batch)
+
+    def get_stats(self):
+        return {**self.stats, "queued": self._queue.qsize()}
+
+def _langsmith_sender(records: list):
+    get_langsmith_client().batch_ingest_runs(create=[build_qa_run(**record) for record in records])
+
+def get_run_queue():
+    """
+    Get the process-wide run queue, or None when LangSmith tracing is disabled.
+    """
+    global _run_queue
+    if not is_langsmith_enabled():
+        return None
+    with _run_queue_lock:
+        if _run_queue is None:
+            _run_queue = RunQueue(
+                _langsmith_sender,
+                max_size=int(os.getenv("LANGSMITH_QUEUE_SIZE", "1000")),
+                batch_size=int(os.getenv("LANGSMITH_BATCH_SIZE", "100")),
+                flush_interval=float(os.getenv("LANGSMITH_FLUSH_INTERVAL", "2.0")),
+            )
+        return _run_queue
+
+def close_run_queue():
+    global _run_queue
+    with _run_queue_lock:
+        if _run_queue is not None:
+            _run_queue.close()
+            _run_queue = None
+
+def _timestamp(ts: float):
+    return datetime.fromtimestamp(ts, tz=timezone.utc)
+
+def build_qa_run(body: bytes, start_time: float, first_byte_time: float | None, end_time: float,
+                 status_code: int | None, response_bytes: int, error: str | None = None):
+    """
+    Turn what the middleware observed about one /qa request into a LangSmith run.
+
+    Called on the flusher thread, so parsing the request body never costs
+    the request path anything.
+    """
+    tracer = get_langsmith_tracer()
+    try:
+        request_data = json.loads(body) if body else {}
+    except ValueError:
+        request_data = {}
+    run_id = str(uuid.uuid4())
+    start = _timestamp(start_time)
+    run = {
+        "id": run_id,
+        "trace_id": run_id,
+        "dotted_order": f"{start.strftime('%Y%m%dT%H%M%S%fZ')}{run_id}",
+        "session_name": tracer.project_name if tracer else None,
+        "name": "qa_request",
+        "run_type": "chain",
+        "start_time": start,
+        "end_time": _timestamp(end_time),
+        "inputs": {
+            "history": request_data.get("history", []),
+            "new_message": request_data.get("message", ""),
+        },
+        "outputs": {
+            "duration": end_time - start_time,
+            "time_to_first_byte": (first_byte_time - start_time) if first_byte_time else None,
+            "status_code": status_code,
+            "response_bytes": response_bytes,
+        },
+    }
+    if error:
+        run["error"] = error
+    return run
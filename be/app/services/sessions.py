@@ -0,0 +1,133 @@
+# sessions.py
+import os
+import secrets
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from app.services.history import ConversationWindow
+from app.util.tokens import count_tokens
+from app.util.shared_store import create_store
+
+_session_store = None
+
+_MESSAGE_CLASSES = {"system": SystemMessage, "user": HumanMessage, "assistant": AIMessage}
+
+def _line_tokens(role: str, content: str):
+    # Same prompt line HistoryManager would count: "<MessageClass>: <content>" plus the newline
+    return count_tokens(f"{_MESSAGE_CLASSES[role].__name__}: {content}") + 1
+
+class Session:
+    """
+    A server-side conversation: the retained messages as [role, content, tokens]
+    rows, and how many older messages were dropped from the front.
+    """
+    def __init__(self, session_id: str, messages: list, offset: int = 0):
+        self.id = session_id
+        self.messages = messages
+        self.offset = offset
+
+    def window(self, new_message: str):
+        """
+        The conversation as LangChain messages, ending with the new user message.
+
+        Returns:
+            ConversationWindow with precomputed token counts
+        """
+        rows = self.messages + [["user", new_message, _line_tokens("user", new_message)]]
+        return ConversationWindow(
+            [_MESSAGE_CLASSES[role](content=content) for role, content, _ in rows],
+            offset=self.offset,
+            token_counts=[tokens for _, _, tokens in rows],
+        )
+
+    def to_dict(self):
+        return {"messages": self.messages, "offset": self.offset}
+
+class SessionStore:
+    """
+    Conversation sessions kept on the server, so a client sends only the
+    session ID and its new message instead of the whole history.
+
+    Each session keeps at most max_messages messages; older ones drop off
+    the front once HistoryManager has long folded them into the rolling
+    summary kept under the same ID. Sessions expire ttl seconds after
+    their last turn. The default in-memory store also evicts the least
+    recently used sessions beyond its capacity; with a redis store every
+    worker sees the same sessions.
+
+    Concurrent turns in one session are not serialized: the last one to
+    finish decides the stored history.
+
+    Args:
+        store: Key/value store from create_store
+        ttl: Seconds a session is kept after its last turn
+        max_messages: Messages retained per session
+    """
+    def __init__(self, store, ttl: float = 3600.0, max_messages: int = 40):
+        self.store = store
+        self.ttl = ttl
+        self.max_messages = max_messages
+        self.stats = {"created": 0, "turns": 0, "not_found": 0}
+
+    async def create(self, history: list | None = None):
+        """
+        Start a session, optionally seeded with an existing conversation.
+
+        Args:
+            history: Optional list of (role, content) pairs
+
+        Returns:
+            Session
+        """
+        messages = [[role, content, _line_tokens(role, content)] for role, content in history or []]
+        offset = max(0, len(messages) - self.max_messages)
+        session = Session(secrets.token_urlsafe(18), messages[offset:], offset)
+        await self.store.set(session.id, session.to_dict(), self.ttl)
+        self.stats["created"] += 1
+        return session
+
+    async def get(self, session_id: str):
+        """
+        Returns:
+            Session, or None if it does not exist or has expired
+        """
+        data = await self.store.get(session_id)
+        if data is None:
+            self.stats["not_found"] += 1
+            return None
+        return Session(session_id, data["messages"], data["offset"])
+
+    async def append_turn(self, session_id: str, question: str, answer: str):
+        """
+        Record a finished question and answer, dropping the oldest messages beyond max_messages.
+        """
+        session = await self.get(session_id)
+        if session is None:
+            return
+        session.messages.append(["user", question, _line_tokens("user", question)])
+        session.messages.append(["assistant", answer, _line_tokens("assistant", answer)])
+        overflow = len(session.messages) - self.max_messages
+        if overflow > 0:
+            session.messages = session.messages[overflow:]
+            session.offset += overflow
+        await self.store.set(session_id, session.to_dict(), self.ttl)
+        self.stats["turns"] += 1
+
+    def get_stats(self):
+        return dict(self.stats)
+
+def set_session_store():
+    """
+    Initialize the session store from environment settings.
+    """
+    global _session_store
+    max_entries = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+    _session_store = SessionStore(
+        # SESSION_STORE_BACKEND unset follows SHARED_STORE_BACKEND
+        create_store(os.getenv("SESSION_STORE_BACKEND"), prefix="acs-chat:session:", max_entries=max_entries),
+        ttl=float(os.getenv("SESSION_TTL", "3600")),
+        max_messages=int(os.getenv("SESSION_MAX_MESSAGES", "40")),
+    )
+
+def get_session_store():
+    if _session_store is None:
+        set_session_store()
+    return _session_store
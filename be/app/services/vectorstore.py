@@ -1,35 +1,46 @@
 # vectorstore.py
 import os
-from langchain_qdrant import QdrantVectorStore
-from qdrant_client import QdrantClient
 from app.config.embedding_config import get_embedding
-from qdrant_client.models import VectorParams, Distance
+from app.config.qdrant_config import get_qdrant_client, get_async_qdrant_client
 from langchain_core.documents import Document
+from app.util.metrics import record_upstream_error, time_stage
+from app.util.admission import Overloaded, get_limiter
+from app.util.resilience import CircuitOpen, get_guard
+from app.services.local_replica import local_search
+from app.services.collection import build_filter
+
+COLLECTION_NAME = "ACS-Chat"
 
 _vectorstore = None
 
+def _to_documents(points):
+    """
+    Convert scored Qdrant points to LangChain Document format.
+    """
+    docs = []
+    for point in points:
+        metadata = dict(point.payload.get("metadata") or {})
+        metadata["_id"] = point.id
+        if getattr(point, "score", None) is not None:
+            metadata["_score"] = point.score
+        doc = Document(
+            page_content=point.payload.get("page_content", ""),
+            metadata=metadata
+        )
+        docs.append(doc)
+    return docs
+
 def set_vectorstore():
     global _vectorstore
+    from langchain_qdrant import QdrantVectorStore
     try:
-        # Check if using Qdrant Cloud
-        qdrant_url = os.getenv("QDRANT_URL")
-        qdrant_api_key = os.getenv("QDRANT_API_KEY")
-        
-        if qdrant_url and qdrant_api_key:
-            # Use Qdrant Cloud
-            client = QdrantClient(
-                url=qdrant_url,
-                api_key=qdrant_api_key
-            )
-        else:
-            # Use local Qdrant
-            qdrant_host = os.getenv("QDRANT_HOST", "localhost")
-            client = QdrantClient(host=qdrant_host, port=6333, check_compatibility=False)
+        # Reuse the process-wide pooled client
+        client = get_qdrant_client()
 
         # Create QdrantVectorStore
         _vectorstore = QdrantVectorStore(
             client=client,
-            collection_name="ACS-Chat",
+            collection_name=COLLECTION_NAME,
             embedding=get_embedding(),
         )
     except Exception as e:
@@ -45,7 +56,8 @@ def get_vectorstore():
         set_vectorstore()
     return _vectorstore
 
-def search_vectorstore(query_vector: list[float], top_k: int, similarity_threshold: float = 0.3):
+def search_vectorstore(query_vector: list[float], top_k: int, similarity_threshold: float = 0.3,
+                       filters: dict | None = None):
     """
     Search for similar documents using vector similarity.
     
@@ -53,47 +65,144 @@ def search_vectorstore(query_vector: list[float], top_k: int, similarity_thresho
         query_vector: The query vector to search for
         top_k: Number of top results to return
         similarity_threshold: Minimum similarity score (0.0 to 1.0) for documents to be considered relevant
+        filters: Optional metadata filters, e.g. {"sub_dir": "COMP1511"}; see collection.build_filter
         
     Returns:
         List of Document objects with similar content
+
+    Raises:
+        ValueError: For a filter on an unindexed field
     """
+    query_filter = build_filter(filters)
     try:
-        # Use Qdrant client directly for search
-        qdrant_url = os.getenv("QDRANT_URL")
-        qdrant_api_key = os.getenv("QDRANT_API_KEY")
-        
-        if qdrant_url and qdrant_api_key:
-            # Use Qdrant Cloud
-            client = QdrantClient(
-                url=qdrant_url,
-                api_key=qdrant_api_key
-            )
-        else:
-            # Use local Qdrant
-            qdrant_host = os.getenv("QDRANT_HOST", "localhost")
-            client = QdrantClient(host=qdrant_host, port=6333, check_compatibility=False)
-            
-        search_results = client.search(
-            collection_name="ACS-Chat",
-            query_vector=query_vector,
+        # Use the shared Qdrant client directly for search
+        client = get_qdrant_client()
+        search_results = client.query_points(
+            collection_name=COLLECTION_NAME,
+            query=query_vector,
+            query_filter=query_filter,
             limit=top_k,
             with_payload=True,
             score_threshold=similarity_threshold
-        )
+        ).points
         
-        # Convert to LangChain Document format
-        docs = []
-        for result in search_results:
-            doc = Document(
-                page_content=result.payload.get("page_content", ""),
-                metadata=result.payload.get("metadata", {})
-            )
-            docs.append(doc)
+        return _to_documents(search_results)
+    except Exception as e:
+        print(f"Error searching vectorstore: {e}")
+        return []
+
+def _local_search(query_vectors: list[list[float]], top_k: int, similarity_threshold: float):
+    """
+    Answer from the in-process replica when it is enabled and loaded.
+
+    Returns:
+        One list of Documents per query vector, or None to query Qdrant
+    """
+    try:
+        with time_stage("local_search"):
+            return local_search(query_vectors, top_k, similarity_threshold)
+    except Exception as e:
+        # Qdrant stays the source of truth; a broken replica only costs the round-trip
+        print(f"Error searching local replica: {e}")
+        return None
+
+async def asearch_vectorstore(query_vector: list[float], top_k: int, similarity_threshold: float = 0.3,
+                              filters: dict | None = None):
+    """
+    Search for similar documents without blocking the event loop.
+    
+    Args:
+        query_vector: The query vector to search for
+        top_k: Number of top results to return
+        similarity_threshold: Minimum similarity score (0.0 to 1.0) for documents to be considered relevant
+        filters: Optional metadata filters, e.g. {"sub_dir": "COMP1511"}; see collection.build_filter
         
-        return docs
+    Returns:
+        List of Document objects with similar content
+
+    Raises:
+        Overloaded: If the search limiter sheds the call
+        ValueError: For a filter on an unindexed field
+    """
+    query_filter = build_filter(filters)
+    # Filtered searches go to Qdrant, whose payload indexes the replica does not have
+    local = _local_search([query_vector], top_k, similarity_threshold) if query_filter is None else None
+    if local is not None:
+        return local[0]
+    client = get_async_qdrant_client()
+
+    async def attempt():
+        async with get_limiter("search").limit():
+            return await client.query_points(
+                collection_name=COLLECTION_NAME,
+                query=query_vector,
+                query_filter=query_filter,
+                limit=top_k,
+                with_payload=True,
+                score_threshold=similarity_threshold
+            )
+
+    try:
+        # Bounded by the request deadline; a search slower than the observed p95 is hedged
+        response = await get_guard("search").call(attempt)
+        return _to_documents(response.points)
+    except Overloaded:
+        raise
+    except CircuitOpen:
+        # Counted by the breaker; the caller falls back to lexical results
+        return []
     except Exception as e:
         print(f"Error searching vectorstore: {e}")
+        record_upstream_error("qdrant")
         return []
 
+async def asearch_vectorstore_batch(query_vectors: list[list[float]], top_k: int, similarity_threshold: float = 0.3,
+                                    batch_size: int = 64, filters: dict | None = None):
+    """
+    Search for many query vectors with batched Qdrant requests.
+
+    Args:
+        query_vectors: Query vectors to search for
+        top_k: Number of top results per query
+        similarity_threshold: Minimum similarity score for documents to be considered relevant
+        batch_size: Queries sent per Qdrant request
+        filters: Optional metadata filters applied to every query
+
+    Returns:
+        One list of Document objects per query vector, empty for a failed batch
+
+    Raises:
+        Overloaded: If the search limiter sheds the call
+        ValueError: For a filter on an unindexed field
+    """
+    query_filter = build_filter(filters)
+    local = _local_search(query_vectors, top_k, similarity_threshold) if query_filter is None else None
+    if local is not None:
+        return local
+    from qdrant_client import models
+    client = get_async_qdrant_client()
+    results = []
+    for start in range(0, len(query_vectors), batch_size):
+        requests = [
+            models.QueryRequest(query=vector, filter=query_filter, limit=top_k, with_payload=True,
+                                score_threshold=similarity_threshold)
+            for vector in query_vectors[start:start + batch_size]
+        ]
+
+        async def attempt():
+            async with get_limiter("search").limit():
+                return await client.query_batch_points(collection_name=COLLECTION_NAME, requests=requests)
+
+        try:
+            responses = await get_guard("search").call(attempt, hedge=False, stage_timeout=0)
+            results.extend(_to_documents(response.points) for response in responses)
+        except Overloaded:
+            raise
+        except Exception as e:
+            print(f"Error batch searching vectorstore: {e}")
+            record_upstream_error("qdrant")
+            results.extend([] for _ in requests)
+    return results
+
 # Initialize vectorstore on first use
 print("Vectorstore will be initialized on first use")
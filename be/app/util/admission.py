@@ -0,0 +1,212 @@
+import os
+import math
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from app.util.metrics import record_shed
+
+_limiters = {}
+
+class Overloaded(Exception):
+    """
+    Raised when a request cannot be admitted within its queue deadline.
+    """
+    def __init__(self, name: str, reason: str, retry_after: float = 1.0):
+        super().__init__(f"{name} is overloaded ({reason}), retry in {math.ceil(retry_after)}s")
+        self.name = name
+        self.reason = reason
+        self.retry_after = retry_after
+
+    def retry_after_header(self):
+        return str(max(1, math.ceil(self.retry_after)))
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at per_minute / 60 tokens per second.
+
+    Reservations may drive the balance negative; later callers then wait
+    for the refill, so requests are paced in arrival order.
+    """
+    def __init__(self, per_minute: float, burst: float | None = None):
+        self.rate = per_minute / 60.0
+        self.capacity = burst or per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float):
+        """
+        Seconds until amount tokens would be available.
+        """
+        self._refill()
+        return max(0.0, (min(amount, self.capacity) - self._tokens) / self.rate)
+
+    def take(self, amount: float):
+        self._refill()
+        self._tokens -= min(amount, self.capacity)
+
+    def refund(self, amount: float):
+        if amount > 0:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+class ConcurrencyLimiter:
+    """
+    Concurrency limit with a bounded wait queue and optional RPM/TPM buckets.
+
+    A caller that finds every slot busy waits in the queue for at most
+    queue_timeout seconds; when the queue is already full it is rejected
+    at once. Rejections raise Overloaded so the API can answer 503 with
+    Retry-After instead of letting latency grow for everyone.
+
+    The primitives belong to the serving event loop; the limits apply per
+    worker process.
+
+    Args:
+        name: Limiter name used in errors and metrics
+        max_concurrency: Maximum callers holding a slot, 0 for unlimited
+        max_queue: Maximum callers waiting for a slot
+        queue_timeout: Seconds a caller may wait for a slot and for the rate buckets
+        rpm: Requests per minute allowed upstream, 0 disables
+        tpm: Tokens per minute allowed upstream, 0 disables
+    """
+    def __init__(self, name: str, max_concurrency: int, max_queue: int = 100, queue_timeout: float = 10.0,
+                 rpm: float = 0, tpm: float = 0):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency > 0 else None
+        self._requests = TokenBucket(rpm) if rpm > 0 else None
+        self._tokens = TokenBucket(tpm) if tpm > 0 else None
+        self.waiting = 0
+        self.active = 0
+        self.stats = {"admitted": 0, "shed_queue_full": 0, "shed_timeout": 0, "shed_rate_limit": 0}
+
+    def _shed(self, reason: str, retry_after: float):
+        self.stats[f"shed_{reason}"] += 1
+        record_shed(self.name, reason)
+        raise Overloaded(self.name, reason, retry_after)
+
+    async def acquire(self, tokens: int = 0):
+        """
+        Wait for a slot and for rate budget.
+
+        Args:
+            tokens: Upstream tokens the call is expected to use, for the TPM bucket
+
+        Raises:
+            Overloaded: If the queue is full or the deadline passes first
+        """
+        deadline = time.monotonic() + self.queue_timeout
+        if self._semaphore is not None:
+            if self.active + self.waiting >= self.max_concurrency + self.max_queue:
+                self._shed("queue_full", self.queue_timeout)
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self._shed("timeout", self.queue_timeout)
+            finally:
+                self.waiting -= 1
+        self.active += 1
+        try:
+            await self._pace(tokens, deadline)
+        except BaseException:
+            self.active -= 1
+            if self._semaphore is not None:
+                self._semaphore.release()
+            raise
+        self.stats["admitted"] += 1
+
+    async def _pace(self, tokens: int, deadline: float):
+        buckets = [(self._requests, 1), (self._tokens, tokens)]
+        buckets = [(bucket, amount) for bucket, amount in buckets if bucket is not None and amount > 0]
+        if not buckets:
+            return
+        wait = max(bucket.wait_time(amount) for bucket, amount in buckets)
+        if time.monotonic() + wait > deadline:
+            self._shed("rate_limit", wait)
+        # Reserved up front so concurrent callers queue behind this one
+        for bucket, amount in buckets:
+            bucket.take(amount)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def release(self, unused_tokens: int = 0):
+        """
+        Free the slot; unused_tokens returns an over-estimate to the TPM bucket.
+        """
+        self.active -= 1
+        if self._tokens is not None:
+            self._tokens.refund(unused_tokens)
+        if self._semaphore is not None:
+            self._semaphore.release()
+
+    @asynccontextmanager
+    async def limit(self, tokens: int = 0):
+        """
+        Hold a slot for the enclosed block.
+        """
+        await self.acquire(tokens)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def get_stats(self):
+        return {**self.stats, "active": self.active, "waiting": self.waiting, "max_concurrency": self.max_concurrency}
+
+def _create_limiter(name: str):
+    queue_size = int(os.getenv("UPSTREAM_QUEUE_SIZE", "100"))
+    queue_timeout = float(os.getenv("UPSTREAM_QUEUE_TIMEOUT", "10"))
+    if name == "qa":
+        return ConcurrencyLimiter(
+            "qa",
+            int(os.getenv("QA_MAX_CONCURRENT_STREAMS", "64")),
+            max_queue=int(os.getenv("QA_QUEUE_SIZE", "64")),
+            queue_timeout=float(os.getenv("QA_QUEUE_TIMEOUT", "5")),
+        )
+    if name == "embeddings":
+        return ConcurrencyLimiter(
+            "embeddings",
+            int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "16")),
+            max_queue=queue_size,
+            queue_timeout=queue_timeout,
+            rpm=float(os.getenv("OPENAI_EMBEDDING_RPM", "0")),
+            tpm=float(os.getenv("OPENAI_EMBEDDING_TPM", "0")),
+        )
+    if name == "search":
+        return ConcurrencyLimiter(
+            "search",
+            int(os.getenv("SEARCH_MAX_CONCURRENCY", "16")),
+            max_queue=queue_size,
+            queue_timeout=queue_timeout,
+        )
+    if name == "llm":
+        return ConcurrencyLimiter(
+            "llm",
+            int(os.getenv("LLM_MAX_CONCURRENCY", "32")),
+            max_queue=queue_size,
+            queue_timeout=queue_timeout,
+            rpm=float(os.getenv("OPENAI_CHAT_RPM", "0")),
+            tpm=float(os.getenv("OPENAI_CHAT_TPM", "0")),
+        )
+    raise ValueError(f"Unknown limiter: {name}")
+
+def get_limiter(name: str):
+    """
+    Get the process-wide limiter for "qa", "embeddings", "search" or "llm".
+    """
+    limiter = _limiters.get(name)
+    if limiter is None:
+        limiter = _create_limiter(name)
+        _limiters[name] = limiter
+    return limiter
+
+def get_admission_stats():
+    return {name: limiter.get_stats() for name, limiter in _limiters.items()}
@@ -0,0 +1,171 @@
+import os
+import sqlite3
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+class SqliteEmbeddingStore:
+    """
+    Persistent embedding tier: float32 vectors stored as BLOBs in a SQLite file.
+    """
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+
+    def get_many(self, keys: list[str]):
+        """
+        Returns:
+            dict of key -> float32 array for the keys that are stored
+        """
+        found = {}
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, items: dict):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, vector.astype(np.float32).tobytes()) for key, vector in items.items()],
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that caches vectors by model name + content hash.
+
+    Lookups go memory LRU -> SQLite -> upstream model, and every upstream
+    result is written back to both tiers. Identical texts inside one batch
+    are only embedded once.
+    """
+    def __init__(self, embeddings: Embeddings, model_name: str, memory_max_entries: int = 10000, disk_path: str | None = None):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.memory_max_entries = memory_max_entries
+        self._memory = OrderedDict()
+        self._memory_lock = threading.Lock()
+        self._disk = SqliteEmbeddingStore(disk_path) if disk_path else None
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    def _key(self, text: str):
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector):
+        with self._memory_lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_max_entries:
+                self._memory.popitem(last=False)
+
+    def _lookup(self, keys: list[str]):
+        """
+        Resolve keys from the memory tier, then the disk tier.
+
+        Returns:
+            dict of key -> float32 array for every cached key
+        """
+        found = {}
+        with self._memory_lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+        self.stats["memory_hits"] += len(found)
+        missing = [key for key in keys if key not in found]
+        if missing and self._disk is not None:
+            from_disk = self._disk.get_many(missing)
+            self.stats["disk_hits"] += len(from_disk)
+            for key, vector in from_disk.items():
+                self._remember(key, vector)
+            found.update(from_disk)
+        return found
+
+    def _store(self, keys: list[str], vectors: list[list[float]]):
+        items = {key: np.asarray(vector, dtype=np.float32) for key, vector in zip(keys, vectors)}
+        for key, vector in items.items():
+            self._remember(key, vector)
+        if self._disk is not None:
+            self._disk.put_many(items)
+
+    def _plan(self, texts: list[str]):
+        keys = [self._key(text) for text in texts]
+        unique = list(dict.fromkeys(keys))
+        return keys, unique
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys, unique = self._plan(texts)
+        found = self._lookup(unique)
+        missing = [key for key in unique if key not in found]
+        if missing:
+            self.stats["misses"] += len(missing)
+            text_by_key = dict(zip(keys, texts))
+            vectors = self.embeddings.embed_documents([text_by_key[key] for key in missing])
+            self._store(missing, vectors)
+            found.update(zip(missing, (np.asarray(v, dtype=np.float32) for v in vectors)))
+        return [found[key].tolist() for key in keys]
+
+    def embed_query(self, text: str) -> list[float]:
+        key = self._key(text)
+        found = self._lookup([key])
+        if key in found:
+            return found[key].tolist()
+        self.stats["misses"] += 1
+        vector = self.embeddings.embed_query(text)
+        self._store([key], [vector])
+        return vector
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys, unique = self._plan(texts)
+        found = await asyncio.to_thread(self._lookup, unique)
+        missing = [key for key in unique if key not in found]
+        if missing:
+            self.stats["misses"] += len(missing)
+            text_by_key = dict(zip(keys, texts))
+            vectors = await self.embeddings.aembed_documents([text_by_key[key] for key in missing])
+            await asyncio.to_thread(self._store, missing, vectors)
+            found.update(zip(missing, (np.asarray(v, dtype=np.float32) for v in vectors)))
+        return [found[key].tolist() for key in keys]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        key = self._key(text)
+        with self._memory_lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+        if vector is not None:
+            # Hot queries are answered without leaving the event loop
+            self.stats["memory_hits"] += 1
+            return vector.tolist()
+        found = await asyncio.to_thread(self._lookup, [key])
+        if key in found:
+            return found[key].tolist()
+        self.stats["misses"] += 1
+        vector = await self.embeddings.aembed_query(text)
+        await asyncio.to_thread(self._store, [key], [vector])
+        return vector
+
+    def get_stats(self):
+        return {**self.stats, "memory_entries": len(self._memory)}
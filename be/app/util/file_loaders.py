@@ -0,0 +1,224 @@
+import os
+import re
+import mmap
+import codecs
+import importlib.util
+from html.parser import HTMLParser
+from langchain_text_splitters import Language, RecursiveCharacterTextSplitter
+
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 100
+
+# Bytes inspected to tell text from binary and guess the encoding
+SNIFF_BYTES = 8192
+# Characters decoded per read; also the window the splitter works on, so files
+# smaller than this are split exactly as one string
+BLOCK_CHARS = 1 << 20
+# Text with more C0 control characters than this is treated as binary
+MAX_CONTROL_RATIO = 0.1
+
+_TEXT_CONTROLS = {"\t", "\n", "\r", "\f", "\v", "\x1b", "\b"}
+_PDF_MAGIC = b"%PDF-"
+
+_loaders = {}
+
+class FileLoader:
+    """
+    How to turn one file format into text blocks and where to split them.
+
+    Args:
+        name: Format name reported by detect_loader
+        read_blocks: Callable (file_path, encoding) -> iterator of text blocks
+        separators: Split points for RecursiveCharacterTextSplitter, best first
+        binary: The format is binary, so encoding detection is skipped
+        is_separator_regex: Whether separators are regular expressions
+    """
+    def __init__(self, name: str, read_blocks, separators: list[str] | None = None, binary: bool = False,
+                 is_separator_regex: bool = False):
+        self.name = name
+        self.read_blocks = read_blocks
+        self.separators = separators
+        self.binary = binary
+        self.is_separator_regex = is_separator_regex
+
+    def splitter(self):
+        return RecursiveCharacterTextSplitter(
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP,
+            separators=self.separators,
+            is_separator_regex=self.is_separator_regex,
+        )
+
+def register_loader(extensions: list[str], loader: FileLoader):
+    """
+    Use loader for files with any of these extensions (lower case, with the dot).
+    """
+    for extension in extensions:
+        _loaders[extension] = loader
+
+def sniff_encoding(file_path: str):
+    """
+    Guess a file's text encoding from its first SNIFF_BYTES bytes.
+
+    Returns:
+        Encoding name, or None if the file looks binary
+    """
+    with open(file_path, "rb") as f:
+        head = f.read(SNIFF_BYTES)
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    if b"\x00" in head:
+        return None
+    try:
+        text = head.decode("utf-8")
+        encoding = "utf-8"
+    except UnicodeDecodeError as e:
+        if len(head) == SNIFF_BYTES and e.start >= len(head) - 3 and e.reason == "unexpected end of data":
+            # The sample ends inside a multi-byte character
+            text = head[:e.start].decode("utf-8")
+            encoding = "utf-8"
+        else:
+            from charset_normalizer import from_bytes
+            match = from_bytes(head).best()
+            if match is None:
+                return None
+            text = str(match)
+            encoding = match.encoding
+    controls = sum(1 for char in text if char < " " and char not in _TEXT_CONTROLS)
+    if text and controls / len(text) > MAX_CONTROL_RATIO:
+        return None
+    return encoding
+
+def detect_loader(file_path: str):
+    """
+    Pick the loader for a file without reading more than its first few kilobytes.
+
+    Returns:
+        (FileLoader, encoding), or (None, reason) for files that should not be embedded
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    loader = _loaders.get(extension, _loaders[""])
+    with open(file_path, "rb") as f:
+        is_pdf = f.read(len(_PDF_MAGIC)) == _PDF_MAGIC
+    if is_pdf:
+        pdf_loader = _loaders.get(".pdf")
+        return (pdf_loader, None) if pdf_loader else (None, "pdf (install pypdf to ingest PDFs)")
+    if loader.binary:
+        return None, f"not a valid {loader.name} file"
+    encoding = sniff_encoding(file_path)
+    if encoding is None:
+        return None, "binary"
+    return loader, encoding
+
+def iter_chunks(file_path: str, loader: FileLoader | None = None, encoding: str | None = None):
+    """
+    Read and split a file incrementally.
+
+    Text is read BLOCK_CHARS at a time and split within a window of about
+    that size; the last chunk of each window is carried over and split
+    again with the next block, so a chunk never ends at an arbitrary block
+    boundary. Memory stays bounded by the window, whatever the file size.
+
+    Args:
+        file_path: File to read
+        loader: FileLoader, detected from the file if not given
+        encoding: Text encoding, detected from the file if not given
+
+    Yields:
+        Chunk texts in file order; nothing for files detect_loader rejects
+    """
+    if loader is None:
+        loader, encoding = detect_loader(file_path)
+        if loader is None:
+            return
+    splitter = loader.splitter()
+    buffer = ""
+    for block in loader.read_blocks(file_path, encoding):
+        buffer += block
+        if len(buffer) < BLOCK_CHARS:
+            continue
+        chunks = splitter.split_text(buffer)
+        tail_start = buffer.rfind(chunks[-1]) if chunks else -1
+        if tail_start <= 0:
+            yield from chunks
+            buffer = ""
+            continue
+        yield from chunks[:-1]
+        buffer = buffer[tail_start:]
+    if buffer:
+        yield from splitter.split_text(buffer)
+
+def _read_text(file_path: str, encoding: str | None):
+    with open(file_path, "r", encoding=encoding, errors="replace") as f:
+        while block := f.read(BLOCK_CHARS):
+            yield block
+
+class _HTMLText(HTMLParser):
+    """
+    Collects the visible text of an HTML document as Markdown-like text:
+    headings become "#" lines and block elements start new paragraphs, so
+    the Markdown separators split it along the document structure.
+    """
+    BLOCKS = {"p", "div", "section", "article", "li", "tr", "table", "ul", "ol", "pre", "blockquote", "br", "hr"}
+    HIDDEN = {"script", "style", "noscript", "template", "head"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._hidden = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.HIDDEN:
+            self._hidden += 1
+        elif len(tag) == 2 and tag[0] == "h" and tag[1] in "123456":
+            self.parts.append("\n\n" + "#" * int(tag[1]) + " ")
+        elif tag in self.BLOCKS:
+            self.parts.append("\n\n" if tag != "br" else "\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.HIDDEN:
+            self._hidden = max(0, self._hidden - 1)
+        elif tag in self.BLOCKS or (len(tag) == 2 and tag[0] == "h" and tag[1] in "123456"):
+            self.parts.append("\n\n")
+
+    def handle_data(self, data):
+        if not self._hidden:
+            self.parts.append(re.sub(r"\s+", " ", data))
+
+    def take(self):
+        # Nested blocks leave runs of blank lines; one paragraph break is enough for the splitter
+        text = re.sub(r"\n[ \n]*\n *", "\n\n", "".join(self.parts))
+        self.parts = []
+        return text
+
+def _read_html(file_path: str, encoding: str | None):
+    parser = _HTMLText()
+    for block in _read_text(file_path, encoding):
+        parser.feed(block)
+        yield parser.take()
+    parser.close()
+    yield parser.take()
+
+def _read_pdf(file_path: str, encoding: str | None):
+    from pypdf import PdfReader
+
+    # pypdf seeks around the cross-reference table; a memory map lets it do that
+    # without reading the whole file into memory first
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        reader = PdfReader(data)
+        for page in reader.pages:
+            text = page.extract_text() or ""
+            if text.strip():
+                # Pages are paragraph boundaries for the splitter
+                yield text + "\n\n"
+
+_MARKDOWN_SEPARATORS = RecursiveCharacterTextSplitter.get_separators_for_language(Language.MARKDOWN)
+
+register_loader([""], FileLoader("text", _read_text))
+register_loader([".md", ".markdown", ".mdx"], FileLoader("markdown", _read_text, _MARKDOWN_SEPARATORS, is_separator_regex=True))
+register_loader([".html", ".htm", ".xhtml"], FileLoader("html", _read_html, _MARKDOWN_SEPARATORS, is_separator_regex=True))
+# PDF support needs the optional pypdf package; without it PDFs are skipped rather than embedded as garbage
+if importlib.util.find_spec("pypdf") is not None:
+    register_loader([".pdf"], FileLoader("pdf", _read_pdf, binary=True))
@@ -1,23 +1,49 @@
-from langchain_community.document_loaders import TextLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
+from app.util.file_loaders import iter_chunks
+from app.util.ingest_manifest import hash_file
+from app.util.tokens import count_tokens
 
-def read_text_file(file_path: str):
-    loader = TextLoader(file_path)
-    docs = loader.load()
-    return docs
-
-def split_docs(docs: list[Document]):
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=100)
-    chunks = text_splitter.split_documents(docs)
-    return chunks
+EMBEDDING_MODEL = "text-embedding-3-small"
 
 def get_file_chunks(file_path: str):
-    docs = read_text_file(file_path)
-    chunks = split_docs(docs)
-    return chunks
-
-
-
-
-
+    """
+    Split one file into chunk Documents with the loader for its format.
+
+    Returns:
+        List of Documents; empty for binary or unsupported files
+    """
+    return [Document(page_content=text, metadata={"source": file_path}) for text in iter_chunks(file_path)]
+
+def iter_chunk_batches(file_path: str, batch_size: int = 256):
+    """
+    Stream a file's chunks with their token counts, batch_size at a time.
+
+    Yields:
+        Lists of (chunk_text, token_count)
+    """
+    batch = []
+    for text in iter_chunks(file_path):
+        batch.append((text, count_tokens(text, EMBEDDING_MODEL)))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def read_and_split_file(file_path: str, known_hash: str | None = None):
+    """
+    Hash, read and split one file. Runs in ingestion worker processes.
+
+    Args:
+        file_path: File to process
+        known_hash: Hash recorded by the previous run; matching files are not split
+
+    Returns:
+        (file_hash, chunk_texts, token_counts); chunk_texts is None when the hash matches known_hash
+    """
+    file_hash = hash_file(file_path)
+    if known_hash is not None and file_hash == known_hash:
+        return file_hash, None, None
+    chunk_texts = list(iter_chunks(file_path))
+    token_counts = [count_tokens(text, EMBEDDING_MODEL) for text in chunk_texts]
+    return file_hash, chunk_texts, token_counts
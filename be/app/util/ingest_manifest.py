@@ -0,0 +1,105 @@
+import os
+import json
+import fnmatch
+import uuid
+import hashlib
+
+# Namespace for deterministic point IDs, so re-running ingestion upserts instead of duplicating
+POINT_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "acs-chat/points")
+DEFAULT_MANIFEST_PATH = ".cache/ingest_manifest.json"
+
+# define skip files and extensions
+SKIP_FILES = {'.DS_Store', '.gitignore', '.git', '__pycache__', '.pyc', '.pyo', '.pyd'}
+SKIP_EXTENSIONS = {'.log', '.tmp', '.temp', '.swp', '.swo'}
+
+
+def make_point_id(rel_filepath: str, chunk_id: int, chunk_text: str):
+    """
+    Deterministic Qdrant point ID for a chunk.
+
+    Args:
+        rel_filepath: File path relative to the ingestion root
+        chunk_id: Position of the chunk within the file
+        chunk_text: Chunk content
+
+    Returns:
+        UUID string derived from the path, position and content hash
+    """
+    content_hash = hashlib.sha256(chunk_text.encode("utf-8")).hexdigest()
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, f"{rel_filepath}:{chunk_id}:{content_hash}"))
+
+
+def hash_file(file_path: str):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(manifest_path: str):
+    if not os.path.exists(manifest_path):
+        return {"version": 1, "roots": {}}
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Error reading ingest manifest {manifest_path}, starting fresh: {e}")
+        return {"version": 1, "roots": {}}
+
+
+def save_manifest(manifest: dict, manifest_path: str):
+    directory = os.path.dirname(manifest_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    # Atomic replace so an interrupted run never leaves a truncated manifest
+    os.replace(tmp_path, manifest_path)
+
+
+def matches_globs(rel_filepath: str, patterns: list[str] | None):
+    """
+    Check a relative path (or its file name) against glob patterns.
+    """
+    if not patterns:
+        return False
+    rel_filepath = rel_filepath.replace(os.sep, "/")
+    file_name = os.path.basename(rel_filepath)
+    return any(fnmatch.fnmatch(rel_filepath, pattern) or fnmatch.fnmatch(file_name, pattern) for pattern in patterns)
+
+
+def iter_source_files(root_dir: str, include: list[str] | None = None, exclude: list[str] | None = None):
+    """
+    Walk root_dir and yield (file_path, file_name) for every file worth ingesting.
+
+    Args:
+        root_dir: Directory to walk
+        include: If given, only files matching one of these globs are yielded
+        exclude: Files matching any of these globs are skipped
+    """
+    for dirpath, dirnames, filenames in os.walk(root_dir):
+        # skip hidden directories
+        dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+
+        for file_name in filenames:
+            # skip system files and files that don't need to be processed
+            if file_name in SKIP_FILES or file_name.startswith('.'):
+                continue
+
+            # check file extension
+            file_ext = os.path.splitext(file_name)[1].lower()
+            if file_ext in SKIP_EXTENSIONS:
+                continue
+
+            file_path = os.path.join(dirpath, file_name)
+            if not os.path.isfile(file_path):
+                continue
+
+            rel_filepath = os.path.relpath(file_path, root_dir)
+            if include and not matches_globs(rel_filepath, include):
+                continue
+            if matches_globs(rel_filepath, exclude):
+                continue
+            yield file_path, file_name
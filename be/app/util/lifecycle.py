@@ -0,0 +1,79 @@
+import os
+import signal
+import asyncio
+
+_draining = False
+_inflight_streams = 0
+_streams_idle = None
+
+def is_draining():
+    return _draining
+
+def start_draining():
+    """
+    Stop taking new chat requests; streams already running are left to finish.
+    """
+    global _draining
+    if not _draining:
+        print(f"Worker {os.getpid()} draining: {_inflight_streams} stream(s) in flight")
+    _draining = True
+
+def install_drain_handler():
+    """
+    Chain a SIGTERM handler in front of the server's own so the worker
+    starts draining (and /readyz fails) as soon as shutdown begins.
+
+    Uvicorn, on its own or as a gunicorn worker, already stops accepting
+    connections and waits for running responses before exiting; this adds
+    the early readiness flip and refuses new requests arriving on kept-alive
+    connections during the drain.
+    """
+    try:
+        previous = signal.getsignal(signal.SIGTERM)
+
+        def handle_sigterm(signum, frame):
+            start_draining()
+            if callable(previous):
+                previous(signum, frame)
+
+        signal.signal(signal.SIGTERM, handle_sigterm)
+    except ValueError:
+        # Not on the main thread (e.g. TestClient); nothing to chain into
+        pass
+
+def stream_started():
+    global _inflight_streams
+    _inflight_streams += 1
+    _idle_event().clear()
+
+def stream_finished():
+    global _inflight_streams
+    _inflight_streams -= 1
+    if _inflight_streams <= 0:
+        _inflight_streams = 0
+        _idle_event().set()
+
+def inflight_streams():
+    return _inflight_streams
+
+def _idle_event():
+    global _streams_idle
+    if _streams_idle is None:
+        _streams_idle = asyncio.Event()
+        _streams_idle.set()
+    return _streams_idle
+
+async def wait_for_streams(timeout: float):
+    """
+    Wait until no chat streams are running, or timeout seconds pass.
+
+    Returns:
+        True if all streams finished in time
+    """
+    if _inflight_streams == 0:
+        return True
+    try:
+        await asyncio.wait_for(_idle_event().wait(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
@@ -0,0 +1,42 @@
+from langchain_core.embeddings import Embeddings
+from app.util.admission import get_limiter
+from app.util.resilience import get_guard
+from app.util.tokens import count_tokens
+
+class LimitedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that sends async calls through the "embeddings" limiter
+    and guard: each call is bounded by the request deadline and the circuit
+    breaker, and a slow query embedding is hedged with a duplicate call, which
+    takes its own limiter slot.
+
+    Sync calls (ingestion runs them on worker threads with its own
+    concurrency control) pass straight through.
+    """
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embeddings.embed_query(text)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        tokens = sum(count_tokens(text) for text in texts)
+
+        async def attempt():
+            async with get_limiter("embeddings").limit(tokens):
+                return await self.embeddings.aembed_documents(texts)
+
+        # Batches can be large: no stage timeout and no duplicate, only the request deadline and breaker
+        return await get_guard("embeddings").call(attempt, hedge=False, stage_timeout=0)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        tokens = count_tokens(text)
+
+        async def attempt():
+            async with get_limiter("embeddings").limit(tokens):
+                return await self.embeddings.aembed_query(text)
+
+        return await get_guard("embeddings").call(attempt)
@@ -0,0 +1,167 @@
+import os
+import time
+import logging
+from contextlib import contextmanager
+from prometheus_client import Counter, Gauge, Histogram, REGISTRY, CollectorRegistry, CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client.core import CounterMetricFamily
+
+# Stage latencies span sub-millisecond lookups to multi-second LLM streams
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+STAGE_SECONDS = Histogram(
+    "acs_chat_stage_seconds",
+    "Time spent in each stage of a chat request",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+FALLBACKS = Counter(
+    "acs_chat_fallbacks_total",
+    "Requests answered with 'Content not relevant'",
+    ["reason"],
+)
+UPSTREAM_ERRORS = Counter(
+    "acs_chat_upstream_errors_total",
+    "Failed calls to upstream services",
+    ["upstream"],
+)
+UPSTREAM_RETRIES = Counter(
+    "acs_chat_upstream_retries_total",
+    "Retries of upstream calls",
+    ["upstream"],
+)
+SHED_REQUESTS = Counter(
+    "acs_chat_shed_total",
+    "Requests rejected by admission control",
+    ["limiter", "reason"],
+)
+UPSTREAM_CUTOFFS = Counter(
+    "acs_chat_upstream_cutoffs_total",
+    "Upstream calls cut off by an open circuit breaker or the request deadline",
+    ["upstream", "reason"],
+)
+HEDGES = Counter(
+    "acs_chat_hedges_total",
+    "Hedged upstream calls, by which attempt answered first",
+    ["upstream", "winner"],
+)
+DEGRADED_ANSWERS = Counter(
+    "acs_chat_degraded_total",
+    "Answers generated from fallback retrieval after an upstream failed",
+    ["reason"],
+)
+INFLIGHT_STREAMS = Gauge(
+    "acs_chat_inflight_streams",
+    "Chat responses currently streaming",
+    # Summed over live workers when running under gunicorn
+    multiprocess_mode="livesum",
+)
+
+def observe_stage(stage: str, seconds: float):
+    STAGE_SECONDS.labels(stage).observe(seconds)
+
+@contextmanager
+def time_stage(stage: str):
+    """
+    Record the duration of the enclosed block in the stage histogram.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage).observe(time.perf_counter() - start)
+
+def record_fallback(reason: str):
+    FALLBACKS.labels(reason).inc()
+
+def record_upstream_error(upstream: str):
+    UPSTREAM_ERRORS.labels(upstream).inc()
+
+def record_upstream_retry(upstream: str):
+    UPSTREAM_RETRIES.labels(upstream).inc()
+
+def record_shed(limiter: str, reason: str):
+    SHED_REQUESTS.labels(limiter, reason).inc()
+
+def record_cutoff(upstream: str, reason: str):
+    UPSTREAM_CUTOFFS.labels(upstream, reason).inc()
+
+def record_hedge(upstream: str, winner: str):
+    HEDGES.labels(upstream, winner).inc()
+
+def record_degraded(reason: str):
+    DEGRADED_ANSWERS.labels(reason).inc()
+
+class _CacheStatsCollector:
+    """
+    Exposes the answer and embedding cache counters at scrape time, so the
+    caches themselves stay free of metrics code.
+
+    The counters are per process; in multi-worker mode each series carries
+    the worker's pid so the per-worker values do not collide.
+    """
+    def __init__(self, per_worker: bool = False):
+        self.per_worker = per_worker
+
+    def collect(self):
+        labels = ["cache", "result"] + (["pid"] if self.per_worker else [])
+        extra = [str(os.getpid())] if self.per_worker else []
+        family = CounterMetricFamily("acs_chat_cache_events", "Cache lookups by cache and result", labels=labels)
+        from app.services.answer_cache import get_answer_cache, is_answer_cache_enabled
+        if is_answer_cache_enabled():
+            stats = get_answer_cache().get_stats()
+            family.add_metric(["answer", "exact_hit"] + extra, stats["exact_hits"])
+            family.add_metric(["answer", "semantic_hit"] + extra, stats["semantic_hits"])
+            family.add_metric(["answer", "miss"] + extra, stats["misses"])
+        from app.config.embedding_config import get_embedding, is_embedding_ready
+        embedding = get_embedding() if is_embedding_ready() else None
+        if hasattr(embedding, "get_stats"):
+            stats = embedding.get_stats()
+            family.add_metric(["embedding", "memory_hit"] + extra, stats["memory_hits"])
+            family.add_metric(["embedding", "disk_hit"] + extra, stats["disk_hits"])
+            family.add_metric(["embedding", "miss"] + extra, stats["misses"])
+        yield family
+
+class _OpenAIRetryFilter(logging.Filter):
+    """
+    Counts the OpenAI client's own retries (max_retries), which it only reports through logging.
+    """
+    def filter(self, record):
+        if record.msg == "Retrying request to %s in %f seconds" and record.args:
+            url = str(record.args[0])
+            record_upstream_retry("openai_embeddings" if "embeddings" in url else "openai_chat")
+        return True
+
+_installed = False
+_registry = REGISTRY
+
+def _multiprocess_dir():
+    return os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+def setup_metrics():
+    """
+    Register scrape-time collectors and retry hooks. Safe to call more than once.
+    """
+    global _installed, _registry
+    if _installed:
+        return
+    if _multiprocess_dir():
+        # Under gunicorn every worker writes its samples to PROMETHEUS_MULTIPROC_DIR
+        # and a scrape of any worker aggregates all of them
+        from prometheus_client import multiprocess
+        _registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(_registry)
+        _registry.register(_CacheStatsCollector(per_worker=True))
+    else:
+        REGISTRY.register(_CacheStatsCollector())
+    openai_logger = logging.getLogger("openai._base_client")
+    if openai_logger.getEffectiveLevel() > logging.INFO:
+        openai_logger.setLevel(logging.INFO)
+    openai_logger.addFilter(_OpenAIRetryFilter())
+    _installed = True
+
+def render_metrics():
+    """
+    Returns:
+        (body, content_type) of the Prometheus text exposition
+    """
+    return generate_latest(_registry), CONTENT_TYPE_LATEST
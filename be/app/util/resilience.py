@@ -0,0 +1,387 @@
+import os
+import time
+import asyncio
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from app.util.admission import Overloaded
+from app.util.metrics import record_cutoff, record_hedge
+
+_guards = {}
+# Absolute time.monotonic() by which the current request must have its first token
+_deadline = ContextVar("request_deadline", default=None)
+
+class UpstreamUnavailable(Exception):
+    """
+    Raised instead of calling an upstream that cannot answer in time.
+    """
+    def __init__(self, name: str, reason: str):
+        super().__init__(f"{name} unavailable ({reason})")
+        self.name = name
+        self.reason = reason
+
+class DeadlineExceeded(UpstreamUnavailable):
+    def __init__(self, name: str):
+        super().__init__(name, "deadline exceeded")
+
+class CircuitOpen(UpstreamUnavailable):
+    def __init__(self, name: str):
+        super().__init__(name, "circuit open")
+
+@contextmanager
+def request_deadline(seconds: float):
+    """
+    Give the enclosed calls at most `seconds` in total; nested deadlines
+    can only shorten the outer one. 0 or less leaves the budget unchanged.
+    """
+    current = _deadline.get()
+    deadline = time.monotonic() + seconds if seconds > 0 else None
+    if deadline is None or (current is not None and current < deadline):
+        deadline = current
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def remaining():
+    """
+    Seconds left in the current request's budget, or None without a deadline.
+    """
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+class LatencyTracker:
+    """
+    Recent successful call latencies of one upstream.
+    """
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+
+    def add(self, seconds: float):
+        self._samples.append(seconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, pct: float):
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+class CircuitBreaker:
+    """
+    Fails calls fast after repeated upstream failures.
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    raise CircuitOpen without reaching the upstream. Once reset_timeout
+    seconds have passed a single probe is let through (half-open): success
+    closes the circuit, failure opens it again.
+
+    Args:
+        name: Upstream name used in errors and metrics
+        failure_threshold: Consecutive failures that open the circuit, 0 disables
+        reset_timeout: Seconds the circuit stays open before probing
+    """
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 10.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.stats = {"opened": 0, "rejected": 0}
+
+    def check(self):
+        """
+        Raises:
+            CircuitOpen: If the upstream should not be called now
+        """
+        if self.state == "closed":
+            return
+        if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._probing:
+            self._probing = True
+            return
+        self.stats["rejected"] += 1
+        record_cutoff(self.name, "circuit_open")
+        raise CircuitOpen(self.name)
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == "half_open" or (self.failure_threshold > 0 and self.failures >= self.failure_threshold):
+            if self.state != "open":
+                self.stats["opened"] += 1
+            self.state = "open"
+            self._opened_at = time.monotonic()
+
+    def release(self):
+        """
+        End a call that neither succeeded nor failed, e.g. one that was shed.
+        """
+        self._probing = False
+
+class UpstreamGuard:
+    """
+    Deadline, hedging and circuit breaker for calls to one upstream.
+
+    Each call gets the smaller of stage_timeout and what is left of the
+    request deadline. With hedging enabled, a call still running after the
+    upstream's observed p95 (at least hedge_min_delay) gets a duplicate and
+    the first result wins; hedges are capped at hedge_max_ratio of calls so
+    a slow upstream is not handed twice the load. Shed calls (Overloaded)
+    neither count as failures nor win a hedge, and a timeout counts against
+    the breaker only when the stage timeout, not the request deadline, ran out.
+
+    Args:
+        name: Upstream name used in errors and metrics
+        stage_timeout: Seconds a single call may take, 0 for the request deadline only
+        hedge: Whether to send hedged duplicates
+        hedge_min_delay: Seconds before a hedge is sent at the earliest
+        hedge_min_samples: Latency samples needed before hedging starts
+        hedge_max_ratio: Maximum hedges as a fraction of calls
+        breaker: CircuitBreaker for the upstream
+    """
+    def __init__(self, name: str, stage_timeout: float = 0, hedge: bool = False, hedge_min_delay: float = 0.05,
+                 hedge_min_samples: int = 20, hedge_max_ratio: float = 0.1, breaker: CircuitBreaker | None = None):
+        self.name = name
+        self.stage_timeout = stage_timeout
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_max_ratio = hedge_max_ratio
+        self.breaker = breaker or CircuitBreaker(name)
+        self.latency = LatencyTracker()
+        self.stats = {"calls": 0, "hedged": 0, "hedge_wins": 0, "deadline_exceeded": 0, "failures": 0}
+
+    def timeout(self, stage_timeout: float | None = None):
+        """
+        Seconds the next call may take, or None for no limit.
+
+        Raises:
+            DeadlineExceeded: If the request budget is already spent
+        """
+        return self._timeout(remaining(), stage_timeout)[0]
+
+    def _timeout(self, left: float | None, stage_timeout: float | None = None):
+        """
+        Returns:
+            (timeout or None, whether the stage timeout rather than the request deadline sets it)
+        """
+        stage_timeout = self.stage_timeout if stage_timeout is None else stage_timeout
+        if left is not None and left <= 0:
+            self._deadline_exceeded()
+        if stage_timeout > 0 and (left is None or stage_timeout <= left):
+            return stage_timeout, True
+        return left, False
+
+    def _timed_out(self, stage_bound: bool):
+        # Only the upstream's own stage timeout says it is unhealthy; a request budget
+        # spent upstream of this stage (e.g. by a slow embedding) must not trip its breaker
+        if stage_bound:
+            self.breaker.record_failure()
+        else:
+            self.breaker.release()
+        self._deadline_exceeded()
+
+    def hedge_delay(self, timeout: float | None):
+        """
+        Seconds to wait before hedging, or None if this call should not be hedged.
+        """
+        if not self.hedge or len(self.latency) < self.hedge_min_samples:
+            return None
+        if self.stats["hedged"] + 1 > self.hedge_max_ratio * self.stats["calls"]:
+            return None
+        delay = max(self.hedge_min_delay, self.latency.percentile(95))
+        if timeout is not None and delay >= timeout:
+            return None
+        return delay
+
+    def _deadline_exceeded(self):
+        self.stats["deadline_exceeded"] += 1
+        record_cutoff(self.name, "deadline")
+        raise DeadlineExceeded(self.name)
+
+    async def call(self, attempt, hedge: bool = True, stage_timeout: float | None = None):
+        """
+        Run attempt() under the deadline and breaker, hedging it if allowed.
+
+        Args:
+            attempt: Coroutine function making one upstream call; may be run twice
+            hedge: Whether this call may be hedged
+            stage_timeout: Overrides the guard's stage_timeout for this call
+
+        Returns:
+            The result of the first attempt to succeed
+
+        Raises:
+            CircuitOpen: If the breaker is open
+            DeadlineExceeded: If the call does not finish within its budget
+            Overloaded: If the upstream limiter sheds the call
+        """
+        self.breaker.check()
+        try:
+            timeout, stage_bound = self._timeout(remaining(), stage_timeout)
+        except DeadlineExceeded:
+            self.breaker.release()
+            raise
+        self.stats["calls"] += 1
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(self._run(attempt, self.hedge_delay(timeout) if hedge else None), timeout)
+        except Overloaded:
+            self.breaker.release()
+            raise
+        except asyncio.TimeoutError:
+            self._timed_out(stage_bound)
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except Exception:
+            self.stats["failures"] += 1
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        if hedge:
+            # Only calls that could be hedged shape the p95 they are hedged against
+            self.latency.add(time.monotonic() - start)
+        return result
+
+    async def _run(self, attempt, delay: float | None):
+        if delay is None:
+            return await attempt()
+        primary = asyncio.ensure_future(attempt())
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return primary.result()
+            self.stats["hedged"] += 1
+            hedge = asyncio.ensure_future(attempt())
+            tasks.add(hedge)
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        won = task is hedge
+                        self.stats["hedge_wins"] += won
+                        record_hedge(self.name, "hedge" if won else "primary")
+                        return task.result()
+            # Both failed: the primary's error is the one the caller would have seen without hedging
+            raise primary.exception()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def guard_stream(self, stream):
+        """
+        Treat an async iterator's first item as the call: the breaker is
+        checked before it starts and the item must arrive within the stage
+        timeout and the current request deadline. Later items are not timed.
+
+        The deadline is captured now, so the stream can be consumed after
+        the request_deadline block has ended.
+
+        Returns:
+            Async iterator of the same items
+        """
+        deadline = _deadline.get()
+        return self._guarded_stream(stream, deadline)
+
+    async def _guarded_stream(self, stream, deadline: float | None):
+        self.breaker.check()
+        try:
+            timeout, stage_bound = self._timeout(None if deadline is None else deadline - time.monotonic())
+        except DeadlineExceeded:
+            self.breaker.release()
+            raise
+        self.stats["calls"] += 1
+        iterator = stream.__aiter__()
+        start = time.monotonic()
+        # The first step runs in a child task, so timing it out never cancels the
+        # consuming task and a real cancellation of that task still propagates
+        first_step = asyncio.ensure_future(iterator.__anext__())
+        try:
+            done, _ = await asyncio.wait({first_step}, timeout=timeout)
+        except asyncio.CancelledError:
+            first_step.cancel()
+            self.breaker.release()
+            raise
+        if not done:
+            first_step.cancel()
+            await asyncio.gather(first_step, return_exceptions=True)
+            self._timed_out(stage_bound)
+        try:
+            first = first_step.result()
+        except StopAsyncIteration:
+            self.breaker.record_success()
+            return
+        except Exception:
+            self.stats["failures"] += 1
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        self.latency.add(time.monotonic() - start)
+        yield first
+        async for item in iterator:
+            yield item
+
+    def get_stats(self):
+        p95 = self.latency.percentile(95)
+        return {
+            **self.stats,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "breaker": self.breaker.state,
+            **{f"breaker_{key}": value for key, value in self.breaker.stats.items()},
+        }
+
+def _flag(name: str, default: str):
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+def _create_guard(name: str):
+    stage_timeouts = {
+        "embeddings": ("EMBEDDING_DEADLINE_SECONDS", "5"),
+        "search": ("SEARCH_DEADLINE_SECONDS", "3"),
+        # Time to the first token; the rest of the stream is not cut short
+        "llm": ("LLM_FIRST_TOKEN_TIMEOUT", "15"),
+    }
+    if name not in stage_timeouts:
+        raise ValueError(f"Unknown upstream guard: {name}")
+    variable, default = stage_timeouts[name]
+    breaker = CircuitBreaker(
+        name,
+        failure_threshold=int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5")),
+        reset_timeout=float(os.getenv("BREAKER_RESET_SECONDS", "10")),
+    )
+    return UpstreamGuard(
+        name,
+        stage_timeout=float(os.getenv(variable, default)),
+        # Embedding and search calls are idempotent; a duplicate LLM stream would double the cost
+        hedge=name != "llm" and _flag("HEDGE_ENABLED", "true"),
+        hedge_min_delay=float(os.getenv("HEDGE_MIN_DELAY_MS", "50")) / 1000,
+        hedge_min_samples=int(os.getenv("HEDGE_MIN_SAMPLES", "20")),
+        hedge_max_ratio=float(os.getenv("HEDGE_MAX_RATIO", "0.1")),
+        breaker=breaker,
+    )
+
+def get_guard(name: str):
+    """
+    Get the process-wide guard for "embeddings", "search" or "llm".
+    """
+    guard = _guards.get(name)
+    if guard is None:
+        guard = _create_guard(name)
+        _guards[name] = guard
+    return guard
+
+def get_guard_stats():
+    return {name: guard.get_stats() for name, guard in _guards.items()}
@@ -0,0 +1,77 @@
+# shared_store.py
+import os
+import json
+import time
+from collections import OrderedDict
+
+class InMemoryStore:
+    """
+    In-process key/value store with TTL expiry and LRU eviction once max_entries is reached.
+
+    Each worker process has its own copy; use RedisStore to share state between workers.
+    """
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    async def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: dict, ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def close(self):
+        self._entries.clear()
+
+class RedisStore:
+    """
+    Key/value store in Redis so every worker and replica sees the same entries.
+
+    Requires the optional `redis` package.
+    """
+    def __init__(self, url: str, prefix: str = "acs-chat:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise Exception("The redis package is required for the redis store")
+        self.prefix = prefix
+        self._client = redis.from_url(url)
+
+    async def get(self, key: str):
+        raw = await self._client.get(self.prefix + key)
+        return json.loads(raw) if raw else None
+
+    async def set(self, key: str, value: dict, ttl: float):
+        await self._client.set(self.prefix + key, json.dumps(value), ex=max(1, int(ttl)))
+
+    async def close(self):
+        await self._client.aclose()
+
+def create_store(backend: str | None = None, url: str | None = None, prefix: str = "acs-chat:", max_entries: int = 1000):
+    """
+    Create a key/value store for state that may need to be shared between workers.
+
+    Args:
+        backend: "memory" or "redis"; defaults to SHARED_STORE_BACKEND
+        url: Redis URL; defaults to SHARED_STORE_URL
+        prefix: Key prefix for the redis backend
+        max_entries: Capacity of the in-memory backend
+
+    Returns:
+        InMemoryStore or RedisStore
+    """
+    backend = (backend or os.getenv("SHARED_STORE_BACKEND", "memory")).lower()
+    if backend == "redis":
+        return RedisStore(url or os.getenv("SHARED_STORE_URL", "redis://localhost:6379/0"), prefix=prefix)
+    return InMemoryStore(max_entries)
@@ -0,0 +1,146 @@
+import json
+import time
+import asyncio
+from app.util.tokens import count_tokens
+
+_END = object()
+
+def format_event(data, event: str | None = None, event_id: str | None = None):
+    """
+    Serialize one Server-Sent Events frame.
+
+    Data is JSON encoded so it always fits on a single `data:` line, whatever
+    newlines or carriage returns the answer contains.
+    """
+    lines = []
+    if event:
+        lines.append(f"event: {event}")
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+def format_comment(text: str = ""):
+    return f": {text}\n\n"
+
+def parse_event_id(value: str | None):
+    """
+    Split a Last-Event-ID header into (stream ID, character offset).
+
+    Returns:
+        (stream_id, offset), or (None, 0) if the header is missing or malformed
+    """
+    if not value or ":" not in value:
+        return None, 0
+    stream_id, _, offset = value.rpartition(":")
+    try:
+        return stream_id, max(0, int(offset))
+    except ValueError:
+        return None, 0
+
+async def sse_answer_stream(chunks, stream_id: str, resume_from: int = 0, flush_interval: float = 0.03,
+                            flush_bytes: int = 64, heartbeat_interval: float = 15.0, on_first_frame=None):
+    """
+    Turn an answer stream into SSE frames, coalescing tokens into batches.
+
+    Emits a `start` event with the stream ID, `token` events whose ID is
+    "<stream_id>:<characters sent so far>", heartbeat comments while the
+    stream is idle, an `error` event if the answer fails and a final `done`
+    event with usage and timing. A buffered batch is flushed once it holds
+    flush_bytes bytes or its oldest token is flush_interval seconds old, so
+    the first token is never held back by more than flush_interval.
+
+    Args:
+        chunks: Async iterator of answer text
+        stream_id: ID a client sends back to resume this answer
+        resume_from: Characters of the answer the client already has; they are skipped
+        flush_interval: Maximum seconds a token waits in the batch
+        flush_bytes: Batch size that triggers an immediate flush
+        heartbeat_interval: Idle seconds before a heartbeat comment
+        on_first_frame: Optional callback run when the first token frame is sent
+
+    Returns:
+        Async iterator of SSE frames
+    """
+    start = time.perf_counter()
+    queue = asyncio.Queue()
+
+    async def pump():
+        # A separate task, so waiting on the queue with a timeout never cancels the answer stream itself
+        try:
+            async for chunk in chunks:
+                await queue.put(chunk)
+            await queue.put(_END)
+        except Exception as e:
+            await queue.put(e)
+        except asyncio.CancelledError:
+            # Also what a coalesced answer whose flight was cancelled raises; the reader must not wait forever
+            queue.put_nowait(RuntimeError("Answer stream was cancelled"))
+            raise
+
+    task = asyncio.create_task(pump())
+    parts = []
+    pending = []
+    pending_bytes = 0
+    batch_started = None
+    offset = 0
+    frames = 0
+    ttft_ms = None
+    error = None
+    try:
+        yield format_event({"stream_id": stream_id, "resume_from": resume_from}, event="start")
+        while True:
+            if batch_started is not None:
+                timeout = max(0.0, batch_started + flush_interval - time.perf_counter())
+            else:
+                timeout = heartbeat_interval
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                item = None
+
+            if isinstance(item, str) and item:
+                parts.append(item)
+                # Skip what a resuming client already received
+                if offset < resume_from:
+                    skip = min(len(item), resume_from - offset)
+                    offset += skip
+                    item = item[skip:]
+                if item:
+                    pending.append(item)
+                    pending_bytes += len(item.encode("utf-8"))
+                    if batch_started is None:
+                        batch_started = time.perf_counter()
+
+            finished = item is _END or isinstance(item, Exception)
+            flush_due = batch_started is not None and time.perf_counter() - batch_started >= flush_interval
+            if pending and (finished or flush_due or pending_bytes >= flush_bytes):
+                text = "".join(pending)
+                offset += len(text)
+                frames += 1
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - start) * 1000
+                    if on_first_frame is not None:
+                        on_first_frame()
+                yield format_event({"text": text}, event="token", event_id=f"{stream_id}:{offset}")
+                pending, pending_bytes, batch_started = [], 0, None
+            elif item is None and batch_started is None:
+                yield format_comment("heartbeat")
+
+            if isinstance(item, Exception):
+                error = item
+                yield format_event({"message": str(item)}, event="error")
+            if finished:
+                break
+
+        answer = "".join(parts)
+        yield format_event({
+            "stream_id": stream_id,
+            "status": "error" if error is not None else "ok",
+            "usage": {"completion_tokens": count_tokens(answer), "characters": len(answer)},
+            "timing": {"ttft_ms": round(ttft_ms, 1) if ttft_ms is not None else None,
+                       "total_ms": round((time.perf_counter() - start) * 1000, 1)},
+            "frames": frames,
+        }, event="done", event_id=f"{stream_id}:{offset}")
+    finally:
+        task.cancel()
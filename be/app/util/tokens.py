@@ -0,0 +1,44 @@
+import tiktoken
+
+_encodings = {}
+
+def get_encoding(model: str = "gpt-4o-mini"):
+    """
+    Get (and memoize) the tiktoken encoding for a model.
+
+    Returns:
+        tiktoken Encoding, or None if no encoding can be loaded (e.g. offline)
+    """
+    if model in _encodings:
+        return _encodings[model]
+    encoding = None
+    try:
+        encoding = tiktoken.encoding_for_model(model)
+    except Exception:
+        try:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            print(f"Warning: tiktoken encoding unavailable, estimating token counts: {e}")
+    _encodings[model] = encoding
+    return encoding
+
+def count_tokens(text: str, model: str = "gpt-4o-mini"):
+    """
+    Count tokens in text, falling back to a 4-characters-per-token estimate.
+    """
+    encoding = get_encoding(model)
+    if encoding is None:
+        return max(1, len(text) // 4) if text else 0
+    return len(encoding.encode(text, disallowed_special=()))
+
+def truncate_tokens(text: str, max_tokens: int, model: str = "gpt-4o-mini"):
+    """
+    Cut text down to at most max_tokens tokens.
+    """
+    encoding = get_encoding(model)
+    if encoding is None:
+        return text[:max_tokens * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
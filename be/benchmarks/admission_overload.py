@@ -0,0 +1,117 @@
+"""
+Latency of admitted requests under overload, with and without admission
+control.
+
+The stub LLM accepts at most --upstream-limit concurrent streams and
+answers 429 beyond that, like a provider rate limit. A burst of distinct
+questions well above that limit is sent to the backend twice: once with
+every limiter disabled and the old retry count, once with the default
+admission settings sized to the upstream limit. For each run the script
+reports completed answers, in-stream errors, 503 sheds, the latency
+spread of completed answers and how many chat calls reached the stub.
+
+    python -m benchmarks.admission_overload --burst 200 --upstream-limit 16
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from benchmarks.harness import launch, parse_sse, percentile, stop, stub_env, wait_for_http
+
+async def one_request(client: httpx.AsyncClient, url: str, idx: int):
+    """
+    Send one QA request and return (outcome, total_seconds).
+    """
+    payload = {"history": [], "message": f"What is covered in COMP{3000 + idx}?"}
+    start = time.perf_counter()
+    try:
+        async with client.stream("POST", url, json=payload) as response:
+            if response.status_code == 503:
+                return "shed", time.perf_counter() - start
+            text = "".join([chunk async for chunk in response.aiter_text()])
+    except httpx.HTTPError:
+        return "error", time.perf_counter() - start
+    answer, events = parse_sse(text)
+    done = [data for event, data in events if event == "done"]
+    outcome = "ok" if answer and done and done[0]["status"] == "ok" else "error"
+    return outcome, time.perf_counter() - start
+
+async def run_burst(app_url: str, stub_url: str, burst: int):
+    limits = httpx.Limits(max_connections=burst, max_keepalive_connections=burst)
+    async with httpx.AsyncClient(timeout=120.0, limits=limits) as client:
+        before = (await client.get(f"{stub_url}/stub/calls")).json()
+        results = await asyncio.gather(*[one_request(client, f"{app_url}/api/v1/qa", i) for i in range(burst)])
+        after = (await client.get(f"{stub_url}/stub/calls")).json()
+    ok = [r[1] * 1000 for r in results if r[0] == "ok"]
+    return {
+        "burst": burst,
+        "ok": len(ok),
+        "errors": sum(1 for r in results if r[0] == "error"),
+        "shed": sum(1 for r in results if r[0] == "shed"),
+        "ok_p50_ms": round(percentile(ok, 50), 1),
+        "ok_p99_ms": round(percentile(ok, 99), 1),
+        "chat_calls": after["chat"] - before["chat"],
+        "chat_rejected": after["chat_rejected"] - before["chat_rejected"],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Overload behaviour with and without admission control")
+    parser.add_argument("--burst", type=int, default=200)
+    parser.add_argument("--upstream-limit", type=int, default=16, help="Concurrent chat streams the stub LLM accepts")
+    parser.add_argument("--stub-port", type=int, default=9190)
+    parser.add_argument("--app-port", type=int, default=9290)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    app_url = f"http://127.0.0.1:{args.app_port}"
+    stub = launch("benchmarks.stub_servers", [
+        "--port", str(args.stub_port),
+        "--llm-token-ms", "20",
+        "--llm-tokens", "40",
+        "--llm-max-concurrency", str(args.upstream_limit),
+    ])
+    modes = {
+        "unlimited": {
+            "QA_MAX_CONCURRENT_STREAMS": "0",
+            "EMBEDDING_MAX_CONCURRENCY": "0",
+            "SEARCH_MAX_CONCURRENCY": "0",
+            "LLM_MAX_CONCURRENCY": "0",
+            "OPENAI_MAX_RETRIES": "2",
+        },
+        "admission": {
+            "LLM_MAX_CONCURRENCY": str(args.upstream_limit),
+            "QA_MAX_CONCURRENT_STREAMS": str(args.upstream_limit * 2),
+            "QA_QUEUE_SIZE": str(args.upstream_limit * 2),
+        },
+    }
+    results = {}
+    try:
+        wait_for_http(stub_url)
+        for mode, overrides in modes.items():
+            # Distinct questions and no answer cache, so every request needs the LLM
+            env = stub_env(stub_url, {"ANSWER_CACHE_ENABLED": "false", **overrides})
+            app = launch("benchmarks.serve_app", ["--port", str(args.app_port)], env=env)
+            try:
+                wait_for_http(f"{app_url}/docs")
+                asyncio.run(run_burst(app_url, stub_url, 1))  # warm up clients and tokenizer
+                results[mode] = asyncio.run(run_burst(app_url, stub_url, args.burst))
+            finally:
+                stop(app)
+    finally:
+        stop(stub)
+
+    print(f"{'mode':<12}{'ok':>5}{'err':>5}{'shed':>6}{'ok p50':>10}{'ok p99':>10}{'chat':>6}{'429s':>6}")
+    for mode, r in results.items():
+        print(f"{mode:<12}{r['ok']:>5}{r['errors']:>5}{r['shed']:>6}{r['ok_p50_ms']:>8.1f}ms"
+              f"{r['ok_p99_ms']:>8.1f}ms{r['chat_calls']:>6}{r['chat_rejected']:>6}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Wall time and upstream calls for an evaluation set, one /qa request per
+question versus a single /qa/batch request.
+
+Both modes answer the same --questions distinct questions. The per-request
+mode keeps --concurrency /qa streams open at a time, like an evaluation
+script with a worker pool; the batch mode sends every question in one
+/qa/batch call with the same generation concurrency. Reports wall time and
+how many embedding/search/chat calls reached the stub servers.
+
+    python -m benchmarks.batch_eval --questions 200 --concurrency 8
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from benchmarks.harness import launch, parse_sse, stop, stub_env, wait_for_http
+
+EVAL_TOKEN = "benchmark"
+
+def make_questions(count: int):
+    return [f"What are the prerequisites of COMP{4000 + i}?" for i in range(count)]
+
+async def run_single(client: httpx.AsyncClient, app_url: str, questions: list[str], concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(question):
+        async with semaphore:
+            response = await client.post(f"{app_url}/api/v1/qa", json={"history": [], "message": question})
+            answer, _ = parse_sse(response.text)
+            return bool(answer)
+
+    return sum(await asyncio.gather(*[one(q) for q in questions]))
+
+async def run_batch(client: httpx.AsyncClient, app_url: str, questions: list[str], concurrency: int, generate: bool):
+    response = await client.post(
+        f"{app_url}/api/v1/qa/batch",
+        json={"questions": questions, "generate": generate, "concurrency": concurrency},
+        headers={"X-Eval-Token": EVAL_TOKEN},
+    )
+    response.raise_for_status()
+    results = response.json()["results"]
+    if not generate:
+        return sum(1 for r in results if r["chunks"])
+    return sum(1 for r in results if r.get("answer"))
+
+async def measure(app_url: str, stub_url: str, mode: str, questions: list[str], concurrency: int):
+    async with httpx.AsyncClient(timeout=600.0) as client:
+        before = (await client.get(f"{stub_url}/stub/calls")).json()
+        start = time.perf_counter()
+        if mode == "single":
+            completed = await run_single(client, app_url, questions, concurrency)
+        else:
+            completed = await run_batch(client, app_url, questions, concurrency, generate=mode == "batch")
+        wall = time.perf_counter() - start
+        after = (await client.get(f"{stub_url}/stub/calls")).json()
+    return {
+        "questions": len(questions),
+        "completed": completed,
+        "wall_s": round(wall, 2),
+        "upstream_calls": {name: after[name] - before[name] for name in ("embeddings", "search", "chat")},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-request /qa versus one /qa/batch call")
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8, help="Answers generated at once in both modes")
+    parser.add_argument("--stub-port", type=int, default=9200)
+    parser.add_argument("--app-port", type=int, default=9300)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    app_url = f"http://127.0.0.1:{args.app_port}"
+    stub = launch("benchmarks.stub_servers", ["--port", str(args.stub_port), "--llm-token-ms", "10", "--llm-tokens", "30"])
+    # No answer cache or coalescing, so both modes do the same upstream work per question
+    env = stub_env(stub_url, {
+        "EVAL_API_TOKEN": EVAL_TOKEN,
+        "ANSWER_CACHE_ENABLED": "false",
+        "QA_COALESCE_ENABLED": "false",
+    })
+    app = launch("benchmarks.serve_app", ["--port", str(args.app_port)], env=env)
+    questions = make_questions(args.questions)
+    results = {}
+    try:
+        wait_for_http(stub_url)
+        wait_for_http(f"{app_url}/docs")
+        asyncio.run(measure(app_url, stub_url, "single", ["warm up"], 1))
+        for mode in ("single", "batch", "retrieve_only"):
+            # Fresh questions per mode so the embedding cache does not favour later runs
+            mode_questions = [f"{q} ({mode})" for q in questions]
+            results[mode] = asyncio.run(measure(app_url, stub_url, mode, mode_questions, args.concurrency))
+    finally:
+        stop(app)
+        stop(stub)
+
+    print(f"{'mode':<15}{'done':>6}{'wall':>9}{'embed':>7}{'search':>8}{'chat':>6}")
+    for mode, r in results.items():
+        calls = r["upstream_calls"]
+        print(f"{mode:<15}{r['completed']:>6}{r['wall_s']:>8.2f}s{calls['embeddings']:>7}{calls['search']:>8}{calls['chat']:>6}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
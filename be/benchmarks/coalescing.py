@@ -0,0 +1,98 @@
+"""
+Upstream calls and latency for a burst of identical questions, with and
+without request coalescing.
+
+Fires N concurrent /api/v1/qa requests with the same question, spread over
+a short arrival window so late joiners are exercised, and reports how many
+embedding/search/chat calls reached the stub servers plus the TTFT of the
+first requester and of everyone.
+
+    python -m benchmarks.coalescing --burst 50 --spread-ms 500
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from benchmarks.harness import launch, parse_sse, percentile, stop, stub_env, wait_for_http
+
+async def one_request(client: httpx.AsyncClient, url: str, question: str, delay: float):
+    """
+    Send one QA request after delay and return (ttft_seconds, answer_text).
+    """
+    await asyncio.sleep(delay)
+    start = time.perf_counter()
+    ttft = None
+    parts = []
+    async with client.stream("POST", url, json={"history": [], "message": question}) as response:
+        async for chunk in response.aiter_text():
+            if ttft is None and "event: token" in chunk:
+                ttft = time.perf_counter() - start
+            parts.append(chunk)
+    answer, _ = parse_sse("".join(parts))
+    return (ttft if ttft is not None else time.perf_counter() - start), answer
+
+async def run_burst(app_url: str, stub_url: str, question: str, burst: int, spread: float):
+    limits = httpx.Limits(max_connections=burst, max_keepalive_connections=burst)
+    async with httpx.AsyncClient(timeout=120.0, limits=limits) as client:
+        before = (await client.get(f"{stub_url}/stub/calls")).json()
+        delays = [spread * i / max(1, burst - 1) for i in range(burst)]
+        results = await asyncio.gather(*[one_request(client, f"{app_url}/api/v1/qa", question, d) for d in delays])
+        after = (await client.get(f"{stub_url}/stub/calls")).json()
+    ttfts = [r[0] * 1000 for r in results]
+    return {
+        "burst": burst,
+        "upstream_calls": {name: after[name] - before[name] for name in after},
+        "first_ttft_ms": round(ttfts[0], 1),
+        "ttft_p50_ms": round(percentile(ttfts, 50), 1),
+        "ttft_p99_ms": round(percentile(ttfts, 99), 1),
+        "identical_answers": len({r[1] for r in results}) == 1,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Upstream calls for identical concurrent questions, coalesced vs not")
+    parser.add_argument("--burst", type=int, default=50)
+    parser.add_argument("--spread-ms", type=float, default=500.0, help="Arrival window of the burst")
+    parser.add_argument("--stub-port", type=int, default=9180)
+    parser.add_argument("--app-port", type=int, default=9280)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    app_url = f"http://127.0.0.1:{args.app_port}"
+    # A ~2.5s answer stream, so joiners within the window arrive mid-generation
+    stub = launch("benchmarks.stub_servers", ["--port", str(args.stub_port), "--llm-token-ms", "50", "--llm-tokens", "50"])
+    results = {}
+    try:
+        wait_for_http(stub_url)
+        for mode in ("independent", "coalesced"):
+            # The answer cache is off so only coalescing can share work
+            env = stub_env(stub_url, {
+                "ANSWER_CACHE_ENABLED": "false",
+                "QA_COALESCE_ENABLED": "true" if mode == "coalesced" else "false",
+            })
+            app = launch("benchmarks.serve_app", ["--port", str(args.app_port)], env=env)
+            try:
+                wait_for_http(f"{app_url}/docs")
+                # Warm up clients and tokenizer with an unrelated question
+                asyncio.run(run_burst(app_url, stub_url, "warm up", 1, 0))
+                results[mode] = asyncio.run(run_burst(app_url, stub_url, "What is COMP6441 about?", args.burst, args.spread_ms / 1000))
+            finally:
+                stop(app)
+    finally:
+        stop(stub)
+
+    print(f"{'mode':<14}{'embed':>7}{'search':>8}{'chat':>6}{'first TTFT':>12}{'p50 TTFT':>10}{'p99 TTFT':>10}")
+    for mode, r in results.items():
+        calls = r["upstream_calls"]
+        print(f"{mode:<14}{calls['embeddings']:>7}{calls['search']:>8}{calls['chat']:>6}"
+              f"{r['first_ttft_ms']:>10.1f}ms{r['ttft_p50_ms']:>8.1f}ms{r['ttft_p99_ms']:>8.1f}ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
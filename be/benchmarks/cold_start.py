@@ -0,0 +1,87 @@
+"""
+Backend cold start: import time of app.main, time until /readyz answers
+200, and latency of the first chat request compared with the next ones.
+
+Runs against the local stub servers, so no network access is needed.
+
+    python -m benchmarks.cold_start --runs 5
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.harness import BE_DIR, launch, percentile, stop, stub_env, wait_for_http
+
+def measure_import(env: dict, runs: int):
+    code = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-W", "ignore", "-c", code], cwd=BE_DIR, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        timings.append(float(output.strip().splitlines()[-1]) * 1000)
+    return timings
+
+def measure_boot(env: dict, port: int, requests: int):
+    start = time.perf_counter()
+    app = launch("benchmarks.serve_app", ["--port", str(port)], env=env)
+    try:
+        url = f"http://127.0.0.1:{port}"
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            try:
+                if httpx.get(f"{url}/readyz", timeout=1.0).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.02)
+        ready_ms = (time.perf_counter() - start) * 1000
+        startup = httpx.get(f"{url}/readyz").json().get("startup")
+        latencies = []
+        for i in range(requests):
+            t = time.perf_counter()
+            httpx.post(f"{url}/api/v1/qa", json={"history": [], "message": f"What is COMP{6441 + i}?"}, timeout=30).read()
+            latencies.append((time.perf_counter() - t) * 1000)
+        return ready_ms, latencies, startup
+    finally:
+        stop(app)
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend cold start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=5)
+    parser.add_argument("--stub-port", type=int, default=9160)
+    parser.add_argument("--port", type=int, default=9260)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    stub = launch("benchmarks.stub_servers", ["--port", str(args.stub_port), "--llm-tokens", "5"])
+    try:
+        wait_for_http(f"http://127.0.0.1:{args.stub_port}/")
+        # Answer caching would hide the first-request cost on repeated questions
+        env = stub_env(f"http://127.0.0.1:{args.stub_port}", {"ANSWER_CACHE_ENABLED": "false"})
+        imports = measure_import(env, args.runs)
+        boots = [measure_boot(env, args.port, args.requests) for _ in range(args.runs)]
+    finally:
+        stop(stub)
+
+    first = [latencies[0] for _, latencies, _ in boots]
+    rest = [ms for _, latencies, _ in boots for ms in latencies[1:]]
+    report = {
+        "import_ms_p50": round(percentile(imports, 50), 1),
+        "ready_ms_p50": round(percentile([ready for ready, _, _ in boots], 50), 1),
+        "first_request_ms_p50": round(percentile(first, 50), 1),
+        "later_request_ms_p50": round(percentile(rest, 50), 1) if rest else None,
+        "startup_report": boots[-1][2],
+    }
+    print(f"import {report['import_ms_p50']}ms  ready {report['ready_ms_p50']}ms  "
+          f"first request {report['first_request_ms_p50']}ms  later requests {report['later_request_ms_p50']}ms")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
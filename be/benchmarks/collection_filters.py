@@ -0,0 +1,144 @@
+"""
+Filtered and unfiltered search on a default collection versus the managed one.
+
+Both collections get the same --points synthetic vectors spread over
+--courses sub_dir values:
+
+    default  VectorParams only, no payload indexes (what QdrantVectorStore
+             created before collection.ensure_collection existed)
+    managed  collection.collection_settings() plus the keyword payload
+             indexes: explicit HNSW, int8 scalar quantization, vectors and
+             payloads on disk
+
+Each query runs unfiltered and filtered to one course's sub_dir. Resident
+vector memory per point is estimated from the collection config: float32
+vectors for the default collection, the int8 codes kept in RAM for the
+managed one.
+
+Payload indexes, quantization and on-disk storage only exist in a Qdrant
+server, so pass --qdrant-url; the in-memory local mode ignores them and
+its numbers only check that the script runs.
+
+    python -m benchmarks.collection_filters --qdrant-url http://localhost:6333 --points 100000 --dim 384
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from benchmarks.harness import percentile
+from benchmarks.local_replica import synthetic
+
+async def make_collection(client, name: str, dim: int, managed: bool):
+    from qdrant_client.models import Distance, VectorParams
+    from app.services.collection import ensure_collection
+
+    if await client.collection_exists(name):
+        await client.delete_collection(name)
+    if managed:
+        os.environ["EMBEDDING_DIM"] = str(dim)
+        await ensure_collection(client, name)
+    else:
+        await client.create_collection(name, vectors_config=VectorParams(size=dim, distance=Distance.COSINE))
+
+async def upsert(client, name: str, vectors, courses: list[str], batch_size: int = 1000):
+    from qdrant_client.models import PointStruct
+
+    for start in range(0, len(vectors), batch_size):
+        await client.upsert(name, points=[
+            PointStruct(id=i, vector=vectors[i].tolist(), payload={
+                "page_content": f"Synthetic chunk {i}",
+                "metadata": {"sub_dir": courses[i % len(courses)], "file": f"{i}.md", "rel_filepath": f"{courses[i % len(courses)]}/{i}.md"},
+            })
+            for i in range(start, min(start + batch_size, len(vectors)))
+        ], wait=True)
+
+async def wait_indexed(client, name: str, timeout: float = 600.0):
+    # HNSW and quantization are built by the optimizer after the upserts return
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        info = await client.get_collection(name)
+        if str(info.status).lower().endswith("green"):
+            return
+        await asyncio.sleep(1.0)
+
+async def measure(client, name: str, queries, k: int, courses: list[str]):
+    from app.services.collection import build_filter
+
+    timings = {"unfiltered": [], "filtered": []}
+    for i, query in enumerate(queries):
+        for mode in timings:
+            query_filter = build_filter({"sub_dir": courses[i % len(courses)]}) if mode == "filtered" else None
+            start = time.perf_counter()
+            await client.query_points(name, query=query.tolist(), query_filter=query_filter, limit=k, with_payload=True)
+            timings[mode].append((time.perf_counter() - start) * 1000)
+    return {f"{mode}_{stat}_ms": round(percentile(samples, q), 3)
+            for mode, samples in timings.items() for stat, q in (("p50", 50), ("p99", 99))}
+
+def resident_bytes_per_point(info, dim: int):
+    """
+    Vector bytes each point keeps in RAM, from the collection config.
+    """
+    params = info.config.params.vectors
+    quantization = info.config.quantization_config
+    if quantization is not None and getattr(quantization, "scalar", None) is not None:
+        # int8 codes plus their per-vector offset; originals stay on disk when on_disk is set
+        return dim + 4 + (0 if params.on_disk else dim * 4)
+    return 0 if params.on_disk else dim * 4
+
+async def run(args):
+    from qdrant_client import AsyncQdrantClient
+
+    client = AsyncQdrantClient(url=args.qdrant_url) if args.qdrant_url else AsyncQdrantClient(":memory:")
+    vectors, _, queries = synthetic(args.points, args.dim, args.queries)
+    courses = [f"COMP{1000 + i}" for i in range(args.courses)]
+    results = {}
+    try:
+        for label, managed in (("default", False), ("managed", True)):
+            name = f"bench-filters-{label}"
+            await make_collection(client, name, args.dim, managed)
+            start = time.perf_counter()
+            await upsert(client, name, vectors, courses)
+            await wait_indexed(client, name)
+            load_s = time.perf_counter() - start
+            info = await client.get_collection(name)
+            results[label] = {
+                "points": args.points,
+                "load_s": round(load_s, 2),
+                "resident_vector_bytes_per_point": resident_bytes_per_point(info, args.dim),
+                **await measure(client, name, queries, args.k, courses),
+            }
+            if not args.keep:
+                await client.delete_collection(name)
+    finally:
+        await client.close()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Filtered search on a default versus a managed collection")
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--courses", type=int, default=100, help="Distinct sub_dir values; a filter keeps 1/courses of the points")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--qdrant-url", help="Qdrant server to benchmark (default: in-memory local mode)")
+    parser.add_argument("--keep", action="store_true", help="Leave the benchmark collections in place")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    for label, r in results.items():
+        print(f"{label:<9}{r['points']:>8} pts  load {r['load_s']:7.2f}s  "
+              f"unfiltered p50 {r['unfiltered_p50_ms']:8.3f}ms p99 {r['unfiltered_p99_ms']:8.3f}ms  "
+              f"filtered p50 {r['filtered_p50_ms']:8.3f}ms p99 {r['filtered_p99_ms']:8.3f}ms  "
+              f"{r['resident_vector_bytes_per_point']} B/pt in RAM")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Offline stand-ins for the OpenAI embedding and chat models and Qdrant Cloud.
+"""
+import asyncio
+import time
+import zlib
+from collections import defaultdict
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+class FakeEmbeddings(Embeddings):
+    """
+    Deterministic embedding model with an optional simulated API latency.
+
+    Texts sharing words get similar vectors (a hashed bag of words), so
+    retrieval quality numbers are meaningful on fixture corpora.
+    """
+    def __init__(self, dim: int = 256, latency_ms: float = 0.0):
+        self.dim = dim
+        self.latency_ms = latency_ms
+        self.calls = 0
+        self.texts_embedded = 0
+
+    def _vector(self, text: str):
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for token in text.lower().split():
+            vec[zlib.crc32(token.encode("utf-8")) % self.dim] += 1.0
+        norm = np.linalg.norm(vec)
+        return (vec / norm if norm else vec).tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.calls += 1
+        self.texts_embedded += len(texts)
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+async def memory_qdrant(dim: int, collection_name: str = "ACS-Chat"):
+    """
+    Create an in-memory Qdrant instance holding an empty ACS-Chat collection.
+
+    Returns:
+        AsyncQdrantClient in local mode; it is not tied to an event loop
+    """
+    from qdrant_client import AsyncQdrantClient
+    from qdrant_client.models import Distance, VectorParams
+
+    client = AsyncQdrantClient(":memory:")
+    await client.create_collection(collection_name, vectors_config=VectorParams(size=dim, distance=Distance.COSINE))
+    return client
+
+def count_points(client, collection_name: str = "ACS-Chat"):
+    return asyncio.run(client.count(collection_name)).count
+
+class FakeStreamingChatModel(BaseChatModel):
+    """
+    Chat model that streams `tokens` short tokens, the first after ttft_ms and
+    each next one token_ms later, like a streaming ChatOpenAI.
+    """
+    tokens: int = 40
+    ttft_ms: float = 150.0
+    token_ms: float = 10.0
+    max_tokens: int = 1024
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-streaming-chat"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        time.sleep((self.ttft_ms + self.token_ms * (self.tokens - 1)) / 1000)
+        text = "".join(f" tok{i}" for i in range(self.tokens))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.ttft_ms / 1000)
+        for i in range(self.tokens):
+            if i:
+                await asyncio.sleep(self.token_ms / 1000)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=f" tok{i}"))
+
+class StageRecorder:
+    """
+    Drop-in for app.util.metrics.STAGE_SECONDS that keeps every observation,
+    so benchmarks can report stage percentiles rather than histogram buckets.
+    """
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def labels(self, stage: str):
+        recorder = self
+
+        class _Child:
+            def observe(self, seconds: float):
+                recorder.samples[stage].append(seconds)
+
+        return _Child()
+
+    def reset(self):
+        self.samples.clear()
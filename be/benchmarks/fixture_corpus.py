@@ -0,0 +1,87 @@
+"""
+Deterministic, labeled ACS-style fixture corpus for retrieval evaluation.
+
+Every course gets an overview, an assessment and a prerequisite page built
+from shared templates, so documents of the same kind differ mostly in their
+course code and a few details. That is exactly where pure dense retrieval
+struggles and exact-term matching helps.
+"""
+import os
+import random
+
+SUBJECTS = ["COMP", "MATH", "ELEC", "INFS", "SENG", "ZZEN"]
+TOPICS = [
+    "operating systems", "computer security", "databases", "machine learning", "computer networks",
+    "algorithms", "software testing", "distributed systems", "compilers", "computer graphics",
+    "linear algebra", "signal processing", "information systems", "cloud computing", "cryptography",
+]
+
+def build_corpus(courses: int = 60, seed: int = 42):
+    """
+    Returns:
+        List of dicts with doc_id, course, kind, rel_filepath and text
+    """
+    rng = random.Random(seed)
+    codes = set()
+    while len(codes) < courses:
+        codes.add(f"{rng.choice(SUBJECTS)}{rng.randint(1000, 9999)}")
+    docs = []
+    for code in sorted(codes):
+        topic = rng.choice(TOPICS)
+        weeks = rng.choice([10, 12])
+        exam = rng.choice([40, 50, 60])
+        prereq = f"{rng.choice(SUBJECTS)}{rng.randint(1000, 9999)}"
+        units = rng.choice([6, 12])
+        texts = {
+            "overview": (f"{code} is a {units} unit of credit course on {topic}. The course runs over {weeks} weeks "
+                         f"with weekly lectures, tutorials and labs covering core concepts of {topic}."),
+            "assessment": (f"Assessment for {code}: assignments are worth {100 - exam} percent and the final exam is "
+                           f"worth {exam} percent. Late submissions lose five percent per day."),
+            "prerequisites": (f"Enrolment in {code} requires completion of {prereq}. Students without the "
+                              f"prerequisite may apply for an exemption through the course convenor."),
+        }
+        for kind, text in texts.items():
+            docs.append({
+                "doc_id": f"{code}-{kind}",
+                "course": code,
+                "kind": kind,
+                "rel_filepath": f"{code}/{kind}.txt",
+                "text": text,
+            })
+    return docs
+
+QUERY_TEMPLATES = {
+    "overview": ["What is {code} about?", "How many units of credit is {code}?"],
+    "assessment": ["How is {code} assessed?", "What is the final exam worth in {code}?"],
+    "prerequisites": ["What are the prerequisites for {code}?", "Can I enrol in {code} without the prerequisite?"],
+}
+
+# Questions the corpus cannot answer that still share a word or two with it
+OFF_TOPIC_QUERIES = [
+    "best pizza near the labs",
+    "Where can I park my car during the final week?",
+    "Who won the football at the weekly tutorials?",
+    "How much credit is left on my printing account?",
+]
+
+def build_queries(docs: list[dict], seed: int = 7):
+    """
+    Returns:
+        List of dicts with query and the relevant doc_ids
+    """
+    rng = random.Random(seed)
+    queries = []
+    for doc in docs:
+        template = rng.choice(QUERY_TEMPLATES[doc["kind"]])
+        queries.append({"query": template.format(code=doc["course"]), "relevant": [doc["doc_id"]]})
+    return queries
+
+def write_corpus_files(docs: list[dict], root: str):
+    """
+    Write the fixture corpus to disk, one file per document.
+    """
+    for doc in docs:
+        path = os.path.join(root, doc["rel_filepath"])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(doc["text"])
@@ -0,0 +1,152 @@
+"""
+Process and statistics helpers shared by the benchmark scripts.
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+BE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def stub_env(stub_url: str, extra: dict | None = None):
+    """
+    Environment that points the backend at the local stub servers.
+    
+    Args:
+        stub_url: Base URL of benchmarks.stub_servers, e.g. http://127.0.0.1:9100
+        extra: Additional environment overrides
+        
+    Returns:
+        dict suitable for subprocess env
+    """
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": BE_DIR,
+        "OPENAI_API_KEY": "sk-benchmark",
+        "OPENAI_BASE_URL": f"{stub_url}/v1",
+        "OPENAI_API_BASE": f"{stub_url}/v1",
+        "QDRANT_URL": stub_url,
+        "QDRANT_API_KEY": "benchmark",
+        "LANGCHAIN_API_KEY": "",
+    })
+    env.update(extra or {})
+    return env
+
+def launch(module: str, args: list[str], env: dict | None = None):
+    """
+    Start `python -m module *args` from the backend directory.
+    
+    Returns:
+        subprocess.Popen handle
+    """
+    return subprocess.Popen(
+        [sys.executable, "-m", module, *args],
+        cwd=BE_DIR,
+        env=env or dict(os.environ),
+    )
+
+def wait_for_http(url: str, timeout: float = 30.0):
+    """
+    Poll a URL until it answers with any HTTP status.
+    
+    Raises:
+        TimeoutError: If the server does not come up in time
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise TimeoutError(f"Server at {url} did not start within {timeout}s")
+
+def stop(proc: subprocess.Popen):
+    """
+    Terminate a launched process and wait for it to exit.
+    """
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+def percentile(values: list[float], pct: float):
+    """
+    Nearest-rank percentile of a list of numbers.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+def parse_sse(text: str):
+    """
+    Parse an /api/v1/qa SSE body.
+
+    Returns:
+        (answer text, list of (event, data) with data JSON-decoded)
+    """
+    events = []
+    for block in text.split("\n\n"):
+        event, data = "message", None
+        for line in block.split("\n"):
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+        if data is not None:
+            events.append((event, data))
+    answer = "".join(data["text"] for event, data in events if event == "token")
+    return answer, events
+
+async def asgi_stream(app, path: str, payload: dict, headers: dict | None = None):
+    """
+    POST a JSON body to an ASGI app in-process and time every body chunk.
+
+    Unlike httpx's ASGITransport, which returns once the whole response is
+    buffered, this sees each streamed chunk as the app sends it.
+
+    Returns:
+        (status, list of (seconds since the request started, body bytes))
+    """
+    body = json.dumps(payload).encode("utf-8")
+    raw_headers = [(b"content-type", b"application/json"), (b"host", b"benchmark")]
+    raw_headers += [(key.lower().encode("latin-1"), value.encode("latin-1")) for key, value in (headers or {}).items()]
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode("utf-8"), "query_string": b"",
+        "root_path": "", "headers": raw_headers, "client": ("127.0.0.1", 0), "server": ("benchmark", 80),
+    }
+    request_sent = False
+    disconnected = asyncio.Event()
+    status = None
+    chunks = []
+    start = time.perf_counter()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # The client stays connected until the response is complete
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            if message.get("body"):
+                chunks.append((time.perf_counter() - start, message["body"]))
+            if not message.get("more_body", False):
+                disconnected.set()
+
+    await app(scope, receive, send)
+    return status, chunks
@@ -0,0 +1,89 @@
+"""
+Prompt history tokens and history-preparation latency as a conversation grows.
+
+Replays one synthetic conversation turn by turn through the HistoryManager
+(with a stub summarizer that sleeps like an LLM call) and compares it with
+the old behaviour of pasting the whole history into the prompt.
+
+    python -m benchmarks.history_compaction --turns 200 --summary-ms 300
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from benchmarks.harness import percentile
+
+QUESTION = "What are the prerequisites and assessment weightings for COMP{code}, and how does it compare with the previous course we discussed?"
+ANSWER = ("COMP{code} requires a pass in COMP1511 and COMP2521. Assessment is split between weekly labs (20%), "
+          "two assignments (30%) and a final exam (50%). Compared with the previous course it has a heavier "
+          "emphasis on systems programming and includes a group project in the second half of term. ") * 2
+
+def naive_history_text(history):
+    text = ""
+    for msg in history:
+        text += f"{msg.__class__.__name__}: {msg.content}\n"
+    return text
+
+async def run(turns: int, summary_ms: float, think_ms: float, checkpoints: list[int]):
+    from langchain_core.messages import HumanMessage, AIMessage
+    from app.services.history import HistoryManager
+    from app.util.tokens import count_tokens
+
+    async def stub_summarize(summary, messages):
+        await asyncio.sleep(summary_ms / 1000)
+        # Summaries are bounded by the manager; emulate a model that just appends
+        return (summary + " " + " ".join(str(msg.content)[:80] for msg in messages)).strip()
+
+    manager = HistoryManager(summarize=stub_summarize)
+    history = []
+    rows = []
+    latencies = []
+    for turn in range(1, turns + 1):
+        question = QUESTION.format(code=1000 + turn)
+        request_history = history + [HumanMessage(content=question)]
+
+        start = time.perf_counter()
+        compacted = await manager.compact(request_history, "bench")
+        query_context = manager.query_context(request_history)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        if turn in checkpoints:
+            rows.append({
+                "turn": turn,
+                "messages": len(request_history),
+                "naive_history_tokens": count_tokens(naive_history_text(request_history)),
+                "compacted_history_tokens": count_tokens(compacted.to_text()),
+                "query_context_tokens": count_tokens(query_context),
+                "prepare_p50_ms": round(percentile(latencies[-10:], 50), 3),
+            })
+        history = request_history + [AIMessage(content=ANSWER.format(code=1000 + turn))]
+        # User think time; summaries run in the background meanwhile
+        await asyncio.sleep(think_ms / 1000)
+    await manager.wait_pending()
+    return {"turns": turns, "summary_ms": summary_ms, "think_ms": think_ms, "checkpoints": rows, "stats": manager.get_stats()}
+
+def main():
+    parser = argparse.ArgumentParser(description="Conversation history compaction benchmark")
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--summary-ms", type=float, default=300.0)
+    parser.add_argument("--think-ms", type=float, default=50.0)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    checkpoints = sorted({c for c in (1, 5, 10, 25, 50, 100, 200, 500, args.turns) if c <= args.turns})
+    report = asyncio.run(run(args.turns, args.summary_ms, args.think_ms, checkpoints))
+    print(f"{'turn':>5} {'naive':>8} {'compacted':>10} {'query':>6} {'p50 ms':>8}")
+    for row in report["checkpoints"]:
+        print(f"{row['turn']:>5} {row['naive_history_tokens']:>8} {row['compacted_history_tokens']:>10} "
+              f"{row['query_context_tokens']:>6} {row['prepare_p50_ms']:>8.3f}")
+    print(f"summaries {report['stats']['summaries']}  errors {report['stats']['summary_errors']}  shed {report['stats']['summaries_shed']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Recall@k and latency for dense, lexical (BM25) and hybrid (RRF) retrieval.
+
+Runs offline on the labeled fixture corpus: chunks go into an in-memory
+Qdrant collection (dense) and the LexicalIndex (BM25), then each labeled
+query is answered by all three retrievers. Off-topic questions that share
+a word with the corpus check that BM25 alone does not answer them once
+dense search has found nothing.
+
+    python -m benchmarks.hybrid_eval --k 1 3 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from benchmarks.harness import percentile
+
+async def evaluate(ks: list[int], courses: int):
+    from qdrant_client.models import PointStruct
+    from app.services.hybrid_search import _fuse, reciprocal_rank_fusion
+    from app.services.lexical_index import LexicalIndex, get_lexical_min_coverage
+    from app.services.vectorstore import _to_documents
+    from benchmarks.fakes import FakeEmbeddings, memory_qdrant
+    from benchmarks.fixture_corpus import OFF_TOPIC_QUERIES, build_corpus, build_queries
+
+    docs = build_corpus(courses)
+    queries = build_queries(docs)
+    embedding = FakeEmbeddings(dim=256)
+    client = await memory_qdrant(256)
+    index = LexicalIndex()
+    vectors = embedding.embed_documents([doc["text"] for doc in docs])
+    await client.upsert("ACS-Chat", points=[
+        PointStruct(id=i, vector=vector, payload={"page_content": doc["text"], "metadata": {"doc_id": doc["doc_id"]}})
+        for i, (doc, vector) in enumerate(zip(docs, vectors))
+    ])
+    for i, doc in enumerate(docs):
+        index.add(i, doc["text"], {"doc_id": doc["doc_id"]})
+    max_k = max(ks)
+
+    async def dense(query, vector):
+        response = await client.query_points("ACS-Chat", query=vector, limit=max_k * 2, with_payload=True)
+        return _to_documents(response.points)
+
+    def lexical(query):
+        from langchain_core.documents import Document
+        return [Document(page_content=p["page_content"], metadata={**p["metadata"], "_id": pid, "_coverage": coverage})
+                for pid, _, coverage, p in index.match(query, max_k * 2, get_lexical_min_coverage())]
+
+    results = {name: {"hits": {k: 0 for k in ks}, "latency_ms": []} for name in ("dense", "lexical", "hybrid")}
+    for item in queries:
+        vector = embedding.embed_query(item["query"])
+        relevant = set(item["relevant"])
+
+        start = time.perf_counter()
+        dense_docs = await dense(item["query"], vector)
+        dense_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        lexical_docs = lexical(item["query"])
+        lexical_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        dense_hybrid, lexical_hybrid = await asyncio.gather(dense(item["query"], vector), asyncio.to_thread(lexical, item["query"]))
+        hybrid_docs = reciprocal_rank_fusion([dense_hybrid, lexical_hybrid], max_k)
+        hybrid_ms = (time.perf_counter() - start) * 1000
+
+        for name, ranked, ms in (("dense", dense_docs, dense_ms), ("lexical", lexical_docs, lexical_ms), ("hybrid", hybrid_docs, hybrid_ms)):
+            results[name]["latency_ms"].append(ms)
+            ids = [doc.metadata.get("doc_id") for doc in ranked]
+            for k in ks:
+                if relevant & set(ids[:k]):
+                    results[name]["hits"][k] += 1
+
+    # What hybrid search returns for each off-topic question when dense search finds nothing
+    answered = [query for query in OFF_TOPIC_QUERIES if _fuse([], [(doc, 0.0) for doc in lexical(query)], max_k)]
+
+    report = {"queries": len(queries), "documents": len(docs), "retrievers": {},
+              "off_topic": {"queries": len(OFF_TOPIC_QUERIES), "answered_lexical_only": len(answered)}}
+    for name, data in results.items():
+        report["retrievers"][name] = {
+            **{f"recall@{k}": round(data["hits"][k] / len(queries), 3) for k in ks},
+            "p50_ms": round(percentile(data["latency_ms"], 50), 3),
+            "p99_ms": round(percentile(data["latency_ms"], 99), 3),
+        }
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Hybrid retrieval recall/latency evaluation")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--courses", type=int, default=60)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    report = asyncio.run(evaluate(args.k, args.courses))
+    for name, row in report["retrievers"].items():
+        recalls = "  ".join(f"{key} {value:.3f}" for key, value in row.items() if key.startswith("recall"))
+        print(f"{name:<8} {recalls}  p50 {row['p50_ms']:.3f}ms  p99 {row['p99_ms']:.3f}ms")
+    off_topic = report["off_topic"]
+    print(f"off-topic {off_topic['answered_lexical_only']} of {off_topic['queries']} answered from BM25 alone")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Full vs incremental re-index of a synthetic corpus, fully offline.
+
+Builds N text files, indexes them into an in-memory Qdrant collection with
+a fake embedding model that sleeps like the OpenAI API, then:
+  1. re-runs ingestion on the unchanged corpus,
+  2. edits a few files, deletes one, and re-runs again,
+and reports wall time, embedding calls and the final point count.
+
+    python -m benchmarks.incremental_ingest --files 300
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+
+WORDS = ("assignment lecture tutorial exam marks course unit credit prerequisite "
+         "enrolment census deadline lab project report quiz term week").split()
+
+def write_corpus(root: str, files: int, rng: random.Random):
+    for i in range(files):
+        sub_dir = os.path.join(root, f"COMP{6000 + i % 20}")
+        os.makedirs(sub_dir, exist_ok=True)
+        with open(os.path.join(sub_dir, f"page_{i}.txt"), "w") as f:
+            f.write(" ".join(rng.choice(WORDS) for _ in range(1200)))
+
+def timed_run(label: str, root: str, manifest: str, embedding, client, incremental=True):
+    from app.services.vectorize_documents import embedding_service_file
+    from benchmarks.fakes import count_points
+
+    calls_before = embedding.texts_embedded
+    start = time.perf_counter()
+    stats = embedding_service_file(
+        root, incremental=incremental, manifest_path=manifest, client=client, embedding=embedding, progress_interval=60
+    )
+    elapsed = time.perf_counter() - start
+    return {
+        "run": label,
+        "seconds": round(elapsed, 3),
+        "texts_embedded": embedding.texts_embedded - calls_before,
+        "points_in_collection": count_points(client),
+        "stats": stats,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental re-index benchmark")
+    parser.add_argument("--files", type=int, default=300)
+    parser.add_argument("--changed", type=int, default=5, help="Files edited before the last run")
+    parser.add_argument("--embed-latency-ms", type=float, default=100.0, help="Simulated latency per embedding call")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    from benchmarks.fakes import FakeEmbeddings, memory_qdrant
+
+    rng = random.Random(7)
+    embedding = FakeEmbeddings(dim=64, latency_ms=args.embed_latency_ms)
+    client = asyncio.run(memory_qdrant(dim=64))
+    results = []
+    with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as state:
+        manifest = os.path.join(state, "manifest.json")
+        os.environ["LEXICAL_INDEX_PATH"] = os.path.join(state, "lexical")
+        write_corpus(root, args.files, rng)
+        with contextlib.redirect_stdout(io.StringIO()):
+            results.append(timed_run("initial", root, manifest, embedding, client))
+            results.append(timed_run("full-reindex", root, manifest, embedding, client, incremental=False))
+            results.append(timed_run("incremental-unchanged", root, manifest, embedding, client))
+            paths = sorted(os.path.join(d, f) for d, _, fs in os.walk(root) for f in fs)
+            for path in paths[:args.changed]:
+                with open(path, "a") as f:
+                    f.write(" appended revision notes for this week")
+            os.remove(paths[-1])
+            results.append(timed_run("incremental-changed", root, manifest, embedding, client))
+
+    for row in results:
+        print(f"{row['run']:<24}{row['seconds']:>9.3f}s  embedded {row['texts_embedded']:>6}  points {row['points_in_collection']:>6}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
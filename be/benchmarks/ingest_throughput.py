@@ -0,0 +1,84 @@
+"""
+Ingestion throughput (chunks/sec): the old serial per-file loop vs the pipeline.
+
+Both variants embed with the same latency-simulating fake model and write
+to in-memory Qdrant, so the difference is purely pipeline structure.
+
+    python -m benchmarks.ingest_throughput --files 300 --embed-latency-ms 150
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+
+from benchmarks.incremental_ingest import write_corpus
+
+def serial_baseline(root: str, embedding, dim: int):
+    """
+    The pre-pipeline loop: one file at a time, one add_texts call per file.
+    """
+    from langchain_qdrant import QdrantVectorStore
+    from qdrant_client import QdrantClient
+    from qdrant_client.models import Distance, VectorParams
+    from app.util.get_file_chunks import get_file_chunks
+    from app.util.ingest_manifest import iter_source_files
+
+    client = QdrantClient(":memory:")
+    client.create_collection("ACS-Chat", vectors_config=VectorParams(size=dim, distance=Distance.COSINE))
+    store = QdrantVectorStore(client=client, collection_name="ACS-Chat", embedding=embedding)
+    chunks_total = 0
+    start = time.perf_counter()
+    for file_path, file_name in iter_source_files(root):
+        texts = [chunk.page_content for chunk in get_file_chunks(file_path)]
+        store.add_texts(texts, metadatas=[{"rel_filepath": os.path.relpath(file_path, root), "chunk_id": i} for i in range(len(texts))])
+        chunks_total += len(texts)
+    elapsed = time.perf_counter() - start
+    return {"variant": "serial", "seconds": round(elapsed, 3), "chunks": chunks_total, "chunks_per_sec": round(chunks_total / elapsed, 1)}
+
+def pipeline_run(root: str, embedding, dim: int, manifest: str, **options):
+    from app.services.vectorize_documents import embedding_service_file
+    from benchmarks.fakes import memory_qdrant
+
+    client = asyncio.run(memory_qdrant(dim))
+    stats = embedding_service_file(root, incremental=False, manifest_path=manifest, client=client,
+                                   embedding=embedding, progress_interval=60, **options)
+    return {"variant": "pipeline", "seconds": stats["elapsed"], "chunks": stats["chunks_upserted"],
+            "chunks_per_sec": stats["chunks_per_sec"], "options": options}
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestion throughput benchmark")
+    parser.add_argument("--files", type=int, default=300)
+    parser.add_argument("--embed-latency-ms", type=float, default=150.0)
+    parser.add_argument("--embed-concurrency", type=int, default=4)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    from benchmarks.fakes import FakeEmbeddings
+
+    dim = 64
+    embedding = FakeEmbeddings(dim=dim, latency_ms=args.embed_latency_ms)
+    with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as state:
+        write_corpus(root, args.files, random.Random(11))
+        os.environ["LEXICAL_INDEX_PATH"] = os.path.join(state, "lexical")
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = [
+                serial_baseline(root, embedding, dim),
+                pipeline_run(root, embedding, dim, os.path.join(state, "a.json"), embed_concurrency=args.embed_concurrency),
+            ]
+
+    for row in results:
+        print(f"{row['variant']:<10}{row['seconds']:>9.3f}s  {row['chunks']:>7} chunks  {row['chunks_per_sec']:>9.1f} chunks/s")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
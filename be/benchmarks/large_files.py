@@ -0,0 +1,163 @@
+"""
+Peak memory and skipped embedding work for large and mixed-format files.
+
+    memory  one generated text file of each --sizes-mb, split by the old
+            whole-file path (TextLoader + RecursiveCharacterTextSplitter)
+            and by the streaming loader. Each run is a fresh process;
+            peak RSS growth is measured after imports.
+    mixed   a corpus with text, Markdown, HTML, binaries and a mislabelled
+            .pdf, run through the ingestion pipeline. It reports which
+            files were skipped before embedding, and the chunk count the
+            old path would have embedded.
+
+    python -m benchmarks.large_files --sizes-mb 10 50 200
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+
+def write_text(path: str, size_mb: float, seed: int = 1):
+    rng = random.Random(seed)
+    words = ["".join(rng.choice("abcdefghijklmnop") for _ in range(rng.randint(2, 9))) for _ in range(2000)]
+    target = int(size_mb * (1 << 20))
+    with open(path, "w", encoding="utf-8") as f:
+        written = 0
+        paragraph = 0
+        while written < target:
+            line = " ".join(rng.choice(words) for _ in range(rng.randint(5, 40)))
+            line += ".\n\n" if paragraph % 5 == 0 else ". "
+            f.write(line)
+            written += len(line)
+            paragraph += 1
+
+def _peak_rss_mb():
+    import resource
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _split_in_child(path: str, mode: str):
+    from langchain_community.document_loaders import TextLoader
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from app.util.file_loaders import iter_chunks
+
+    before = _peak_rss_mb()
+    if mode == "whole_file":
+        docs = TextLoader(path).load()
+        chunks = len(RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=100).split_documents(docs))
+    else:
+        chunks = sum(1 for _ in iter_chunks(path))
+    return chunks, round(_peak_rss_mb() - before, 1)
+
+def bench_memory(sizes_mb: list[float], directory: str):
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for size in sizes_mb:
+        path = os.path.join(directory, f"large-{size}.txt")
+        write_text(path, size)
+        row = {"size_mb": size}
+        for mode in ("whole_file", "streaming"):
+            with context.Pool(1) as pool:
+                chunks, peak = pool.apply(_split_in_child, (path, mode))
+            row[mode] = {"chunks": chunks, "peak_rss_growth_mb": peak}
+        results.append(row)
+        os.remove(path)
+    return results
+
+def write_mixed(root: str):
+    os.makedirs(os.path.join(root, "COMP1511"), exist_ok=True)
+    course = os.path.join(root, "COMP1511")
+    write_text(os.path.join(course, "notes.txt"), 0.05, seed=2)
+    with open(os.path.join(course, "outline.md"), "w") as f:
+        for week in range(1, 11):
+            f.write(f"# Week {week}\n\n## Topics\n\n" + "Loops, arrays and pointers. " * 20 + "\n\n## Lab\n\n" + "Practice exercises. " * 15 + "\n\n")
+    with open(os.path.join(course, "handbook.html"), "w") as f:
+        f.write("<html><head><style>body{}</style><script>track()</script></head><body>")
+        for section in range(8):
+            f.write(f"<h2>Section {section}</h2><p>" + "Course policy text. " * 30 + "</p><ul><li>Item</li></ul>")
+        f.write("</body></html>")
+    rng = random.Random(3)
+    with open(os.path.join(course, "lecture.mp4"), "wb") as f:
+        f.write(bytes(rng.getrandbits(8) for _ in range(200000)))
+    with open(os.path.join(course, "diagram.png"), "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n" + bytes(rng.getrandbits(8) for _ in range(50000)))
+    with open(os.path.join(course, "scan.pdf"), "wb") as f:
+        f.write(bytes(rng.getrandbits(8) for _ in range(30000)))
+
+def _old_chunk_count(root: str):
+    # What the old reader would have tried to embed, counting files it failed on as zero
+    from langchain_community.document_loaders import TextLoader
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from app.util.ingest_manifest import iter_source_files
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=100)
+    total, failed = 0, 0
+    for file_path, _ in iter_source_files(root):
+        try:
+            total += len(splitter.split_documents(TextLoader(file_path).load()))
+        except Exception:
+            failed += 1
+    return total, failed
+
+def bench_mixed(directory: str):
+    from app.services.ingest_pipeline import run_ingestion
+    from benchmarks.fakes import FakeEmbeddings, memory_qdrant
+
+    root = os.path.join(directory, "mixed")
+    write_mixed(root)
+    old_chunks, old_failed = _old_chunk_count(root)
+
+    async def run():
+        client = await memory_qdrant(64)
+        # A low stream threshold sends every file through the streaming reader as well
+        with contextlib.redirect_stdout(io.StringIO()):
+            return await run_ingestion(root, incremental=False, manifest_path=os.path.join(directory, "manifest.json"),
+                                       client=client, embedding=FakeEmbeddings(dim=64), read_workers=0,
+                                       stream_threshold=1 << 14, progress_interval=60)
+
+    os.environ["LEXICAL_INDEX_PATH"] = os.path.join(directory, "lexical")
+    stats = asyncio.run(run())
+    return {
+        "old_reader": {"chunks": old_chunks, "files_failed": old_failed},
+        "pipeline": {
+            "chunks": stats.chunks_upserted,
+            "files_added": stats.files_added,
+            "files_skipped": stats.files_skipped,
+            "skipped": stats.skipped_files,
+            "errors": stats.errors,
+        },
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming loaders: peak memory and skipped files")
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[10, 50])
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = {"memory": bench_memory(args.sizes_mb, directory), "mixed": bench_mixed(directory)}
+
+    for row in results["memory"]:
+        whole, streaming = row["whole_file"], row["streaming"]
+        print(f"{row['size_mb']:>7.1f} MB  whole file +{whole['peak_rss_growth_mb']:>7.1f} MB peak ({whole['chunks']} chunks)  "
+              f"streaming +{streaming['peak_rss_growth_mb']:>6.1f} MB peak ({streaming['chunks']} chunks)")
+    mixed = results["mixed"]
+    print(f"mixed corpus: old reader {mixed['old_reader']['chunks']} chunks, {mixed['old_reader']['files_failed']} files failed; "
+          f"pipeline {mixed['pipeline']['chunks']} chunks, {mixed['pipeline']['files_skipped']} skipped before embedding")
+    for path, reason in mixed["pipeline"]["skipped"].items():
+        print(f"  skipped {path}: {reason}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Latency and recall of the in-process quantized replica against Qdrant.
+
+Two corpora go into a Qdrant collection and are exported to an int8 and a
+float16 replica:
+
+    fixture    the labeled fixture corpus with FakeEmbeddings, for recall@k
+               against the relevance labels
+    synthetic  --points clustered random vectors of --dim dimensions, for
+               latency at a realistic corpus size
+
+For every query the replica's top-k is also compared with Qdrant's exact
+top-k (overlap@k, counting hits tied with Qdrant's k-th score as matches;
+the fake embeddings produce many exact ties, so recall@k can differ by
+tie order alone). Qdrant is the in-memory local mode unless --qdrant-url
+points at a server, in which case its numbers include the network
+round-trip every production search pays.
+
+    python -m benchmarks.local_replica --points 20000 --dim 384
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from benchmarks.harness import percentile
+
+COLLECTION = "ACS-Chat"
+
+async def make_client(url: str | None, dim: int):
+    from qdrant_client import AsyncQdrantClient
+    from qdrant_client.models import Distance, VectorParams
+
+    client = AsyncQdrantClient(url=url) if url else AsyncQdrantClient(":memory:")
+    if await client.collection_exists(COLLECTION):
+        await client.delete_collection(COLLECTION)
+    await client.create_collection(COLLECTION, vectors_config=VectorParams(size=dim, distance=Distance.COSINE))
+    return client
+
+async def upsert(client, vectors, payloads, batch_size: int = 1000):
+    from qdrant_client.models import PointStruct
+
+    for start in range(0, len(vectors), batch_size):
+        await client.upsert(COLLECTION, points=[
+            PointStruct(id=i, vector=vectors[i].tolist(), payload=payloads[i])
+            for i in range(start, min(start + batch_size, len(vectors)))
+        ])
+
+async def compare(client, replica, queries, k: int, labels=None, batch: int = 16):
+    """
+    Run every query through Qdrant and the replica.
+
+    Returns:
+        dict of latency percentiles, overlap@k and, with labels, recall@k for both
+    """
+    remote_ms, local_ms, overlaps = [], [], []
+    hits = {"qdrant": 0, "replica": 0}
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        response = await client.query_points(COLLECTION, query=query.tolist(), limit=k, with_payload=True)
+        remote_ms.append((time.perf_counter() - start) * 1000)
+        remote = response.points
+
+        start = time.perf_counter()
+        local = replica.to_documents(replica.search(query[None, :], k)[0])
+        local_ms.append((time.perf_counter() - start) * 1000)
+
+        # A hit tied with Qdrant's k-th score is as good as Qdrant's own pick; only the tie order differs
+        remote_ids = {point.id for point in remote}
+        kth = remote[-1].score if remote else 0.0
+        matched = [doc.metadata["_id"] in remote_ids or doc.metadata["_score"] >= kth - 1e-5 for doc in local]
+        overlaps.append(sum(matched) / k)
+        if labels is not None:
+            relevant = set(labels[i])
+            hits["qdrant"] += bool(relevant & {point.payload["metadata"]["doc_id"] for point in remote})
+            hits["replica"] += bool(relevant & {doc.metadata["doc_id"] for doc in local})
+
+    # Batched replica search, amortizing the coarse scan over `batch` queries
+    batched_ms = []
+    for start_row in range(0, len(queries), batch):
+        chunk = queries[start_row:start_row + batch]
+        start = time.perf_counter()
+        for query_hits in replica.search(chunk, k):
+            replica.to_documents(query_hits)
+        batched_ms.append((time.perf_counter() - start) * 1000 / len(chunk))
+
+    report = {
+        "queries": len(queries),
+        "qdrant_p50_ms": round(percentile(remote_ms, 50), 3),
+        "qdrant_p99_ms": round(percentile(remote_ms, 99), 3),
+        "replica_p50_ms": round(percentile(local_ms, 50), 3),
+        "replica_p99_ms": round(percentile(local_ms, 99), 3),
+        f"replica_batch{batch}_per_query_ms": round(percentile(batched_ms, 50), 3),
+        f"overlap@{k}": round(float(np.mean(overlaps)), 4),
+    }
+    if labels is not None:
+        report[f"qdrant_recall@{k}"] = round(hits["qdrant"] / len(queries), 3)
+        report[f"replica_recall@{k}"] = round(hits["replica"] / len(queries), 3)
+    return report
+
+async def run_corpus(url, vectors, payloads, queries, k, labels=None):
+    from app.services.local_replica import LocalReplica, export_local_replica
+
+    client = await make_client(url, vectors.shape[1])
+    try:
+        await upsert(client, vectors, payloads)
+        results = {}
+        for dtype in ("int8", "float16"):
+            with tempfile.TemporaryDirectory() as path:
+                start = time.perf_counter()
+                count = await export_local_replica(client, path, dtype=dtype)
+                export_s = time.perf_counter() - start
+                with open(os.path.join(path, "CURRENT")) as f:
+                    directory = os.path.join(path, f.read().strip())
+                size = sum(os.path.getsize(os.path.join(directory, n)) for n in ("codes.bin", "scales.bin"))
+                replica = LocalReplica(directory)
+                results[dtype] = {
+                    "points": count,
+                    "export_s": round(export_s, 2),
+                    "coarse_mb": round(size / 1e6, 2),
+                    **await compare(client, replica, queries, k, labels),
+                }
+        return results
+    finally:
+        await client.close()
+
+def synthetic(points: int, dim: int, queries: int, seed: int = 3):
+    """
+    Clustered unit vectors, closer to real embeddings than uniform noise.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, points // 50), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), points)] + 0.6 * rng.standard_normal((points, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    query_vectors = vectors[rng.integers(0, points, queries)] + 0.3 * rng.standard_normal((queries, dim)).astype(np.float32)
+    payloads = [{"page_content": f"Synthetic chunk {i}", "metadata": {"chunk_id": i}} for i in range(points)]
+    return vectors, payloads, query_vectors.astype(np.float32)
+
+def main():
+    parser = argparse.ArgumentParser(description="Local replica versus Qdrant search")
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--courses", type=int, default=60)
+    parser.add_argument("--qdrant-url", help="Compare against this Qdrant server instead of in-memory Qdrant")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    from benchmarks.fakes import FakeEmbeddings
+    from benchmarks.fixture_corpus import build_corpus, build_queries
+
+    docs = build_corpus(args.courses)
+    labeled = build_queries(docs)
+    embedding = FakeEmbeddings(dim=256)
+    fixture_vectors = np.asarray(embedding.embed_documents([doc["text"] for doc in docs]), dtype=np.float32)
+    fixture_payloads = [{"page_content": doc["text"], "metadata": {"doc_id": doc["doc_id"]}} for doc in docs]
+    fixture_queries = np.asarray(embedding.embed_documents([item["query"] for item in labeled]), dtype=np.float32)
+
+    vectors, payloads, queries = synthetic(args.points, args.dim, args.queries)
+    results = {
+        "fixture": asyncio.run(run_corpus(args.qdrant_url, fixture_vectors, fixture_payloads, fixture_queries,
+                                          args.k, [item["relevant"] for item in labeled])),
+        "synthetic": asyncio.run(run_corpus(args.qdrant_url, vectors, payloads, queries, args.k)),
+    }
+
+    for corpus, by_dtype in results.items():
+        for dtype, r in by_dtype.items():
+            recall = f"  recall@{args.k} qdrant {r[f'qdrant_recall@{args.k}']:.3f} replica {r[f'replica_recall@{args.k}']:.3f}" \
+                if f"qdrant_recall@{args.k}" in r else ""
+            print(f"{corpus:<10}{dtype:<8}{r['points']:>7} pts  qdrant p50 {r['qdrant_p50_ms']:8.3f}ms  "
+                  f"replica p50 {r['replica_p50_ms']:7.3f}ms p99 {r['replica_p99_ms']:7.3f}ms  "
+                  f"batched {r['replica_batch16_per_query_ms']:7.3f}ms/q  overlap@{args.k} {r[f'overlap@{args.k}']:.3f}{recall}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
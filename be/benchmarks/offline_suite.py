@@ -0,0 +1,255 @@
+"""
+Offline retrieval quality and latency suite.
+
+Runs the real ingestion pipeline, retrieval and QA chain with no network:
+FakeEmbeddings in place of OpenAIEmbeddings, an in-memory Qdrant and a fake
+streaming chat model. It measures
+
+    ingest     chunks/sec of embedding_service_file on the fixture corpus
+    retrieval  recall@k of the hybrid candidates and of the packed context,
+               and how many off-topic questions BM25 alone would answer
+    stages     per-stage latency of qa_chain, from its time_stage() calls
+    sse        TTFT and tokens/sec through POST /api/v1/qa under concurrency
+
+and writes everything to one JSON file. Given --baseline (an earlier
+output), it prints how each metric moved, so a regression shows up as a
+diff between two runs.
+
+    python -m benchmarks.offline_suite --output .cache/bench/current.json
+    python -m benchmarks.offline_suite --baseline .cache/bench/current.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("LANGCHAIN_API_KEY", "")
+# Every query has to reach retrieval and the LLM, not a cache or another request's stream
+os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+os.environ["ANSWER_CACHE_ENABLED"] = "false"
+os.environ["QA_COALESCE_ENABLED"] = "false"
+os.environ["SHARED_STORE_BACKEND"] = "memory"
+
+from benchmarks.harness import asgi_stream, parse_sse, percentile
+
+DIM = 256
+
+def install_fakes(embedding, client, llm, state_dir: str):
+    """
+    Point the app's process-wide clients at the offline fakes.
+    """
+    from app.config import embedding_config, openai_llm_config, qdrant_config
+    from app.util import metrics
+    from benchmarks.fakes import StageRecorder
+
+    os.environ["LEXICAL_INDEX_PATH"] = os.path.join(state_dir, "lexical")
+    os.environ["INGEST_MANIFEST_PATH"] = os.path.join(state_dir, "manifest.json")
+    embedding_config._embedding = embedding
+    qdrant_config._async_qdrant_client = client
+    openai_llm_config._openai_llm = llm
+    recorder = StageRecorder()
+    metrics.STAGE_SECONDS = recorder
+    return recorder
+
+def bench_ingest(root: str, embedding, client):
+    from app.services.vectorize_documents import embedding_service_file
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        stats = embedding_service_file(root, incremental=False, client=client, embedding=embedding, progress_interval=60)
+    return {
+        "files": stats["files_done"],
+        "chunks": stats["chunks_upserted"],
+        "seconds": stats["elapsed"],
+        "chunks_per_sec": stats["chunks_per_sec"],
+    }
+
+def _doc_ids(docs):
+    ids = []
+    for doc in docs:
+        rel_filepath = doc.metadata.get("rel_filepath", "")
+        ids.append(os.path.splitext(rel_filepath)[0].replace(os.sep, "-"))
+    return ids
+
+async def bench_retrieval(queries: list[dict], ks: list[int]):
+    from app.chains.qa_chain import select_context
+    from app.services.embedding import aembedding_service_text
+    from app.services.hybrid_search import _fuse, ahybrid_search
+    from app.services.lexical_index import lexical_search
+    from benchmarks.fixture_corpus import OFF_TOPIC_QUERIES
+
+    max_k = max(ks)
+    overfetch = int(os.getenv("RETRIEVAL_OVERFETCH", "4"))
+    hits = {"candidates": {k: 0 for k in ks}, "context": {k: 0 for k in ks}}
+    latency_ms = []
+    for item in queries:
+        start = time.perf_counter()
+        vector = await aembedding_service_text(item["query"])
+        candidates = await ahybrid_search(item["query"], vector, max_k * overfetch, similarity_threshold=0.3)
+        context = await select_context(item["query"], candidates, max_k)
+        latency_ms.append((time.perf_counter() - start) * 1000)
+        relevant = set(item["relevant"])
+        for name, docs in (("candidates", candidates), ("context", context)):
+            ids = _doc_ids(docs)
+            for k in ks:
+                if relevant & set(ids[:k]):
+                    hits[name][k] += 1
+    report = {name: {f"recall@{k}": round(counts[k] / len(queries), 3) for k in ks} for name, counts in hits.items()}
+    report["queries"] = len(queries)
+    report["p50_ms"] = round(percentile(latency_ms, 50), 3)
+    report["p99_ms"] = round(percentile(latency_ms, 99), 3)
+    # Should stay 0: with no dense match, a shared word or two must not produce context
+    off_topic_answered = 0
+    for query in OFF_TOPIC_QUERIES:
+        if _fuse([], await asyncio.to_thread(lexical_search, query, max_k * overfetch), max_k):
+            off_topic_answered += 1
+    report["off_topic_answered"] = off_topic_answered
+    return report
+
+async def bench_stages(queries: list[dict], recorder):
+    from langchain_core.messages import HumanMessage
+    from app.chains.qa_chain import qa_chain
+
+    recorder.reset()
+    for item in queries:
+        stream = await qa_chain([HumanMessage(content=item["query"])], item["query"])
+        async for _ in stream:
+            pass
+    return {
+        stage: {
+            "count": len(samples),
+            "p50_ms": round(percentile([s * 1000 for s in samples], 50), 3),
+            "p99_ms": round(percentile([s * 1000 for s in samples], 99), 3),
+        }
+        for stage, samples in sorted(recorder.samples.items())
+    }
+
+async def bench_sse(queries: list[dict], concurrency: int):
+    from app.main import app
+
+    async def one(item):
+        status, chunks = await asgi_stream(app, "/api/v1/qa", {"history": [], "message": item["query"]})
+        if status != 200:
+            return None
+        text = b"".join(body for _, body in chunks).decode("utf-8")
+        _, events = parse_sse(text)
+        token_times = [t for t, body in chunks if b"event: token" in body]
+        done = [data for event, data in events if event == "done"]
+        if not token_times or not done:
+            return None
+        ttft = token_times[0]
+        total = chunks[-1][0]
+        tokens = done[0]["usage"]["completion_tokens"]
+        return ttft, total, tokens / max(total - ttft, 1e-6)
+
+    batch = [queries[i % len(queries)] for i in range(concurrency)]
+    results = await asyncio.gather(*[one(item) for item in batch])
+    ok = [r for r in results if r is not None]
+    return {
+        "concurrency": concurrency,
+        "ok": len(ok),
+        "ttft_p50_ms": round(percentile([r[0] * 1000 for r in ok], 50), 1),
+        "ttft_p99_ms": round(percentile([r[0] * 1000 for r in ok], 99), 1),
+        "total_p50_ms": round(percentile([r[1] * 1000 for r in ok], 50), 1),
+        "tokens_per_sec_p50": round(percentile([r[2] for r in ok], 50), 1),
+    }
+
+def _flatten(report, prefix=""):
+    values = {}
+    for key, value in report.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            values.update(_flatten(value, f"{name}."))
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, dict) and "concurrency" in item:
+                    values.update(_flatten(item, f"{name}.c{item['concurrency']}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and key != "count":
+            values[name] = value
+    return values
+
+def compare(report: dict, baseline: dict, threshold: float):
+    """
+    Print metrics that moved by more than threshold (a fraction) against the baseline.
+    """
+    current = _flatten(report)
+    previous = _flatten(baseline)
+    changed = 0
+    for name in sorted(current.keys() & previous.keys()):
+        old, new = previous[name], current[name]
+        if old == new or (old and abs(new - old) / abs(old) <= threshold):
+            continue
+        changed += 1
+        delta = f"{(new - old) / abs(old) * 100:+.1f}%" if old else "new"
+        print(f"  {name:<48}{old:>12}{new:>12}  {delta}")
+    if not changed:
+        print(f"  no metric moved by more than {threshold * 100:.0f}%")
+
+async def run_suite(args, root: str, state_dir: str):
+    from benchmarks.fakes import FakeEmbeddings, FakeStreamingChatModel, memory_qdrant
+    from benchmarks.fixture_corpus import build_corpus, build_queries, write_corpus_files
+
+    docs = build_corpus(args.courses)
+    queries = build_queries(docs)
+    write_corpus_files(docs, root)
+
+    embedding = FakeEmbeddings(dim=DIM, latency_ms=args.embed_latency_ms)
+    client = await memory_qdrant(DIM)
+    llm = FakeStreamingChatModel(tokens=args.llm_tokens, ttft_ms=args.llm_ttft_ms, token_ms=args.llm_token_ms)
+    recorder = install_fakes(embedding, client, llm, state_dir)
+
+    # Ingestion runs its own event loop, so it goes to a thread
+    report = {"ingest": await asyncio.to_thread(bench_ingest, root, embedding, client)}
+    report["retrieval"] = await bench_retrieval(queries, args.k)
+    report["stages"] = await bench_stages(queries[:args.stage_queries], recorder)
+    report["sse"] = [await bench_sse(queries, level) for level in args.concurrency]
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline retrieval quality and latency suite")
+    parser.add_argument("--courses", type=int, default=60, help="Fixture corpus size, three documents per course")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--stage-queries", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0)
+    parser.add_argument("--llm-ttft-ms", type=float, default=150.0)
+    parser.add_argument("--llm-token-ms", type=float, default=10.0)
+    parser.add_argument("--llm-tokens", type=int, default=40)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--baseline", help="Earlier --output file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative change worth reporting")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as state_dir:
+        report = asyncio.run(run_suite(args, root, state_dir))
+
+    ingest = report["ingest"]
+    print(f"ingest     {ingest['chunks']} chunks in {ingest['seconds']:.3f}s, {ingest['chunks_per_sec']:.1f} chunks/s")
+    retrieval = report["retrieval"]
+    for name in ("candidates", "context"):
+        recalls = "  ".join(f"{key} {value:.3f}" for key, value in retrieval[name].items())
+        print(f"retrieval  {name:<11}{recalls}")
+    print(f"retrieval  p50 {retrieval['p50_ms']:.3f}ms  p99 {retrieval['p99_ms']:.3f}ms  "
+          f"off-topic answered {retrieval['off_topic_answered']}")
+    for stage, row in report["stages"].items():
+        print(f"stage      {stage:<20}p50 {row['p50_ms']:>9.3f}ms  p99 {row['p99_ms']:>9.3f}ms")
+    for row in report["sse"]:
+        print(f"sse        c={row['concurrency']:<4} ok {row['ok']:<4} TTFT p50 {row['ttft_p50_ms']:.1f}ms "
+              f"p99 {row['ttft_p99_ms']:.1f}ms  {row['tokens_per_sec_p50']:.1f} tok/s")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"changes against {args.baseline}:")
+        compare(report, baseline, args.threshold)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
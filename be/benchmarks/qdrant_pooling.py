@@ -0,0 +1,94 @@
+"""
+Per-query Qdrant latency with a fresh client per query vs the pooled client.
+
+Runs against the local Qdrant stand-in in benchmarks.stub_servers, so the
+difference is client construction plus a TCP connect per query; against
+Qdrant Cloud a TLS handshake is added on top.
+
+    python -m benchmarks.qdrant_pooling --queries 300
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from benchmarks.harness import launch, percentile, stop, wait_for_http
+
+def summarize(label: str, samples: list[float]):
+    ms = [s * 1000 for s in samples]
+    return {
+        "mode": label,
+        "queries": len(ms),
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "mean_ms": round(sum(ms) / len(ms), 3),
+    }
+
+def run_sync(queries: int, vector: list[float]):
+    from qdrant_client import QdrantClient
+    from app.config import qdrant_config
+
+    unpooled = []
+    for _ in range(queries):
+        start = time.perf_counter()
+        client = QdrantClient(url=os.environ["QDRANT_URL"], api_key=os.environ["QDRANT_API_KEY"])
+        client.query_points(collection_name="ACS-Chat", query=vector, limit=5, with_payload=True)
+        client.close()
+        unpooled.append(time.perf_counter() - start)
+
+    pooled = []
+    client = qdrant_config.get_qdrant_client()
+    for _ in range(queries):
+        start = time.perf_counter()
+        client.query_points(collection_name="ACS-Chat", query=vector, limit=5, with_payload=True)
+        pooled.append(time.perf_counter() - start)
+    return [summarize("sync/new-client", unpooled), summarize("sync/pooled", pooled)]
+
+async def run_async(queries: int, vector: list[float]):
+    from qdrant_client import AsyncQdrantClient
+    from app.config import qdrant_config
+
+    unpooled = []
+    for _ in range(queries):
+        start = time.perf_counter()
+        client = AsyncQdrantClient(url=os.environ["QDRANT_URL"], api_key=os.environ["QDRANT_API_KEY"])
+        await client.query_points(collection_name="ACS-Chat", query=vector, limit=5, with_payload=True)
+        await client.close()
+        unpooled.append(time.perf_counter() - start)
+
+    pooled = []
+    client = qdrant_config.get_async_qdrant_client()
+    for _ in range(queries):
+        start = time.perf_counter()
+        await client.query_points(collection_name="ACS-Chat", query=vector, limit=5, with_payload=True)
+        pooled.append(time.perf_counter() - start)
+    await qdrant_config.close_qdrant()
+    return [summarize("async/new-client", unpooled), summarize("async/pooled", pooled)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Qdrant client pooling micro-benchmark")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--stub-port", type=int, default=9101)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    os.environ["QDRANT_URL"] = stub_url
+    os.environ["QDRANT_API_KEY"] = "benchmark"
+    stub = launch("benchmarks.stub_servers", ["--port", str(args.stub_port), "--search-ms", "0"])
+    try:
+        wait_for_http(stub_url)
+        vector = [0.1] * 1536
+        results = run_sync(args.queries, vector) + asyncio.run(run_async(args.queries, vector))
+    finally:
+        stop(stub)
+
+    for row in results:
+        print(f"{row['mode']:<20} p50 {row['p50_ms']:>8.3f}ms  p99 {row['p99_ms']:>8.3f}ms  mean {row['mean_ms']:>8.3f}ms")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
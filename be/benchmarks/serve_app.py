@@ -0,0 +1,41 @@
+"""
+Run the backend for benchmarking, optionally with the pre-async retrieval path.
+
+    python -m benchmarks.serve_app --port 9200 [--blocking]
+
+--blocking swaps the async embedding/search calls in qa_chain for the
+synchronous embedding_service_text/search_vectorstore, reproducing the
+behaviour before retrieval was made async.
+"""
+import argparse
+
+import uvicorn
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve app.main for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--blocking", action="store_true", help="Use the synchronous retrieval calls")
+    args = parser.parse_args()
+
+    from app.main import app
+
+    if args.blocking:
+        from app.chains import qa_chain as qa_chain_module
+        from app.services import hybrid_search
+        from app.services.embedding import embedding_service_text
+        from app.services.vectorstore import search_vectorstore
+
+        async def blocking_embedding(text):
+            return embedding_service_text(text)
+
+        async def blocking_search(query_vector, top_k, similarity_threshold=0.3):
+            return search_vectorstore(query_vector, top_k, similarity_threshold=similarity_threshold)
+
+        qa_chain_module.aembedding_service_text = blocking_embedding
+        hybrid_search.asearch_vectorstore = blocking_search
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Writes, bytes and added token delay per answer for different SSE flush
+settings.
+
+Feeds a synthetic LLM stream (one short token every --token-ms) through
+app.util.sse.sse_answer_stream and counts the frames it yields; each frame
+is one write to the socket, and so at least one TCP packet and one
+HTTP/2 DATA frame through nginx. The added delay is how long each token
+waits in the batch before its frame goes out. A 0 ms / 0 byte setting
+reproduces the old one-write-per-token behaviour.
+
+    python -m benchmarks.sse_framing --tokens 400 --token-ms 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from benchmarks.harness import percentile
+
+async def run(tokens: int, token_ms: float, flush_ms: float, flush_bytes: int):
+    from app.util.sse import sse_answer_stream
+
+    emitted = []
+
+    async def llm_stream():
+        for i in range(tokens):
+            await asyncio.sleep(token_ms / 1000)
+            emitted.append(time.perf_counter())
+            yield f" tok{i}"
+
+    writes = 0
+    size = 0
+    delays = []
+    received = 0
+    async for frame in sse_answer_stream(llm_stream(), "bench", flush_interval=flush_ms / 1000, flush_bytes=flush_bytes):
+        now = time.perf_counter()
+        writes += 1
+        size += len(frame.encode("utf-8"))
+        if frame.startswith("event: token"):
+            # Every token produced so far and not yet sent goes out in this frame
+            delays.extend((now - t) * 1000 for t in emitted[received:])
+            received = len(emitted)
+    return {
+        "flush_ms": flush_ms,
+        "flush_bytes": flush_bytes,
+        "writes": writes,
+        "bytes": size,
+        "delay_p50_ms": round(percentile(delays, 50), 2),
+        "delay_p99_ms": round(percentile(delays, 99), 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="SSE frames per answer by flush setting")
+    parser.add_argument("--tokens", type=int, default=400)
+    parser.add_argument("--token-ms", type=float, default=8.0)
+    parser.add_argument("--settings", nargs="+", default=["0:0", "30:64", "60:256"], help="flush_ms:flush_bytes pairs")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    results = []
+    for setting in args.settings:
+        flush_ms, flush_bytes = setting.split(":")
+        results.append(asyncio.run(run(args.tokens, args.token_ms, float(flush_ms), int(flush_bytes))))
+
+    print(f"{'flush':>12}{'writes':>8}{'bytes':>8}{'delay p50':>11}{'delay p99':>11}")
+    for r in results:
+        print(f"{r['flush_ms']:>6.0f}ms/{r['flush_bytes']:<4}{r['writes']:>8}{r['bytes']:>8}"
+              f"{r['delay_p50_ms']:>9.2f}ms{r['delay_p99_ms']:>9.2f}ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+Local stand-ins for the OpenAI and Qdrant HTTP APIs used by the benchmarks.
+
+A single FastAPI app serves:
+    POST /v1/embeddings                          (OpenAI embeddings)
+    POST /v1/chat/completions                    (OpenAI streaming chat completions)
+    POST /collections/{name}/points/query        (Qdrant query_points)
+    POST /collections/{name}/points/query/batch  (Qdrant query_batch_points)
+    POST /collections/{name}/points/search       (Qdrant search)
+
+Latencies are simulated with asyncio.sleep so the stub itself never becomes
+the bottleneck. --llm-max-concurrency makes chat completions answer 429
+beyond that many concurrent streams, like a provider rate limit. Run with:
+    python -m benchmarks.stub_servers --port 9100 --embed-ms 80 --search-ms 40
+
+Faults can be injected into embeddings and search: a *_slow_ratio share of
+calls takes *_slow_ms instead of the normal latency, and a *_error_ratio
+share answers 500 (after the normal latency). They are set with the
+--embed-*/--search-* flags or at runtime with
+    POST /stub/faults  {"embed_error_ratio": 1.0}
+which accepts any of the settings and returns the new values.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import random
+import struct
+import time
+import zlib
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULTS = {
+    "embed_ms": 80.0,
+    "search_ms": 40.0,
+    "llm_ttft_ms": 150.0,
+    "llm_token_ms": 10.0,
+    "llm_tokens": 40,
+    "llm_max_concurrency": 0,
+    "dim": 1536,
+    "embed_slow_ratio": 0.0,
+    "embed_slow_ms": 0.0,
+    "embed_error_ratio": 0.0,
+    "search_slow_ratio": 0.0,
+    "search_slow_ms": 0.0,
+    "search_error_ratio": 0.0,
+    "seed": 0,
+}
+
+def fake_vector(text: str, dim: int):
+    """
+    Deterministic pseudo-embedding derived from a CRC of the input.
+    """
+    seed = zlib.crc32(text.encode("utf-8"))
+    values = []
+    for i in range(dim):
+        seed = (seed * 1103515245 + 12345) & 0x7FFFFFFF
+        values.append((seed / 0x7FFFFFFF) - 0.5)
+    return values
+
+def create_stub_app(settings: dict | None = None):
+    """
+    Build the stub FastAPI app.
+    
+    Args:
+        settings: Overrides for DEFAULTS (latencies in milliseconds)
+        
+    Returns:
+        FastAPI application
+    """
+    cfg = {**DEFAULTS, **(settings or {})}
+    app = FastAPI()
+    app.state.stub_calls = {"embeddings": 0, "chat": 0, "search": 0, "chat_rejected": 0,
+                            "embeddings_slow": 0, "embeddings_failed": 0, "search_slow": 0, "search_failed": 0}
+    app.state.active_chats = 0
+    rng = random.Random(cfg["seed"])
+
+    async def simulate(kind: str, prefix: str):
+        """
+        Sleep for the call's latency, slow or normal, and return an error response if it should fail.
+        """
+        if rng.random() < cfg[f"{prefix}_slow_ratio"]:
+            app.state.stub_calls[f"{kind}_slow"] += 1
+            await asyncio.sleep(cfg[f"{prefix}_slow_ms"] / 1000)
+        else:
+            await asyncio.sleep(cfg[f"{prefix}_ms"] / 1000)
+        if rng.random() < cfg[f"{prefix}_error_ratio"]:
+            app.state.stub_calls[f"{kind}_failed"] += 1
+            return JSONResponse({"error": {"message": "Injected fault", "type": "server_error"}}, status_code=500)
+        return None
+
+    @app.get("/")
+    async def qdrant_root():
+        return {"title": "qdrant - vector search engine", "version": "1.15.0"}
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        app.state.stub_calls["embeddings"] += 1
+        body = await request.json()
+        inputs = body.get("input")
+        if not isinstance(inputs, list) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        fault = await simulate("embeddings", "embed")
+        if fault is not None:
+            return fault
+        data = []
+        for idx, item in enumerate(inputs):
+            vector = fake_vector(json.dumps(item), cfg["dim"])
+            if body.get("encoding_format") == "base64":
+                vector = base64.b64encode(struct.pack(f"<{len(vector)}f", *vector)).decode()
+            data.append({"object": "embedding", "index": idx, "embedding": vector})
+        return {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "text-embedding-3-small"),
+            "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)},
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        app.state.stub_calls["chat"] += 1
+        if cfg["llm_max_concurrency"] and app.state.active_chats >= cfg["llm_max_concurrency"]:
+            app.state.stub_calls["chat_rejected"] += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                status_code=429,
+                headers={"retry-after-ms": "200"},
+            )
+        app.state.active_chats += 1
+        body = await request.json()
+        model = body.get("model", "gpt-4o-mini")
+
+        async def stream():
+            try:
+                await asyncio.sleep(cfg["llm_ttft_ms"] / 1000)
+                for i in range(int(cfg["llm_tokens"])):
+                    chunk = {
+                        "id": "chatcmpl-stub",
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": model,
+                        "choices": [{"index": 0, "delta": {"content": f"tok{i} "}, "finish_reason": None}],
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    await asyncio.sleep(cfg["llm_token_ms"] / 1000)
+                final = {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                }
+                yield f"data: {json.dumps(final)}\n\n"
+                yield "data: [DONE]\n\n"
+            finally:
+                app.state.active_chats -= 1
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    def scored_points(limit: int):
+        return [
+            {
+                "id": i + 1,
+                "version": 0,
+                "score": 0.9 - i * 0.01,
+                "payload": {
+                    "page_content": f"Stub chunk {i} about ACS course content.",
+                    "metadata": {"rel_filepath": f"stub/{i}.txt", "chunk_id": 0},
+                },
+            }
+            for i in range(limit)
+        ]
+
+    @app.post("/collections/{name}/points/query")
+    async def query_points(name: str, request: Request):
+        app.state.stub_calls["search"] += 1
+        body = await request.json()
+        fault = await simulate("search", "search")
+        if fault is not None:
+            return fault
+        return {"result": {"points": scored_points(body.get("limit", 10))}, "status": "ok", "time": 0.0}
+
+    @app.post("/collections/{name}/points/query/batch")
+    async def query_batch_points(name: str, request: Request):
+        app.state.stub_calls["search"] += 1
+        body = await request.json()
+        fault = await simulate("search", "search")
+        if fault is not None:
+            return fault
+        result = [{"points": scored_points(search.get("limit", 10))} for search in body.get("searches", [])]
+        return {"result": result, "status": "ok", "time": 0.0}
+
+    @app.post("/collections/{name}/points/search")
+    async def search_points(name: str, request: Request):
+        app.state.stub_calls["search"] += 1
+        body = await request.json()
+        fault = await simulate("search", "search")
+        if fault is not None:
+            return fault
+        return {"result": scored_points(body.get("limit", 10)), "status": "ok", "time": 0.0}
+
+    @app.get("/collections")
+    async def list_collections():
+        return {"result": {"collections": [{"name": "ACS-Chat"}]}, "status": "ok", "time": 0.0}
+
+    @app.get("/stub/calls")
+    async def stub_calls():
+        return app.state.stub_calls
+
+    @app.post("/stub/faults")
+    async def stub_faults(request: Request):
+        updates = await request.json()
+        unknown = set(updates) - set(DEFAULTS)
+        if unknown:
+            return JSONResponse({"error": f"Unknown settings: {sorted(unknown)}"}, status_code=400)
+        cfg.update(updates)
+        return {key: cfg[key] for key in DEFAULTS}
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Run local OpenAI/Qdrant stub servers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--embed-ms", type=float, default=DEFAULTS["embed_ms"])
+    parser.add_argument("--search-ms", type=float, default=DEFAULTS["search_ms"])
+    parser.add_argument("--llm-ttft-ms", type=float, default=DEFAULTS["llm_ttft_ms"])
+    parser.add_argument("--llm-token-ms", type=float, default=DEFAULTS["llm_token_ms"])
+    parser.add_argument("--llm-tokens", type=int, default=DEFAULTS["llm_tokens"])
+    parser.add_argument("--llm-max-concurrency", type=int, default=DEFAULTS["llm_max_concurrency"], help="Answer 429 beyond this many concurrent chats, 0 disables")
+    parser.add_argument("--dim", type=int, default=DEFAULTS["dim"])
+    for prefix in ("embed", "search"):
+        parser.add_argument(f"--{prefix}-slow-ratio", type=float, default=0.0, help=f"Share of {prefix} calls that are slow")
+        parser.add_argument(f"--{prefix}-slow-ms", type=float, default=0.0, help=f"Latency of a slow {prefix} call")
+        parser.add_argument(f"--{prefix}-error-ratio", type=float, default=0.0, help=f"Share of {prefix} calls that answer 500")
+    parser.add_argument("--seed", type=int, default=DEFAULTS["seed"], help="Seed for the injected faults")
+    args = parser.parse_args()
+
+    app = create_stub_app({
+        "embed_ms": args.embed_ms,
+        "search_ms": args.search_ms,
+        "llm_ttft_ms": args.llm_ttft_ms,
+        "llm_token_ms": args.llm_token_ms,
+        "llm_tokens": args.llm_tokens,
+        "llm_max_concurrency": args.llm_max_concurrency,
+        "dim": args.dim,
+        "embed_slow_ratio": args.embed_slow_ratio,
+        "embed_slow_ms": args.embed_slow_ms,
+        "embed_error_ratio": args.embed_error_ratio,
+        "search_slow_ratio": args.search_slow_ratio,
+        "search_slow_ms": args.search_slow_ms,
+        "search_error_ratio": args.search_error_ratio,
+        "seed": args.seed,
+    })
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
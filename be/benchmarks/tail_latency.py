@@ -0,0 +1,173 @@
+"""
+Time to first token under a slow upstream tail and during an embeddings
+outage, with and without deadlines, hedging and circuit breakers.
+
+The stub makes --slow-ratio of embedding and search calls take
+--slow-ms instead of their normal latency. Each mode runs the same
+questions against a fresh backend:
+
+    unguarded  no request deadline, stage timeouts, hedges or breakers
+               (the behaviour before app.util.resilience)
+    guarded    the default QA_DEADLINE_SECONDS, stage timeouts, hedging
+               and breakers
+
+and reports TTFT p50/p95/p99 plus hedges sent. The outage phase then
+makes every embedding call fail (POST /stub/faults) and reports TTFT, how
+many answers came from the lexical fallback, and how many embedding calls
+still reached the stub once the breaker had opened. A small BM25 index
+over the fixture corpus is built first so the fallback has something to
+search.
+
+    python -m benchmarks.tail_latency --requests 300 --concurrency 8 --slow-ratio 0.05 --slow-ms 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.harness import launch, parse_sse, percentile, stop, stub_env, wait_for_http
+
+UNGUARDED = {
+    "QA_DEADLINE_SECONDS": "0",
+    "EMBEDDING_DEADLINE_SECONDS": "0",
+    "SEARCH_DEADLINE_SECONDS": "0",
+    "LLM_FIRST_TOKEN_TIMEOUT": "0",
+    "HEDGE_ENABLED": "false",
+    "BREAKER_FAILURE_THRESHOLD": "0",
+}
+
+def build_lexical_index(path: str):
+    from app.services.lexical_index import LexicalIndex
+    from benchmarks.fixture_corpus import build_corpus, build_queries
+
+    docs = build_corpus(40)
+    index = LexicalIndex()
+    for i, doc in enumerate(docs):
+        index.add(i + 1, doc["text"], {"rel_filepath": f"{doc['course']}/{doc['doc_id']}.md"})
+    index.save(path)
+    return [item["query"] for item in build_queries(docs)]
+
+async def one_request(client: httpx.AsyncClient, url: str, question: str):
+    """
+    Send one QA request and return (ttft_seconds or None, answer).
+    """
+    start = time.perf_counter()
+    ttft = None
+    text = ""
+    async with client.stream("POST", url, json={"history": [], "message": question}) as response:
+        if response.status_code != 200:
+            return None, f"HTTP {response.status_code}"
+        async for chunk in response.aiter_text():
+            text += chunk
+            if ttft is None and "event: token" in text:
+                ttft = time.perf_counter() - start
+    answer, _ = parse_sse(text)
+    return ttft, answer
+
+async def run_phase(app_url: str, stub_url: str, questions: list[str], concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=120.0, limits=limits) as client:
+        before = (await client.get(f"{stub_url}/stub/calls")).json()
+        guards_before = (await client.get(f"{app_url}/api/v1/qa/upstream/stats")).json()
+
+        async def bounded(question):
+            async with semaphore:
+                return await one_request(client, f"{app_url}/api/v1/qa", question)
+
+        results = await asyncio.gather(*[bounded(question) for question in questions])
+        after = (await client.get(f"{stub_url}/stub/calls")).json()
+        guards = (await client.get(f"{app_url}/api/v1/qa/upstream/stats")).json()
+    ttfts = [ttft * 1000 for ttft, _ in results if ttft is not None]
+    return {
+        "requests": len(questions),
+        "ttft_p50_ms": round(percentile(ttfts, 50), 1),
+        "ttft_p95_ms": round(percentile(ttfts, 95), 1),
+        "ttft_p99_ms": round(percentile(ttfts, 99), 1),
+        "answered": sum(1 for _, answer in results if answer and answer != "Content not relevant" and not answer.startswith("HTTP")),
+        "not_relevant": sum(1 for _, answer in results if answer == "Content not relevant"),
+        "embedding_calls": after["embeddings"] - before["embeddings"],
+        "search_calls": after["search"] - before["search"],
+        # Guard counters are per process; report this phase's share
+        "hedges": sum(guard["hedged"] - guards_before.get(name, {}).get("hedged", 0) for name, guard in guards.items()),
+        "guards": guards,
+    }
+
+def run_mode(mode: str, overrides: dict, args, stub_url: str, app_url: str, questions: list[str], index_path: str):
+    env = stub_env(stub_url, {
+        # Every request reaches the upstreams
+        "ANSWER_CACHE_ENABLED": "false",
+        "EMBEDDING_CACHE_ENABLED": "false",
+        "QA_COALESCE_ENABLED": "false",
+        "LEXICAL_INDEX_PATH": index_path,
+        **overrides,
+    })
+    app = launch("benchmarks.serve_app", ["--port", str(args.app_port)], env=env)
+    try:
+        wait_for_http(f"{app_url}/docs")
+        httpx.post(f"{stub_url}/stub/faults", json={"embed_error_ratio": 0.0})
+        # Warm-up also gives the guards the latency samples hedging needs
+        warmup = [f"{questions[i % len(questions)]} (warm-up {i})" for i in range(args.warmup)]
+        asyncio.run(run_phase(app_url, stub_url, warmup, args.concurrency))
+        tail = [f"{questions[i % len(questions)]} ({mode} {i})" for i in range(args.requests)]
+        result = {"slow_tail": asyncio.run(run_phase(app_url, stub_url, tail, args.concurrency))}
+        httpx.post(f"{stub_url}/stub/faults", json={"embed_error_ratio": 1.0})
+        outage = [f"{questions[i % len(questions)]} ({mode} outage {i})" for i in range(args.outage_requests)]
+        result["outage"] = asyncio.run(run_phase(app_url, stub_url, outage, args.concurrency))
+        return result
+    finally:
+        stop(app)
+
+def main():
+    parser = argparse.ArgumentParser(description="TTFT tails with and without deadlines, hedging and breakers")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--outage-requests", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--slow-ratio", type=float, default=0.05, help="Share of embedding and search calls that are slow")
+    parser.add_argument("--slow-ms", type=float, default=2000.0)
+    parser.add_argument("--stub-port", type=int, default=9191)
+    parser.add_argument("--app-port", type=int, default=9291)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    app_url = f"http://127.0.0.1:{args.app_port}"
+    stub = launch("benchmarks.stub_servers", [
+        "--port", str(args.stub_port),
+        "--embed-ms", "40",
+        "--search-ms", "20",
+        "--llm-ttft-ms", "100",
+        "--llm-tokens", "10",
+        "--embed-slow-ratio", str(args.slow_ratio),
+        "--embed-slow-ms", str(args.slow_ms),
+        "--search-slow-ratio", str(args.slow_ratio),
+        "--search-slow-ms", str(args.slow_ms),
+    ])
+    results = {}
+    try:
+        wait_for_http(stub_url)
+        with tempfile.TemporaryDirectory() as directory:
+            index_path = os.path.join(directory, "lexical")
+            questions = build_lexical_index(index_path)
+            for mode, overrides in (("unguarded", UNGUARDED), ("guarded", {})):
+                results[mode] = run_mode(mode, overrides, args, stub_url, app_url, questions, index_path)
+    finally:
+        stop(stub)
+
+    print(f"{'mode':<11}{'phase':<10}{'ttft p50':>10}{'p95':>10}{'p99':>10}{'answered':>10}{'not rel.':>10}{'embed':>7}{'hedges':>8}")
+    for mode, phases in results.items():
+        for phase, r in phases.items():
+            print(f"{mode:<11}{phase:<10}{r['ttft_p50_ms']:>8.1f}ms{r['ttft_p95_ms']:>8.1f}ms{r['ttft_p99_ms']:>8.1f}ms"
+                  f"{r['answered']:>10}{r['not_relevant']:>10}{r['embedding_calls']:>7}{r['hedges']:>8}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
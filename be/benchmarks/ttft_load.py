@@ -0,0 +1,88 @@
+"""
+Time-to-first-token under concurrent load, blocking vs async retrieval.
+
+Starts the stub servers and two copies of the backend (one with the old
+synchronous retrieval calls, one with the async pipeline), then fires N
+concurrent /api/v1/qa requests at each and reports p50/p99 TTFT.
+
+    python -m benchmarks.ttft_load --concurrency 1 10 50 100
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from benchmarks.harness import launch, percentile, stop, stub_env, wait_for_http
+
+async def one_request(client: httpx.AsyncClient, url: str, idx: int):
+    """
+    Send one QA request and return (ttft_seconds, total_seconds).
+    """
+    payload = {"history": [], "message": f"What is covered in COMP{6000 + idx}?"}
+    start = time.perf_counter()
+    ttft = None
+    async with client.stream("POST", url, json=payload) as response:
+        async for chunk in response.aiter_text():
+            # The start frame is sent at once; time to first token is the first token frame
+            if ttft is None and "event: token" in chunk:
+                ttft = time.perf_counter() - start
+    total = time.perf_counter() - start
+    return (ttft if ttft is not None else total), total
+
+async def run_level(url: str, concurrency: int):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=120.0, limits=limits) as client:
+        results = await asyncio.gather(*[one_request(client, url, i) for i in range(concurrency)])
+    ttfts = [r[0] * 1000 for r in results]
+    totals = [r[1] * 1000 for r in results]
+    return {
+        "concurrency": concurrency,
+        "ttft_p50_ms": round(percentile(ttfts, 50), 1),
+        "ttft_p99_ms": round(percentile(ttfts, 99), 1),
+        "total_p50_ms": round(percentile(totals, 50), 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="p50/p99 TTFT before and after async retrieval")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 100])
+    parser.add_argument("--stub-port", type=int, default=9100)
+    parser.add_argument("--app-port", type=int, default=9200)
+    parser.add_argument("--embed-ms", type=float, default=80.0)
+    parser.add_argument("--search-ms", type=float, default=40.0)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    stub = launch("benchmarks.stub_servers", [
+        "--port", str(args.stub_port),
+        "--embed-ms", str(args.embed_ms),
+        "--search-ms", str(args.search_ms),
+    ])
+    results = {}
+    try:
+        wait_for_http(stub_url)
+        for mode in ("blocking", "async"):
+            flags = ["--port", str(args.app_port)] + (["--blocking"] if mode == "blocking" else [])
+            app = launch("benchmarks.serve_app", flags, env=stub_env(stub_url))
+            try:
+                wait_for_http(f"http://127.0.0.1:{args.app_port}/docs")
+                url = f"http://127.0.0.1:{args.app_port}/api/v1/qa"
+                asyncio.run(run_level(url, 1))  # warm up clients and tokenizer
+                results[mode] = [asyncio.run(run_level(url, n)) for n in args.concurrency]
+            finally:
+                stop(app)
+    finally:
+        stop(stub)
+
+    print(f"{'mode':<10}{'N':>6}{'p50 TTFT':>12}{'p99 TTFT':>12}")
+    for mode, levels in results.items():
+        for level in levels:
+            print(f"{mode:<10}{level['concurrency']:>6}{level['ttft_p50_ms']:>10.1f}ms{level['ttft_p99_ms']:>10.1f}ms")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Chat throughput with 1, 2 and 4 gunicorn/uvicorn workers, plus a graceful
+drain check.
+
+Each configuration serves app.main through gunicorn.conf.py against the
+local stub servers and is driven by a fixed number of concurrent clients.
+The drain check starts a slow answer stream, sends SIGTERM to the gunicorn
+master mid-stream and verifies the answer still arrives complete.
+
+    python -m benchmarks.worker_scaling --workers 1 2 4 --concurrency 32 --duration 15
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import time
+
+import httpx
+
+from benchmarks.harness import launch, parse_sse, percentile, stop, stub_env, wait_for_http
+
+def wait_ready(url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/readyz", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise TimeoutError(f"{url} not ready within {timeout}s")
+
+def launch_gunicorn(env: dict, port: int, workers: int):
+    env = {**env, "WEB_CONCURRENCY": str(workers)}
+    return launch("gunicorn", ["app.main:app", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}"], env=env)
+
+async def drive(url: str, concurrency: int, duration: float):
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + duration
+
+    async def client_loop(client_id: int):
+        nonlocal errors
+        i = 0
+        async with httpx.AsyncClient(timeout=60) as client:
+            while time.monotonic() < deadline:
+                i += 1
+                start = time.perf_counter()
+                try:
+                    # Distinct questions so the answer cache does not short-circuit the chain
+                    response = await client.post(f"{url}/api/v1/qa", json={"history": [], "message": f"What is COMP{client_id}x{i}?"})
+                    await response.aread()
+                    if response.status_code != 200:
+                        errors += 1
+                        continue
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop(c) for c in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_sec": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+    }
+
+async def drain_check(url: str, proc):
+    """
+    SIGTERM the server while an answer is streaming; the answer must complete.
+    """
+    chunks = []
+    async with httpx.AsyncClient(timeout=60) as client:
+        async with client.stream("POST", f"{url}/api/v1/qa", json={"history": [], "message": "Explain COMP6441 in detail"}) as response:
+            signalled = False
+            async for chunk in response.aiter_text():
+                chunks.append(chunk)
+                if not signalled and "event: token" in chunk:
+                    proc.send_signal(signal.SIGTERM)
+                    signalled = True
+    answer, events = parse_sse("".join(chunks))
+    return {"tokens_received": len(answer.split()), "complete": answer.rstrip().endswith("tok49") and events[-1][0] == "done"}
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-worker throughput benchmark")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--stub-port", type=int, default=9170)
+    parser.add_argument("--port", type=int, default=9270)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    url = f"http://127.0.0.1:{args.port}"
+    # Short upstream latencies so the backend's own CPU work dominates
+    stub = launch("benchmarks.stub_servers", ["--port", str(args.stub_port), "--embed-ms", "5", "--search-ms", "5",
+                                              "--llm-ttft-ms", "20", "--llm-token-ms", "2", "--llm-tokens", "50"])
+    report = {"cpu_count": os.cpu_count(), "concurrency": args.concurrency, "workers": {}}
+    try:
+        wait_for_http(f"{stub_url}/")
+        env = stub_env(stub_url, {"ANSWER_CACHE_ENABLED": "false"})
+        for workers in args.workers:
+            server = launch_gunicorn(env, args.port, workers)
+            try:
+                wait_ready(url)
+                result = asyncio.run(drive(url, args.concurrency, args.duration))
+            finally:
+                stop(server)
+                server.wait()
+            report["workers"][workers] = result
+            print(f"{workers} worker(s): {result['requests_per_sec']} req/s  p50 {result['p50_ms']}ms  "
+                  f"p99 {result['p99_ms']}ms  errors {result['errors']}")
+
+        # Slow stream (50 tokens x 100ms) to catch the worker mid-answer
+        slow_stub_port = args.stub_port + 1
+        slow_stub = launch("benchmarks.stub_servers", ["--port", str(slow_stub_port), "--llm-token-ms", "100", "--llm-tokens", "50"])
+        server = launch_gunicorn(stub_env(f"http://127.0.0.1:{slow_stub_port}", {"ANSWER_CACHE_ENABLED": "false"}), args.port, 2)
+        try:
+            wait_for_http(f"http://127.0.0.1:{slow_stub_port}/")
+            wait_ready(url)
+            report["drain"] = asyncio.run(drain_check(url, server))
+            server.wait(timeout=30)
+        finally:
+            stop(server)
+            stop(slow_stub)
+        print(f"drain on SIGTERM: {report['drain']['tokens_received']} tokens received, complete={report['drain']['complete']}")
+    finally:
+        stop(stub)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
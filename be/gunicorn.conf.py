@@ -0,0 +1,32 @@
+# Gunicorn settings for the multi-worker serving mode:
+#   gunicorn app.main:app -c gunicorn.conf.py
+import os
+import shutil
+import tempfile
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Each worker imports the app after the fork and builds its own clients in
+# the lifespan, so no sockets, thread pools or SQLite handles cross a fork
+preload_app = False
+
+# SIGTERM stops accepting connections; workers get this long to finish open
+# answer streams before they are killed. Keep docker's stop_grace_period above it
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "60"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+keepalive = 5
+
+def on_starting(server):
+    # Metrics from all workers are aggregated through files in this directory
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not directory:
+        directory = os.path.join(tempfile.gettempdir(), "acs-chat-metrics")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = directory
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
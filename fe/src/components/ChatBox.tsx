@@ -8,7 +8,7 @@ import {
   Paper,
 } from "@mui/material";
 import { useTheme, type Theme } from "@mui/material/styles";
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import ContentCopyIcon from "@mui/icons-material/ContentCopy";
 import RefreshIcon from "@mui/icons-material/Refresh";
 import SendIcon from "@mui/icons-material/Send";
@@ -21,6 +21,57 @@ interface ChatHistory {
   content: string;
 }
 
+// Server-Sent Events frame from /api/v1/qa
+interface SSEFrame {
+  event: string;
+  id?: string;
+  data: string;
+}
+
+// Reconnects with Last-Event-ID before giving up on an answer
+const MAX_STREAM_ATTEMPTS = 4;
+
+// Split buffered stream text into complete SSE frames, keeping the unfinished tail
+const parseSSEFrames = (buffer: string) => {
+  const frames: SSEFrame[] = [];
+  const blocks = buffer.split("\n\n");
+  const rest = blocks.pop() ?? "";
+  for (const block of blocks) {
+    let event = "message";
+    let id: string | undefined;
+    const data: string[] = [];
+    for (const line of block.split("\n")) {
+      // Empty lines and ": heartbeat" comments carry no data
+      if (!line || line.startsWith(":")) continue;
+      const sep = line.indexOf(":");
+      const field = sep === -1 ? line : line.slice(0, sep);
+      let value = sep === -1 ? "" : line.slice(sep + 1);
+      if (value.startsWith(" ")) value = value.slice(1);
+      if (field === "event") event = value;
+      else if (field === "id") id = value;
+      else if (field === "data") data.push(value);
+    }
+    if (data.length > 0) frames.push({ event, id, data: data.join("\n") });
+  }
+  return { frames, rest };
+};
+
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// Start a server-side session, seeded with the conversation so far
+const createSession = async (history: ChatHistory[]): Promise<string> => {
+  const response = await fetch("/api/v1/sessions", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ history }),
+  });
+  if (!response.ok) {
+    throw new Error(`Session request failed with status ${response.status}`);
+  }
+  const { session_id } = await response.json();
+  return session_id;
+};
+
 // Reusable markdown styles for consistent rendering
 const getMarkdownStyles = (theme: Theme) => ({    
   lineHeight: 1.6,
@@ -327,6 +378,8 @@ const ChatBox = () => {
   const [chatHistory, setChatHistory] = useState<ChatHistory[]>([]);
   const [chatInput, setChatInput] = useState("");
   const [streamingContent, setStreamingContent] = useState("");
+  // The server keeps the history; each request sends only the session ID and the new message
+  const sessionId = useRef<string | null>(null);
   const theme = useTheme();
 
   // Debug streaming content changes
@@ -335,39 +388,92 @@ const ChatBox = () => {
   }, [streamingContent]);
 
   // Shared API call logic for both send and regenerate
-  const callQAAPI = async (history: ChatHistory[], message: string) => {
+  // history is only uploaded to (re)create the session: first message, regenerate or expiry
+  const callQAAPI = async (history: ChatHistory[], message: string, reseed = false) => {
     setLoading(true);
     setStreamingContent("");
 
+    let accumulatedContent = "";
+    let lastEventId: string | null = null;
+    let finished = false;
+
     try {
-      // Use relative path for API, works for both dev and prod with proxy
-      const response = await fetch('/api/v1/qa', {
-        method: "POST",
-        headers: {
+      if (!sessionId.current || reseed) {
+        sessionId.current = await createSession(history);
+      }
+
+      for (let attempt = 1; !finished && attempt <= MAX_STREAM_ATTEMPTS; attempt++) {
+        const headers: Record<string, string> = {
           "Content-Type": "application/json",
           Accept: "text/event-stream",
-        },
-        body: JSON.stringify({
-          history,
-          message,
-        }),
-      });
-
-      if (!response.body) {
-        throw new Error("No response body");
-      }
+        };
+        // Resume the same answer from the last frame received
+        if (lastEventId) headers["Last-Event-ID"] = lastEventId;
+
+        let response: Response;
+        try {
+          // Use relative path for API, works for both dev and prod with proxy
+          response = await fetch('/api/v1/qa', {
+            method: "POST",
+            headers,
+            body: JSON.stringify({
+              message,
+              session_id: sessionId.current,
+            }),
+          });
+        } catch (error) {
+          console.error("QA request failed, retrying:", error);
+          await sleep(500 * attempt);
+          continue;
+        }
+
+        if (response.status === 404 && attempt < MAX_STREAM_ATTEMPTS) {
+          // Session expired on the server: start a new one from the local history
+          sessionId.current = await createSession(history);
+          continue;
+        }
+        if (response.status === 503 && attempt < MAX_STREAM_ATTEMPTS) {
+          // Server busy or restarting: wait as asked, then try again
+          const retryAfter = Number(response.headers.get("Retry-After")) || 1;
+          await sleep(Math.min(retryAfter, 5) * 1000);
+          continue;
+        }
+        if (!response.ok || !response.body) {
+          throw new Error(`QA request failed with status ${response.status}`);
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder("utf-8");
+        let buffer = "";
+
+        try {
+          while (!finished) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const parsed = parseSSEFrames(buffer);
+            buffer = parsed.rest;
 
-      const reader = response.body.getReader();
-      const decoder = new TextDecoder("utf-8");
-      let accumulatedContent = "";
-
-      if (reader) {
-        while (true) {
-          const { done, value } = await reader.read();
-          if (done) break;
-          const chunk = decoder.decode(value, { stream: true });
-          accumulatedContent += chunk;
-          setStreamingContent(accumulatedContent);
+            for (const frame of parsed.frames) {
+              const payload = JSON.parse(frame.data);
+              if (frame.event === "start") {
+                // The server could not resume, so it streams a fresh answer
+                if (payload.resume_from === 0) accumulatedContent = "";
+              } else if (frame.event === "token") {
+                accumulatedContent += payload.text;
+                if (frame.id) lastEventId = frame.id;
+              } else if (frame.event === "error") {
+                accumulatedContent += `\n\nError: ${payload.message}`;
+              } else if (frame.event === "done") {
+                console.log("Answer stats:", payload);
+                finished = true;
+              }
+            }
+            setStreamingContent(accumulatedContent);
+          }
+        } catch (error) {
+          // Connection dropped mid-answer; the next attempt resumes it
+          console.error("Stream interrupted, resuming:", error);
         }
       }
 
@@ -417,8 +523,8 @@ const ChatBox = () => {
     // Get the last user message
     const lastUserMessage = newHistory[newHistory.length - 1];
     if (lastUserMessage && lastUserMessage.role === "user") {
-      // Use shared API call logic
-      await callQAAPI(newHistory.slice(0, -1), lastUserMessage.content);
+      // The server session already holds the old answer, so start over from the history before it
+      await callQAAPI(newHistory.slice(0, -1), lastUserMessage.content, true);
     }
   };
 